@@ -1,14 +1,31 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, date, timedelta
+from contextlib import contextmanager, nullcontext
 import json
+import os
+import tempfile
 import numpy as np
-import hashlib
-import urllib.parse
 import calendar
 
+from carteira.agregados import STATUS_REVISAO, AgregadosCarteira
+from carteira.cache import CacheCarteira, hash_conteudo
+from carteira.consolidacao import consolidar, fontes_de_zip
+from carteira.diario import DiarioRevisoes, carregar_diario, carregar_revisoes
+from carteira.exportacao import FORMATOS, CacheExportacoes, mime_exportacao, nome_exportacao
+from carteira.carga import carregar_carteira
+from carteira.graficos import CacheFiguras
+from carteira.instrumentacao import ARQUIVO_LOG_PADRAO, ATIVO_PADRAO, Medicoes, criar_log, gravar_medicoes
+from carteira.links import generate_gc_hash, generate_personalized_links
+from carteira.lote import adiar_datas, confirmar_pendentes, ler_decisoes, modelo_decisoes
+from carteira.notificacoes import (SMTP_PADRAO, RegistroEnvios, ServidorSMTPLocal, config_smtp, enviar,
+                                   ler_destinatarios, montar_mensagens)
+from carteira.particao import filtrar_por_mes_trabalho, get_mes_trabalho
+from carteira.registro import RegistroCarteiras
+from carteira.repositorio import criar_repositorio
+from carteira.revisoes import aplicar_revisoes, reaplicar_revisoes, resumo_revisoes_realizadas, tabela_revisoes
+
 # Configuração da página
 st.set_page_config(
     page_title="Dashboard Revisão Carteira",
@@ -17,216 +34,297 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Copy-on-Write: fatias da carteira compartilhada nunca alteram o original (padrão no pandas 3)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
 # Inicializar session state para dados persistentes
-if 'dados_revisao' not in st.session_state:
-    st.session_state.dados_revisao = {}
-
-if 'df_original' not in st.session_state:
-    st.session_state.df_original = None
-
-# Função para determinar o mês de trabalho
-def get_mes_trabalho():
-    """Retorna o mês que deve ser trabalhado baseado no mês atual"""
-    hoje = datetime.now()
-    mes_trabalho = hoje.month + 1
-    ano_trabalho = hoje.year
-    
-    # Se dezembro, próximo é janeiro do ano seguinte
-    if mes_trabalho > 12:
-        mes_trabalho = 1
-        ano_trabalho += 1
-    
-    return mes_trabalho, ano_trabalho
-
-# Função para filtrar por mês de trabalho
-def filtrar_por_mes_trabalho(df, mes=None, ano=None):
-    """Filtra o dataframe pelo mês de trabalho"""
-    if mes is None or ano is None:
-        mes, ano = get_mes_trabalho()
-    
-    # Converter a coluna de data se necessário - CORRIGIDO para usar a coluna certa
-    if 'Revisão Data Faturamento' in df.columns:
-        df['Data_Trabalho'] = pd.to_datetime(df['Revisão Data Faturamento'], errors='coerce')
-        
-        # Filtrar pelo mês e ano
-        mask = (df['Data_Trabalho'].dt.month == mes) & (df['Data_Trabalho'].dt.year == ano)
-        return df[mask].copy()
+# A sessão guarda só a chave da carteira; os dados ficam no registro compartilhado
+if 'chave_carteira' not in st.session_state:
+    st.session_state.chave_carteira = None
+
+# Revisões atuais já lidas do repositório, com a versão correspondente
+if 'revisoes_cache' not in st.session_state:
+    st.session_state.revisoes_cache = None
+
+if 'agregados' not in st.session_state:
+    st.session_state.agregados = None
+
+# Cache em disco das carteiras já tratadas (chave = SHA-256 do arquivo enviado)
+cache_carteira = CacheCarteira()
+
+# Repositório de revisões compartilhado por todas as sessões do processo
+@st.cache_resource
+def get_repositorio():
+    """SQLite em modo WAL (caminho em CARTEIRA_REVISOES_DB)"""
+    return criar_repositorio()
+
+repositorio = get_repositorio()
+
+# Diário de revisões só de acréscimo (cópia de segurança incremental do repositório)
+@st.cache_resource
+def get_diario():
+    """JSON Lines em CARTEIRA_DIARIO; repovoa o repositório se ele começar vazio"""
+    diario = DiarioRevisoes()
+    diario.restaurar(repositorio)
+    return diario
+
+diario = get_diario()
+
+# Cache de figuras Plotly compartilhado (mesma agregação -> mesma figura, sem reconstruir)
+@st.cache_resource
+def get_cache_figuras():
+    """LRU de figuras prontas (tamanho em CARTEIRA_FIGURAS_MAX)"""
+    return CacheFiguras()
+
+figuras = get_cache_figuras()
+
+# Registro das carteiras carregadas (uma cópia por arquivo, compartilhada por todas as sessões)
+@st.cache_resource
+def get_registro():
+    """Registro em memória, com o cache em disco como segundo nível"""
+    return RegistroCarteiras(cache_carteira)
+
+registro = get_registro()
+
+# Exportações da carteira revisada em disco (uma por carteira, mês, versão das revisões e formato)
+@st.cache_resource
+def get_cache_exportacoes():
+    """Arquivos em CARTEIRA_EXPORTACOES_DIR, gerados só no primeiro download de cada versão"""
+    return CacheExportacoes()
+
+exportacoes = get_cache_exportacoes()
+
+# Registro de envios de e-mail (retomar uma campanha sem reenviar para quem já recebeu)
+@st.cache_resource
+def get_registro_envios():
+    """JSON Lines em CARTEIRA_ENVIOS, compartilhado por todas as sessões"""
+    return RegistroEnvios()
+
+registro_envios = get_registro_envios()
+
+# Log rotativo da instrumentação (uma linha JSON por execução medida)
+@st.cache_resource
+def get_log_instrumentacao():
+    """Arquivo em CARTEIRA_INSTRUMENTACAO_LOG, girado a cada CARTEIRA_INSTRUMENTACAO_LOG_MB"""
+    return criar_log()
+
+# Função para saber se a instrumentação está ligada
+def instrumentacao_ativa():
+    """Ligada por CARTEIRA_INSTRUMENTACAO=1 ou por ?debug=1 na URL (este só mostra o painel, sem medir alocações)"""
+    return ATIVO_PADRAO or st.query_params.get("debug") == "1"
+
+# Execução medida: rerun completo (main) ou rerun isolado de um fragmento
+@contextmanager
+def execucao_medida(rotulo):
+    """Mede as etapas da execução, grava no log e mostra o painel de depuração ao final.
+
+    Fragmentos executados dentro de uma execução já medida somam as etapas a ela.
+    """
+    if not instrumentacao_ativa() or st.session_state.get('medicoes') is not None:
+        yield
+        return
     
-    return df
+    medicoes = Medicoes(rotulo, alocacoes=ATIVO_PADRAO)
+    st.session_state.medicoes = medicoes
+    try:
+        yield
+    finally:
+        st.session_state.medicoes = None
+        gravar_medicoes(
+            get_log_instrumentacao(), medicoes,
+            modo='link' if st.query_params.get("hash") else 'admin',
+            gc=st.query_params.get("gc")
+        )
+    exibir_medicoes(medicoes)
 
-# Função para gerar hash único do GC
-def generate_gc_hash(gc_name, mes, ano):
-    """Gera um hash único para o GC para criar link personalizado"""
-    unique_string = f"{gc_name}_{mes}_{ano}"
-    return hashlib.md5(unique_string.encode()).hexdigest()[:10]
+# Função para medir uma etapa da execução atual
+def etapa(nome, linhas=None):
+    """Bloco medido (sem custo quando a instrumentação está desligada); aceita linhas dentro do bloco"""
+    medicoes = st.session_state.get('medicoes')
+    return medicoes.etapa(nome, linhas) if medicoes is not None else nullcontext({})
+
+# Painel de depuração com as medições da execução
+def exibir_medicoes(medicoes):
+    with st.expander(f"⏱️ Instrumentação - {medicoes.rotulo} ({medicoes.total_segundos:.3f}s)"):
+        st.dataframe(
+            medicoes.tabela(),
+            column_config={
+                "etapa": "Etapa",
+                "linhas": st.column_config.NumberColumn("Linhas", format="%d"),
+                "segundos": st.column_config.NumberColumn("Tempo (s)", format="%.4f"),
+                "alocado_mb": st.column_config.NumberColumn("Alocado (MB)", format="%.2f"),
+                "pico_mb": st.column_config.NumberColumn("Pico (MB)", format="%.2f"),
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(f"Log: {ARQUIVO_LOG_PADRAO}")
 
-# Função para carregar dados
-@st.cache_data(ttl=60)  # Cache por apenas 60 segundos para evitar problemas
+# Função para carregar dados (a cópia em memória fica no registro; aqui só o cache em disco)
 def load_data(uploaded_file):
     """Carrega e processa os dados do Excel"""
     try:
-        df = pd.read_excel(uploaded_file)
-        
-        # Limpeza e tratamento dos dados - CORRIGIDO warnings pandas
-        if 'Vl.Saldo' in df.columns:
-            # Converter para string primeiro
-            df['Vl.Saldo'] = df['Vl.Saldo'].astype(str)
-            # Limpar caracteres especiais, manter apenas números, vírgulas e pontos
-            df['Vl.Saldo'] = df['Vl.Saldo'].str.replace(r'[^\d,.-]', '', regex=True)
-            # Se tem vírgula decimal (formato BR), trocar por ponto (formato US)
-            df['Vl.Saldo'] = df['Vl.Saldo'].str.replace(',', '.', regex=False)
-            # Converter para numérico
-            df['Vl.Saldo'] = pd.to_numeric(df['Vl.Saldo'], errors='coerce')
-        
-        if 'Saldo' in df.columns:
-            # Mesmo tratamento para Saldo
-            df['Saldo'] = df['Saldo'].astype(str)
-            df['Saldo'] = df['Saldo'].str.replace(r'[^\d,.-]', '', regex=True)
-            df['Saldo'] = df['Saldo'].str.replace(',', '.', regex=False)
-            df['Saldo'] = pd.to_numeric(df['Saldo'], errors='coerce')
-        
-        # Converter data de entrega original
-        if 'Dt. Dej. Rem.' in df.columns:
-            df['Dt. Dej. Rem.'] = pd.to_datetime(df['Dt. Dej. Rem.'], format='%d/%m/%Y', errors='coerce')
-        
-        # Converter data de trabalho (Revisão Data Faturamento) - CORRIGIDO nome da coluna
-        if 'Revisão Data Faturamento' in df.columns:
-            df['Data_Trabalho'] = pd.to_datetime(df['Revisão Data Faturamento'], errors='coerce')
-        
-        # FALLBACK: Se não tiver "Revisão Data Faturamento", tentar "1ª.DT.DIV.REM"
-        elif '1ª.DT.DIV.REM' in df.columns:
-            df['Data_Trabalho'] = pd.to_datetime(df['1ª.DT.DIV.REM'], errors='coerce')
-            st.warning("⚠️ Usando '1ª.DT.DIV.REM' como fallback. Verifique se a coluna 'Revisão Data Faturamento' existe.")
-        
-        # Adicionar colunas de controle se não existirem
-        if 'Revisao_Realizada' not in df.columns:
-            df['Revisao_Realizada'] = False
-        
-        if 'Data_Original_Alterada' not in df.columns:
-            df['Data_Original_Alterada'] = False
-            
-        if 'Nova_Data_Entrega' not in df.columns:
-            df['Nova_Data_Entrega'] = pd.NaT
-        
-        if 'Data_Revisao' not in df.columns:
-            df['Data_Revisao'] = pd.NaT
-        
-        if 'Revisado_Por' not in df.columns:
-            df['Revisado_Por'] = None
-            
+        _, df, relatorio, avisos = carregar_carteira(uploaded_file.getvalue(), cache_carteira)
+        for aviso in avisos:
+            st.warning(aviso)
+        if relatorio is not None:
+            st.caption(
+                f"💾 Memória da carteira: {relatorio['bytes_antes'] / 1_048_576:.1f} MB → "
+                f"{relatorio['bytes_depois'] / 1_048_576:.1f} MB "
+                f"({relatorio['bytes_economizados'] / 1_048_576:.1f} MB economizados)"
+            )
         return df
     except Exception as e:
         st.error(f"Erro ao carregar arquivo: {str(e)}")
         return None
 
-# Função para aplicar revisões dos session_state
+# Função para obter as revisões atuais
+def get_revisoes():
+    """{ordem: revisão} do repositório, atualizado na sessão só com as alterações desde a última leitura"""
+    cache = st.session_state.revisoes_cache
+    if cache is None:
+        # Versão lida antes das revisões: alterações no meio do caminho voltam no próximo delta
+        versao = repositorio.versao()
+        cache = {'versao': versao, 'dados': repositorio.todas(), 'tabela': None}
+    else:
+        versao, alteradas = repositorio.alteracoes_desde(cache['versao'])
+        if alteradas:
+            for ordem, revisao in alteradas:
+                if revisao is None:
+                    cache['dados'].pop(ordem, None)
+                else:
+                    cache['dados'][ordem] = revisao
+            cache['tabela'] = None
+        cache['versao'] = versao
+    st.session_state.revisoes_cache = cache
+    return cache['dados']
+
+# Função para obter a carteira da sessão
+def get_carteira():
+    """Entrada do registro ({'chave', 'df', 'indice', 'visoes'}) referenciada pela sessão ou None"""
+    return registro.obter(st.session_state.chave_carteira)
+
+# Função para aplicar revisões do repositório
 def apply_revisoes_to_dataframe(df):
-    """Aplica as revisões salvas no session_state ao dataframe"""
-    if not st.session_state.dados_revisao:
+    """Aplica as revisões do repositório ao dataframe"""
+    revisoes = get_revisoes()
+    if not revisoes:
         return df
     
-    df_updated = df.copy()
-    
-    for ordem, revisao_data in st.session_state.dados_revisao.items():
-        mask = df_updated['Ord.venda'] == ordem
-        if mask.any():
-            df_updated.loc[mask, 'Revisao_Realizada'] = True
-            df_updated.loc[mask, 'Data_Revisao'] = pd.to_datetime(revisao_data['data_revisao'])
-            df_updated.loc[mask, 'Revisado_Por'] = revisao_data['gc']
-            
-            if revisao_data['nova_data']:
-                df_updated.loc[mask, 'Data_Original_Alterada'] = True
-                df_updated.loc[mask, 'Nova_Data_Entrega'] = pd.to_datetime(revisao_data['nova_data'])
-    
-    return df_updated
-
-# Função para calcular métricas
-def calculate_metrics(df):
-    """Calcula métricas principais"""
-    total_registros = len(df)
-    total_valor = df['Vl.Saldo'].sum() / 1_000_000  # Converter para milhões
-    total_volume = df['Saldo'].sum()
-    registros_revisados = df['Revisao_Realizada'].sum()
-    registros_alterados = df['Data_Original_Alterada'].sum()
-    perc_revisao = (registros_revisados / total_registros * 100) if total_registros > 0 else 0
-    perc_alteracao = (registros_alterados / total_registros * 100) if total_registros > 0 else 0
-    
-    return {
-        'total_registros': total_registros,
-        'total_valor': total_valor,
-        'total_volume': total_volume,
-        'registros_revisados': registros_revisados,
-        'registros_alterados': registros_alterados,
-        'perc_revisao': perc_revisao,
-        'perc_alteracao': perc_alteracao
-    }
-
-# Função para gerar resumo por grupo para um GC
-def get_resumo_por_grupo(df, gc):
-    """Gera resumo por grupo para um GC específico"""
-    df_gc = df[df['GC'] == gc]
-    
-    resumo = df_gc.groupby('Grupo').agg({
-        'Ord.venda': 'count',
-        'Vl.Saldo': 'sum',
-        'Saldo': 'sum'
-    }).round(2)
-    
-    resumo.columns = ['Qtd_Pedidos', 'Valor_Total', 'Volume_Total']
-    resumo['Valor_MM'] = (resumo['Valor_Total'] / 1_000_000).round(1)
-    resumo = resumo.reset_index()
-    
-    return resumo
-
-# Função para gerar links personalizados
-def generate_personalized_links(df, mes, ano):
-    """Gera links personalizados para cada GC"""
-    gcs = df['GC'].dropna().unique()
-    base_url = "https://dash-carteira-review.streamlit.app"  # URL do Streamlit Cloud
-    mes_nome = calendar.month_name[mes]
+    # Uma junção por Ord.venda em vez de uma máscara por revisão (tabela montada uma vez por versão)
+    cache = st.session_state.revisoes_cache
+    if cache['tabela'] is None:
+        cache['tabela'] = tabela_revisoes(revisoes)
+    return aplicar_revisoes(df, cache['tabela'])
+
+# Função para obter as linhas do GC com as revisões
+def get_revisoes_gc(df_gc, gc, mes, ano):
+    """Linhas do GC com as revisões aplicadas; depois da primeira vez, só as ordens alteradas são reaplicadas"""
+    chave = (st.session_state.chave_carteira, gc, mes, ano)
+    entrada = st.session_state.get('revisoes_gc')
+    if entrada is None or entrada['chave'] != chave:
+        df_revisado = apply_revisoes_to_dataframe(df_gc)
+        entrada = {'chave': chave, 'versao': st.session_state.revisoes_cache['versao'], 'df': df_revisado}
+        st.session_state.revisoes_gc = entrada
+    else:
+        entrada['versao'], alteradas = repositorio.alteracoes_desde(entrada['versao'])
+        entrada['df'] = reaplicar_revisoes(entrada['df'], df_gc, alteradas)
+    return entrada['df']
+
+# Função para registrar revisões
+def registrar_revisoes(revisoes, mes=None, ano=None):
+    """Grava {ordem: revisão} no repositório em um único lote (e só os eventos novos no diário)"""
+    repositorio.registrar(revisoes, mes, ano)
+    diario.sincronizar(repositorio)
+
+# Função para limpar as revisões do mês selecionado
+def limpar_revisoes(mes, ano):
+    """Remove as revisões do mês no repositório compartilhado (as remoções também geram nova versão)"""
+    repositorio.limpar(mes, ano)
+    diario.sincronizar(repositorio)
+
+# Função para obter os agregados do mês
+def get_agregados_mes(df_mes, mes, ano):
+    """Agregados do mês (df_mes sem revisões aplicadas), atualizados só com as revisões novas"""
+    chave = (st.session_state.chave_carteira, mes, ano)
+    entrada = st.session_state.agregados
     
-    links = {}
-    for gc in gcs:
-        gc_hash = generate_gc_hash(gc, mes, ano)
-        df_gc = df[df['GC'] == gc]
-        
-        # Dados gerais do GC
-        pedidos_gc = len(df_gc)
-        valor_gc = df_gc['Vl.Saldo'].sum() / 1_000_000  # Converter para milhões
-        volume_gc = df_gc['Saldo'].sum()
-        
-        # Resumo por grupo
-        resumo_grupos = get_resumo_por_grupo(df, gc)
-        
-        link = f"{base_url}?gc={urllib.parse.quote(gc)}&hash={gc_hash}&mes={mes}&ano={ano}"
-        links[gc] = {
-            'link': link,
-            'hash': gc_hash,
-            'pedidos': pedidos_gc,
-            'valor': valor_gc,
-            'volume': volume_gc,
-            'grupos': resumo_grupos,
-            'mes_nome': mes_nome,
-            'ano': ano
-        }
-    
-    return links
+    if entrada is None or entrada['chave'] != chave:
+        agregados = AgregadosCarteira(df_mes)
+        agregados.atualizar(get_revisoes().items())
+        entrada = {'chave': chave, 'agregados': agregados, 'versao': st.session_state.revisoes_cache['versao']}
+        st.session_state.agregados = entrada
+    else:
+        entrada['versao'], alteradas = repositorio.alteracoes_desde(entrada['versao'])
+        entrada['agregados'].atualizar(alteradas)
+    
+    return entrada['agregados']
+
+# Função para obter os links dos GCs
+def get_links_gc(df, mes, ano):
+    """Links, resumos e progresso dos GCs, recalculados só quando os dados ou as revisões mudam"""
+    chave = (st.session_state.chave_carteira, mes, ano, st.session_state.revisoes_cache['versao'])
+    entrada = st.session_state.get('links_gc')
+    if entrada is None or entrada['chave'] != chave:
+        entrada = {'chave': chave, 'links': generate_personalized_links(df, mes, ano)}
+        st.session_state.links_gc = entrada
+    return entrada['links']
+
+# Função para obter a tabela de revisões realizadas
+def get_resumo_revisoes(df, mes, ano):
+    """Tabela de revisões realizadas e lista de GCs, remontadas só quando os dados ou as revisões mudam"""
+    revisoes = get_revisoes()
+    cache = st.session_state.revisoes_cache
+    chave = (st.session_state.chave_carteira, mes, ano, cache['versao'])
+    entrada = st.session_state.get('resumo_revisoes')
+    if entrada is None or entrada['chave'] != chave:
+        if cache['tabela'] is None:
+            cache['tabela'] = tabela_revisoes(revisoes)
+        tabela = resumo_revisoes_realizadas(df, revisoes, cache['tabela'])
+        entrada = {'chave': chave, 'tabela': tabela, 'gcs': sorted(tabela['GC'].dropna().unique().tolist())}
+        st.session_state.resumo_revisoes = entrada
+    return entrada
+
+# Opções de ordenação da lista de pedidos (coluna, ascendente)
+ORDENACOES_PEDIDOS = {
+    "Valor (maior primeiro)": ('Vl.Saldo', False),
+    "Data prevista": ('Data_Trabalho', True),
+    "Ordem": ('Ord.venda', True),
+}
+
+TAMANHOS_PAGINA = [10, 25, 50, 100]
 
 # Função para formulário de revisão
-def formulario_revisao_gc(df, gc_selecionado, mes, ano):
-    """Interface de revisão para um GC específico"""
+def formulario_revisao_gc(carteira, gc_selecionado, mes, ano):
+    """Interface de revisão para um GC específico (linhas e resumo vêm da visão compartilhada, sem revisões)"""
     mes_nome = calendar.month_name[mes]
     st.header(f"📝 Revisão de Carteira - {gc_selecionado}")
     st.subheader(f"Mês de trabalho: {mes_nome}/{ano}")
     
-    df_gc = df[df['GC'] == gc_selecionado].copy()
+    # Fatia do GC e resumo por grupos (não dependem das revisões) montados uma vez por versão da carteira
+    with etapa('visao_gc') as medicao:
+        visao = carteira['visoes'].obter(gc_selecionado, mes, ano)
+        medicao['linhas'] = len(visao['df'])
     
-    if len(df_gc) == 0:
+    if len(visao['df']) == 0:
         st.warning("Nenhum pedido encontrado para este GC no período.")
         return
     
-    # Resumo por grupos
-    resumo_grupos = get_resumo_por_grupo(df_gc, gc_selecionado)
+    painel_revisao_gc(visao['df'], visao['grupos'], gc_selecionado, mes, ano)
+
+# Fragmento com os contadores e a lista de pedidos do GC
+@st.fragment
+@execucao_medida("painel_revisao_gc")
+def painel_revisao_gc(df_gc, resumo_grupos, gc_selecionado, mes, ano):
+    """Reexecutado sozinho a cada ação de revisão: só as revisões alteradas são reaplicadas às linhas do GC"""
+    with etapa('get_revisoes_gc', len(df_gc)):
+        df_gc = get_revisoes_gc(df_gc, gc_selecionado, mes, ano)
+    
+    # Mensagem da última ação (gravada antes do rerun do fragmento)
+    mensagem = st.session_state.pop('mensagem_gc', None)
+    if mensagem:
+        st.toast(mensagem)
     
     # Métricas do GC
     col1, col2, col3, col4 = st.columns(4)
@@ -274,7 +372,7 @@ def formulario_revisao_gc(df, gc_selecionado, mes, ano):
         )
     
     # Aplicar filtros
-    df_filtered = df_gc.copy()
+    df_filtered = df_gc
     if status_filter == "Pendentes":
         df_filtered = df_filtered[df_filtered['Revisao_Realizada'] == False]
     elif status_filter == "Revisados":
@@ -283,98 +381,554 @@ def formulario_revisao_gc(df, gc_selecionado, mes, ano):
     if grupo_filter != "Todos":
         df_filtered = df_filtered[df_filtered['Grupo'] == grupo_filter]
     
+    # Ações em lote: uma gravação e um único rerun por ação
+    acoes_em_lote(df_gc, df_filtered, gc_selecionado, mes, ano)
+    
     st.subheader(f"📋 Pedidos para Revisão ({len(df_filtered)} itens)")
     
-    # Processar cada pedido
-    for idx, row in df_filtered.iterrows():
-        ordem = row['Ord.venda']
+    # Modo de exibição, ordenação e tamanho da página
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        modo = st.radio("Exibição", ["Lista", "Tabela"], horizontal=True, key="modo_lista_gc",
+                        help="Tabela: marque vários pedidos e envie tudo de uma vez")
+    with col2:
+        ordenacao = st.selectbox("Ordenar por", list(ORDENACOES_PEDIDOS), key="ordenacao_gc")
+    with col3:
+        tamanho_pagina = st.selectbox("Pedidos por página", TAMANHOS_PAGINA, key="tamanho_pagina_gc",
+                                      disabled=(modo == "Tabela"))
+    
+    coluna, ascendente = ORDENACOES_PEDIDOS[ordenacao]
+    with etapa('ordenar_pedidos', len(df_filtered)):
+        df_filtered = df_filtered.sort_values(coluna, ascending=ascendente, kind='stable')
+    
+    if modo == "Tabela":
+        with etapa('tabela_revisao_gc', len(df_filtered)):
+            tabela_revisao_gc(df_filtered, gc_selecionado, mes, ano)
+        return
+    
+    # Paginação: só a página visível é montada
+    n_paginas = max(1, -(-len(df_filtered) // tamanho_pagina))
+    pagina = st.number_input(
+        f"Página (de {n_paginas})",
+        min_value=1,
+        max_value=n_paginas,
+        value=1,
+        # A página volta para 1 quando filtros, ordenação ou tamanho mudam
+        key=f"pagina_gc_{status_filter}_{grupo_filter}_{ordenacao}_{tamanho_pagina}"
+    )
+    inicio = (pagina - 1) * tamanho_pagina
+    st.caption(f"Exibindo {inicio + 1}-{min(inicio + tamanho_pagina, len(df_filtered))} de {len(df_filtered)}")
+    
+    with etapa('lista_pedidos') as medicao:
+        pagina_pedidos = df_filtered.iloc[inicio:inicio + tamanho_pagina]
+        medicao['linhas'] = len(pagina_pedidos)
+        for idx, row in pagina_pedidos.iterrows():
+            exibir_pedido(idx, row, gc_selecionado, mes, ano)
+
+# Função para as ações de revisão em lote do GC
+def acoes_em_lote(df_gc, df_filtered, gc_selecionado, mes, ano):
+    """Confirmar pendentes por grupo ou filtro, adiar datas e carregar CSV de decisões"""
+    with st.expander("⚡ Ações em lote"):
+        # Confirmar pendentes
+        st.write("**Confirmar pendentes**")
+        col1, col2 = st.columns(2)
+        with col1:
+            grupos = sorted(df_gc['Grupo'].dropna().unique().tolist())
+            st.selectbox("Grupo", grupos, key="grupo_lote_gc")
+            st.button(
+                "✅ Confirmar pendentes do grupo", key="confirmar_grupo_gc", disabled=not grupos,
+                on_click=aplicar_lote,
+                args=(lambda: confirmar_pendentes(df_gc[df_gc['Grupo'] == st.session_state.grupo_lote_gc], gc_selecionado),
+                      mes, ano, "pedidos do grupo confirmados!")
+            )
+        with col2:
+            st.caption(f"{int((~df_filtered['Revisao_Realizada'].astype(bool)).sum())} pendentes no filtro atual")
+            st.button(
+                "✅ Confirmar pendentes do filtro", key="confirmar_filtro_gc",
+                on_click=aplicar_lote,
+                args=(lambda: confirmar_pendentes(df_filtered, gc_selecionado), mes, ano, "pedidos confirmados!")
+            )
+        
+        st.markdown("---")
+        
+        # Adiar datas de uma seleção
+        st.write("**Alterar data de vários pedidos**")
+        with st.form("form_adiar_gc"):
+            st.multiselect(
+                "Pedidos (vazio = todos do filtro atual)",
+                df_filtered['Ord.venda'].dropna().unique().tolist(),
+                key="ordens_adiar_gc"
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                st.number_input("Deslocar (dias)", min_value=-365, max_value=365, value=7, step=1, key="dias_adiar_gc")
+            with col2:
+                st.text_input("Justificativa (opcional)", key="just_adiar_gc")
+            
+            def adiar_selecionados():
+                selecionados = st.session_state.ordens_adiar_gc
+                alvo = df_filtered[df_filtered['Ord.venda'].isin(selecionados)] if selecionados else df_filtered
+                return adiar_datas(alvo, int(st.session_state.dias_adiar_gc), gc_selecionado, st.session_state.just_adiar_gc)
+            
+            st.form_submit_button("📅 Aplicar nova data", on_click=aplicar_lote,
+                                  args=(adiar_selecionados, mes, ano, "pedidos com data alterada!"))
         
-        with st.container():
-            col1, col2, col3 = st.columns([2, 2, 1])
+        st.markdown("---")
+        
+        # CSV de decisões
+        st.write("**Carregar decisões (CSV)**")
+        st.caption("Colunas: Ord.venda; acao (check ou revisao); nova_data (dd/mm/aaaa); justificativa")
+        st.download_button(
+            "📥 Modelo com os pendentes",
+            data=modelo_decisoes(df_gc),
+            file_name=f"decisoes_{generate_gc_hash(gc_selecionado, mes, ano)}.csv",
+            mime="text/csv",
+            key="modelo_decisoes_gc"
+        )
+        arquivo = st.file_uploader("Arquivo de decisões", type=['csv'], key="decisoes_gc")
+        if arquivo is not None and arquivo.file_id != st.session_state.get('decisoes_carregadas_id'):
+            try:
+                revisoes, ignoradas = ler_decisoes(arquivo.getvalue(), df_gc, gc_selecionado)
+            except ValueError as e:
+                st.error(f"Erro ao ler decisões: {e}")
+                return
+            if not ignoradas.empty:
+                st.warning(f"{len(ignoradas)} linhas ignoradas")
+                st.dataframe(ignoradas, hide_index=True, use_container_width=True)
+            
+            def aplicar_decisoes():
+                st.session_state.decisoes_carregadas_id = arquivo.file_id
+                return revisoes
+            
+            st.button(f"💾 Aplicar {len(revisoes)} decisões", key="aplicar_decisoes_gc", disabled=not revisoes,
+                      on_click=aplicar_lote, args=(aplicar_decisoes, mes, ano, "decisões aplicadas!"))
+
+# Callback das ações em lote
+def aplicar_lote(montar_revisoes, mes, ano, mensagem):
+    """Monta as revisões no clique e grava tudo em uma única chamada ao repositório.
+
+    Roda como callback, antes do fragmento ser redesenhado, então o lote
+    inteiro custa uma gravação e um único rerun.
+    """
+    revisoes = montar_revisoes()
+    if not revisoes:
+        st.session_state.mensagem_gc = "Nenhum pedido a atualizar."
+        return
+    registrar_revisoes(revisoes, mes, ano)
+    st.session_state.mensagem_gc = f"✅ {len(revisoes)} {mensagem}"
+
+# Função para exibir um pedido com as ações de revisão
+def exibir_pedido(idx, row, gc_selecionado, mes, ano):
+    """Cartão do pedido; as chaves usam a linha porque uma ordem pode ter várias linhas"""
+    ordem = row['Ord.venda']
+    chave = f"{ordem}_{idx}"
+    
+    with st.container():
+        col1, col2, col3 = st.columns([2, 2, 1])
+        
+        with col1:
+            valor_item = row['Vl.Saldo'] / 1_000_000
+            st.markdown(
+                f"**Ordem:** {ordem}  \n"
+                f"**Cliente:** {row['Nome Emissor']}  \n"
+                f"**Produto:** {row['Desc. Material']}  \n"
+                f"**Valor:** R$ {valor_item:.1f}M"
+            )
+        
+        with col2:
+            data_trabalho = row['Data_Trabalho'].strftime('%d/%m/%Y') if pd.notna(row['Data_Trabalho']) else 'N/A'
+            status_credito = row['Status crédito'] if pd.notna(row['Status crédito']) else 'N/A'
+            st.markdown(
+                f"**Data Prevista:** {data_trabalho}  \n"
+                f"**Volume:** {row['Saldo']:,.2f}  \n"
+                f"**Grupo:** {row['Grupo']}  \n"
+                f"**Status Crédito:** {status_credito}"
+            )
+        
+        with col3:
+            # Status atual
+            if row['Revisao_Realizada']:
+                st.success("✅ Revisado")
+                if row['Data_Original_Alterada']:
+                    st.info("📅 Data alterada")
+            else:
+                st.warning("⏳ Pendente")
+            
+            # Botões de ação
+            col_check, col_rev = st.columns(2)
+            
+            with col_check:
+                st.button("✅ OK", key=f"check_{chave}", help="Data está correta",
+                          on_click=confirmar_pedido, args=(ordem, gc_selecionado, mes, ano))
+            
+            with col_rev:
+                st.button("📅 Revisar", key=f"rev_{chave}", help="Alterar data",
+                          on_click=alternar_revisao, args=(chave, True))
+    
+    # Formulário para alterar data (aparece quando clica em Revisar)
+    if st.session_state.get(f'revisar_{chave}', False):
+        with st.form(f"form_data_{chave}"):
+            st.write("**Alterar Data de Entrega:**")
+            col1, col2 = st.columns(2)
             
             with col1:
-                st.write(f"**Ordem:** {ordem}")
-                st.write(f"**Cliente:** {row['Nome Emissor']}")
-                st.write(f"**Produto:** {row['Desc. Material']}")
-                valor_item = row['Vl.Saldo'] / 1_000_000
-                st.write(f"**Valor:** R$ {valor_item:.1f}M")
+                st.date_input(
+                    "Nova Data de Entrega",
+                    value=row['Data_Trabalho'].date() if pd.notna(row['Data_Trabalho']) else date.today(),
+                    key=f"data_{chave}"
+                )
             
             with col2:
-                data_trabalho = row['Data_Trabalho'].strftime('%d/%m/%Y') if pd.notna(row['Data_Trabalho']) else 'N/A'
-                status_credito = row['Status crédito'] if pd.notna(row['Status crédito']) else 'N/A'
-                st.write(f"**Data Prevista:** {data_trabalho}")
-                st.write(f"**Volume:** {row['Saldo']:,.2f}")
-                st.write(f"**Grupo:** {row['Grupo']}")
-                st.write(f"**Status Crédito:** {status_credito}")
+                st.text_input(
+                    "Justificativa (opcional)",
+                    key=f"just_{chave}"
+                )
             
-            with col3:
-                # Status atual
-                if row['Revisao_Realizada']:
-                    st.success("✅ Revisado")
-                    if row['Data_Original_Alterada']:
-                        st.info("📅 Data alterada")
+            col_save, col_cancel = st.columns(2)
+            with col_save:
+                st.form_submit_button("💾 Salvar", on_click=salvar_nova_data,
+                                      args=(ordem, chave, gc_selecionado, mes, ano))
+            
+            with col_cancel:
+                st.form_submit_button("❌ Cancelar", on_click=alternar_revisao, args=(chave, False))
+    
+    st.markdown("---")
+
+# Callbacks das ações por pedido: gravam antes do fragmento ser redesenhado, sem st.rerun extra
+def confirmar_pedido(ordem, gc_selecionado, mes, ano):
+    registrar_revisoes({ordem: {
+        'gc': gc_selecionado,
+        'data_revisao': datetime.now().isoformat(),
+        'nova_data': None,
+        'acao': 'check'
+    }}, mes, ano)
+
+def alternar_revisao(chave, aberto):
+    st.session_state[f'revisar_{chave}'] = aberto
+
+def salvar_nova_data(ordem, chave, gc_selecionado, mes, ano):
+    registrar_revisoes({ordem: {
+        'gc': gc_selecionado,
+        'data_revisao': datetime.now().isoformat(),
+        'nova_data': st.session_state[f'data_{chave}'].isoformat(),
+        'justificativa': st.session_state[f'just_{chave}'],
+        'acao': 'revisao'
+    }}, mes, ano)
+    st.session_state[f'revisar_{chave}'] = False
+    st.session_state.mensagem_gc = "Data alterada com sucesso!"
+
+# Função para revisão em tabela (vários pedidos, um único envio)
+def tabela_revisao_gc(df_filtered, gc_selecionado, mes, ano):
+    """Tabela editável: o GC marca os pedidos e envia todas as revisões em um único lote"""
+    tabela = pd.DataFrame({
+        'Confirmar': False,
+        'Nova_Data': pd.Series(pd.NaT, index=df_filtered.index, dtype='datetime64[ns]'),
+        'Justificativa': '',
+        'Ordem': df_filtered['Ord.venda'],
+        'Cliente': df_filtered['Nome Emissor'],
+        'Produto': df_filtered['Desc. Material'],
+        'Valor_MM': (df_filtered['Vl.Saldo'] / 1_000_000).round(1),
+        'Data_Prevista': df_filtered['Data_Trabalho'],
+        'Grupo': df_filtered['Grupo'],
+        'Status': df_filtered['Revisao_Realizada'].map({True: '✅ Revisado', False: '⏳ Pendente'}),
+    }, index=df_filtered.index)
+    
+    with st.form("form_tabela_gc"):
+        st.data_editor(
+            tabela,
+            column_config={
+                "Confirmar": st.column_config.CheckboxColumn("✅ OK", help="Data está correta"),
+                "Nova_Data": st.column_config.DateColumn("📅 Nova Data", format="DD/MM/YYYY"),
+                "Justificativa": "Justificativa",
+                "Valor_MM": "Valor (R$ MM)",
+                "Data_Prevista": st.column_config.DateColumn("Data Prevista", format="DD/MM/YYYY"),
+            },
+            disabled=['Ordem', 'Cliente', 'Produto', 'Valor_MM', 'Data_Prevista', 'Grupo', 'Status'],
+            hide_index=True,
+            use_container_width=True,
+            key="editor_revisao_gc"
+        )
+        st.form_submit_button(
+            "💾 Enviar revisões marcadas",
+            on_click=aplicar_lote,
+            args=(lambda: revisoes_da_tabela(tabela, gc_selecionado), mes, ano, "revisões enviadas!")
+        )
+
+# Função para converter as edições da tabela em revisões
+def revisoes_da_tabela(tabela, gc_selecionado):
+    """Lê as linhas editadas no data_editor (posição -> campos alterados)"""
+    agora = datetime.now().isoformat()
+    revisoes = {}
+    for posicao, campos in st.session_state.editor_revisao_gc['edited_rows'].items():
+        ordem = tabela['Ordem'].iloc[int(posicao)]
+        if campos.get('Nova_Data'):
+            revisoes[ordem] = {
+                'gc': gc_selecionado,
+                'data_revisao': agora,
+                'nova_data': pd.Timestamp(campos['Nova_Data']).date().isoformat(),
+                'justificativa': campos.get('Justificativa'),
+                'acao': 'revisao'
+            }
+        elif campos.get('Confirmar'):
+            revisoes[ordem] = {'gc': gc_selecionado, 'data_revisao': agora, 'nova_data': None, 'acao': 'check'}
+    return revisoes
+
+# Fragmento de detalhamento por GC (trocar o GC não reexecuta o dashboard)
+@st.fragment
+@execucao_medida("detalhamento_gc")
+def detalhamento_gc(links_gc):
+    """Resumo, grupos e gráfico do GC selecionado"""
+    gc_detalhes = st.selectbox(
+        "Selecione um GC para ver detalhes:",
+        ["Selecione..."] + list(links_gc.keys()),
+        key="gc_detalhes_select"
+    )
+    
+    if gc_detalhes != "Selecione...":
+        info_gc = links_gc[gc_detalhes]
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader(f"📋 Resumo - {gc_detalhes}")
+            st.metric("Pedidos", info_gc['pedidos'])
+            st.metric("Valor", f"R$ {info_gc['valor']:.1f}M")
+            st.metric("Volume", f"{info_gc['volume']:,.0f}")
+        
+        with col2:
+            st.subheader("📦 Por Grupo de Produto")
+            st.dataframe(
+                info_gc['grupos'],
+                column_config={
+                    "Grupo": "Grupo de Produto",
+                    "Qtd_Pedidos": "Qtd. Pedidos",
+                    "Valor_MM": "Valor (R$ MM)",
+                    "Volume_Total": "Volume Total"
+                },
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        # Gráfico específico do GC
+        fig_gc = figuras.barras(
+            info_gc['grupos'],
+            x='Grupo',
+            y='Valor_MM',
+            titulo=f'Valor por Grupo - {gc_detalhes}',
+            rotulos={'Valor_MM': 'Valor (R$ MM)', 'Grupo': 'Grupo de Produto'},
+            angulo_x=45
+        )
+        st.plotly_chart(fig_gc, use_container_width=True)
+
+# Fragmento com o resumo das revisões realizadas
+@st.fragment
+@execucao_medida("resumo_revisoes")
+def resumo_revisoes(df, mes, ano):
+    """Tabela das revisões com filtros por GC e ação, e exportação em CSV"""
+    revisoes = get_revisoes()
+    if revisoes:
+        st.header("📋 Resumo das Revisões Realizadas")
+        
+        # Tabela montada uma vez por versão das revisões; os filtros só recortam a tabela pronta
+        resumo = get_resumo_revisoes(df, mes, ano)
+        df_revisoes = resumo['tabela']
+        
+        if not df_revisoes.empty:
+            
+            # Filtros para revisões
+            col1, col2 = st.columns(2)
+            with col1:
+                gc_filtro_rev = st.selectbox(
+                    "Filtrar por GC:",
+                    ["Todos"] + resumo['gcs'],
+                    key="gc_filtro_revisoes"
+                )
+            with col2:
+                acao_filtro_rev = st.selectbox(
+                    "Filtrar por Ação:",
+                    ["Todas", "Confirmado", "Data Alterada"],
+                    key="acao_filtro_revisoes"
+                )
+            
+            # Aplicar filtros
+            df_rev_filtrado = df_revisoes
+            if gc_filtro_rev != "Todos":
+                df_rev_filtrado = df_rev_filtrado[df_rev_filtrado['GC'] == gc_filtro_rev]
+            if acao_filtro_rev != "Todas":
+                df_rev_filtrado = df_rev_filtrado[df_rev_filtrado['Acao'] == acao_filtro_rev]
+            
+            st.dataframe(df_rev_filtrado, use_container_width=True, hide_index=True)
+            
+            # Exportar revisões (CSV montado só no clique)
+            st.download_button(
+                label="📊 Exportar Revisões (CSV)",
+                data=lambda: df_rev_filtrado.to_csv(index=False),
+                file_name=f"revisoes_carteira_{mes}_{ano}.csv",
+                mime="text/csv"
+            )
+
+# Fragmento para exportar a carteira do mês com as revisões aplicadas
+@st.fragment
+@execucao_medida("exportar_carteira")
+def exportar_carteira(df, mes, ano):
+    """CSV, XLSX ou Parquet (opcionalmente gzip), gerado no primeiro download de cada versão das revisões"""
+    st.header("📥 Exportar Carteira Revisada")
+    
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        formato = st.selectbox("Formato", FORMATOS, format_func=str.upper, key="formato_exportacao")
+    with col2:
+        comprimir = st.checkbox("Comprimir (gzip)", key="comprimir_exportacao")
+    
+    # Chave dos dados + versão das revisões: o mesmo pedido reaproveita o arquivo já gerado
+    chave = f"{st.session_state.chave_carteira[:16]}_{ano}-{mes:02d}"
+    versao = st.session_state.revisoes_cache['versao']
+    
+    def gerar():
+        caminho = exportacoes.obter(chave, versao, formato, lambda: df, comprimir)
+        with open(caminho, 'rb') as arquivo:
+            return arquivo.read()
+    
+    with col3:
+        st.download_button(
+            f"💾 Baixar {len(df):,} linhas",
+            data=gerar,
+            file_name=nome_exportacao(f"carteira_revisada_{ano}-{mes:02d}", formato, comprimir),
+            mime=mime_exportacao(formato, comprimir),
+            help="Todas as colunas do mês com as revisões aplicadas",
+            key="download_exportacao"
+        )
+
+# Função para enviar os links dos GCs por e-mail
+@st.fragment
+@execucao_medida("enviar_links")
+def enviar_links(links_gc, mes, ano):
+    """Uma mensagem por GC da lista de destinatários; GCs já enviados na campanha do mês são pulados"""
+    with st.expander("📧 Enviar links por e-mail"):
+        destinatarios_csv = st.file_uploader(
+            "Lista de destinatários (CSV com as colunas GC e E-mail)",
+            type=['csv'],
+            help="Separador ';' ou ','; repita o GC em várias linhas para mais de um destinatário",
+            key="upload_destinatarios"
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            remetente = st.text_input("Remetente", value=SMTP_PADRAO['remetente'], key="remetente_envio")
+        with col2:
+            teste = st.checkbox(
+                "Modo de teste (servidor SMTP local)",
+                value=not SMTP_PADRAO['host'],
+                disabled=not SMTP_PADRAO['host'],
+                help="As mensagens são entregues a um servidor em memória e nada sai da máquina",
+                key="teste_envio"
+            )
+        if not SMTP_PADRAO['host']:
+            st.caption("Servidor SMTP não configurado (CARTEIRA_SMTP_HOST): só o modo de teste está disponível")
+        if destinatarios_csv is None:
+            return
+        if teste:
+            remetente = remetente or 'carteira@localhost'
+        
+        try:
+            destinatarios = ler_destinatarios(destinatarios_csv.getvalue())
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            return
+        
+        campanha = f"{ano:04d}-{mes:02d}"
+        ja_enviados = set() if teste else registro_envios.enviados(campanha)
+        pendentes = [gc for gc in links_gc if destinatarios.get(gc) and gc not in ja_enviados]
+        sem_email = [gc for gc in links_gc if not destinatarios.get(gc)]
+        st.caption(
+            f"{len(pendentes)} GCs a enviar · {len(ja_enviados & set(links_gc))} já enviados na campanha {campanha} · "
+            f"{len(sem_email)} sem e-mail na lista"
+        )
+        if sem_email:
+            st.warning(f"⚠️ GCs sem e-mail: {', '.join(map(str, sem_email))}")
+        
+        if st.button(f"📤 Enviar {len(pendentes)} e-mails", disabled=not pendentes or not remetente, key="enviar_emails"):
+            mensagens, _ = montar_mensagens({gc: links_gc[gc] for gc in pendentes}, destinatarios, remetente)
+            with st.spinner(f"Enviando {len(mensagens)} e-mails..."):
+                if teste:
+                    # Registro temporário: envios de teste não marcam a campanha como enviada
+                    with tempfile.TemporaryDirectory() as temporario, ServidorSMTPLocal() as servidor:
+                        resultado = enviar(mensagens, servidor.config(),
+                                           RegistroEnvios(os.path.join(temporario, 'envios.jsonl')), campanha)
                 else:
-                    st.warning("⏳ Pendente")
-                
-                # Botões de ação
-                col_check, col_rev = st.columns(2)
-                
-                with col_check:
-                    if st.button("✅ OK", key=f"check_{ordem}", help="Data está correta"):
-                        st.session_state.dados_revisao[ordem] = {
-                            'gc': gc_selecionado,
-                            'data_revisao': datetime.now().isoformat(),
-                            'nova_data': None,
-                            'acao': 'check'
-                        }
-                        st.rerun()
-                
-                with col_rev:
-                    if st.button("📅 Revisar", key=f"rev_{ordem}", help="Alterar data"):
-                        st.session_state[f'revisar_{ordem}'] = True
-                        st.rerun()
+                    resultado = enviar(mensagens, config_smtp(), registro_envios, campanha)
+            
+            st.success(f"✅ {resultado['enviados']} e-mails enviados{' (teste)' if teste else ''} "
+                       f"em {resultado['segundos']:.1f}s")
+            if resultado['falhas']:
+                st.error(f"❌ {len(resultado['falhas'])} falhas (serão tentadas de novo no próximo envio):")
+                st.dataframe(pd.DataFrame(resultado['falhas']), hide_index=True, use_container_width=True)
+
+# Função para consolidar arquivos de revisão de vários GCs
+def consolidar_revisoes(mes, ano):
+    """Une .zip/.json/.jsonl pela revisão mais recente de cada ordem, com relatório de conflitos"""
+    mensagem = st.session_state.pop('mensagem_consolidacao', None)
+    if mensagem:
+        st.toast(mensagem)
+    
+    with st.expander("🗂️ Consolidar revisões dos GCs"):
+        arquivos = st.file_uploader(
+            "Arquivos de revisão (.zip, .json ou .jsonl)",
+            type=['zip', 'json', 'jsonl'],
+            accept_multiple_files=True,
+            help="Vale a revisão com a data de revisão mais recente de cada ordem, inclusive as já gravadas",
+            key="upload_consolidacao"
+        )
+        if not arquivos:
+            return
         
-        # Formulário para alterar data (aparece quando clica em Revisar)
-        if st.session_state.get(f'revisar_{ordem}', False):
-            with st.form(f"form_data_{ordem}"):
-                st.write("**Alterar Data de Entrega:**")
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    nova_data = st.date_input(
-                        "Nova Data de Entrega",
-                        value=row['Data_Trabalho'].date() if pd.notna(row['Data_Trabalho']) else date.today(),
-                        key=f"data_{ordem}"
-                    )
-                
-                with col2:
-                    justificativa = st.text_input(
-                        "Justificativa (opcional)",
-                        key=f"just_{ordem}"
-                    )
-                
-                col_save, col_cancel = st.columns(2)
-                with col_save:
-                    if st.form_submit_button("💾 Salvar"):
-                        st.session_state.dados_revisao[ordem] = {
-                            'gc': gc_selecionado,
-                            'data_revisao': datetime.now().isoformat(),
-                            'nova_data': nova_data.isoformat(),
-                            'justificativa': justificativa,
-                            'acao': 'revisao'
-                        }
-                        st.session_state[f'revisar_{ordem}'] = False
-                        st.success("Data alterada com sucesso!")
-                        st.rerun()
-                
-                with col_cancel:
-                    if st.form_submit_button("❌ Cancelar"):
-                        st.session_state[f'revisar_{ordem}'] = False
-                        st.rerun()
+        # Consolidar uma vez por conjunto de arquivos (o uploader mantém os arquivos entre reruns)
+        ids = tuple(arquivo.file_id for arquivo in arquivos)
+        resultado = st.session_state.get('consolidacao')
+        if resultado is None or resultado['ids'] != ids:
+            fontes = []
+            for arquivo in arquivos:
+                if arquivo.name.lower().endswith('.zip'):
+                    fontes.extend((f"{arquivo.name}/{nome}", conteudo) for nome, conteudo in fontes_de_zip(arquivo.getvalue()))
+                else:
+                    fontes.append((arquivo.name, arquivo.getvalue()))
+            with st.spinner(f"Consolidando {len(fontes)} arquivos..."):
+                resultado = {'ids': ids, **consolidar(fontes, get_revisoes())}
+            st.session_state.consolidacao = resultado
         
-        st.markdown("---")
+        st.caption(
+            f"{resultado['arquivos']} arquivos · {len(resultado['historico']):,} versões · "
+            f"{len(resultado['revisoes']):,} revisões novas ou mais recentes · "
+            f"{len(resultado['conflitos']):,} conflitos · {len(resultado['invalidas']):,} rejeitadas"
+        )
+        if not resultado['invalidas'].empty:
+            st.warning("⚠️ Revisões rejeitadas na validação:")
+            st.dataframe(resultado['invalidas'], hide_index=True, use_container_width=True)
+        if not resultado['conflitos'].empty:
+            st.dataframe(resultado['conflitos'].head(100), hide_index=True, use_container_width=True)
+            st.download_button(
+                "📥 Relatório de conflitos (CSV)",
+                data=lambda: resultado['conflitos'].to_csv(index=False, sep=';').encode('utf-8-sig'),
+                file_name=f"conflitos_revisoes_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                mime="text/csv",
+                key="download_conflitos"
+            )
+        
+        st.button(
+            f"💾 Gravar {len(resultado['revisoes']):,} revisões",
+            disabled=not resultado['revisoes'],
+            on_click=gravar_consolidacao,
+            args=(resultado['revisoes'], mes, ano),
+            key="gravar_consolidacao"
+        )
+
+def gravar_consolidacao(revisoes, mes, ano):
+    registrar_revisoes(revisoes, mes, ano)
+    # Tudo gravado: o mesmo conjunto de arquivos não tem mais nada novo
+    st.session_state.consolidacao['revisoes'] = {}
+    st.session_state.mensagem_consolidacao = f"✅ {len(revisoes):,} revisões consolidadas gravadas"
 
 # Interface principal
+@execucao_medida("dashboard")
 def main():
     # Verificar se é acesso via link personalizado
     query_params = st.query_params
@@ -389,10 +943,13 @@ def main():
         st.title(f"📋 Revisão de Carteira - {gc_from_url}")
         st.caption(f"Período: {mes_nome}/{ano_from_url}")
         
-        # Verificar se há dados carregados
-        if st.session_state.df_original is None:
+        # Verificar se há dados carregados (carteira atual publicada pelo admin)
+        with etapa('carteira_atual'):
+            carteira = registro.atual()
+        if carteira is None:
             st.error("⚠️ Dados não encontrados. Entre em contato com o administrador.")
             st.stop()
+        st.session_state.chave_carteira = carteira['chave']
         
         # Verificar hash de segurança
         expected_hash = generate_gc_hash(gc_from_url, mes_from_url, ano_from_url)
@@ -400,10 +957,8 @@ def main():
             st.error("🔒 Link inválido ou expirado.")
             st.stop()
         
-        # Filtrar por mês de trabalho e aplicar revisões
-        df_mes = filtrar_por_mes_trabalho(st.session_state.df_original, mes_from_url, ano_from_url)
-        df_with_revisoes = apply_revisoes_to_dataframe(df_mes)
-        formulario_revisao_gc(df_with_revisoes, gc_from_url, mes_from_url, ano_from_url)
+        # Só as linhas do GC no mês (as revisões são aplicadas dentro do formulário)
+        formulario_revisao_gc(carteira, gc_from_url, mes_from_url, ano_from_url)
         
     else:
         # Modo dashboard principal
@@ -444,17 +999,28 @@ def main():
                 )
             
             if uploaded_file is not None:
-                df = load_data(uploaded_file)
+                # Carregar e indexar só quando o arquivo ainda não está no registro
+                chave = hash_conteudo(uploaded_file.getvalue())
+                carteira = registro.obter(chave)
+                if carteira is None:
+                    with etapa('load_data') as medicao:
+                        df = load_data(uploaded_file)
+                        medicao['linhas'] = len(df) if df is not None else None
+                    if df is not None:
+                        carteira = registro.publicar(chave, df)
                 
-                if df is not None:
-                    # Salvar no session state
-                    st.session_state.df_original = df
+                if carteira is not None:
+                    # A sessão guarda só a referência; os links dos GCs passam a usar esta carteira
+                    st.session_state.chave_carteira = chave
+                    registro.definir_atual(chave)
+                    df = carteira['df']
                     
-                    # Filtrar por mês de trabalho
-                    df_mes = filtrar_por_mes_trabalho(df, mes_selecionado, ano_selecionado)
-                    
-                    # Aplicar revisões existentes
-                    df_mes = apply_revisoes_to_dataframe(df_mes)
+                    # Filtrar por mês de trabalho (revisões e filtros ficam no índice de agregados do mês)
+                    with etapa('filtrar_por_mes_trabalho') as medicao:
+                        df_mes = filtrar_por_mes_trabalho(df, mes_selecionado, ano_selecionado, carteira['indice'])
+                        medicao['linhas'] = len(df_mes)
+                    with etapa('get_agregados_mes', len(df_mes)):
+                        agregados = get_agregados_mes(df_mes, mes_selecionado, ano_selecionado)
                     
                     st.success(f"✅ Arquivo carregado")
                     st.info(f"📊 {len(df):,} registros totais")
@@ -470,95 +1036,118 @@ def main():
                     col1, col2, col3 = st.columns(3)
                     
                     with col1:
-                        if st.button("🗑️ Limpar Revisões"):
-                            st.session_state.dados_revisao = {}
+                        if st.button("🗑️ Limpar Revisões do Mês",
+                                     help="Remove as revisões do mês selecionado para todos os usuários"):
+                            limpar_revisoes(mes_selecionado, ano_selecionado)
                             st.rerun()
                     
                     with col2:
-                        # Download das revisões
-                        if st.session_state.dados_revisao:
-                            revisoes_json = json.dumps(st.session_state.dados_revisao, indent=2, default=str)
+                        # Download do diário de revisões (montado só no clique, em streaming do disco)
+                        if get_revisoes():
                             st.download_button(
                                 "💾 Salvar Revisões",
-                                data=revisoes_json,
-                                file_name=f"revisoes_{mes_selecionado}_{ano_selecionado}_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
-                                mime="application/json",
-                                help="Baixa as revisões para não perder os dados"
+                                data=lambda: ''.join(diario.exportar()),
+                                file_name=f"revisoes_{mes_selecionado}_{ano_selecionado}_{datetime.now().strftime('%Y%m%d_%H%M')}.jsonl",
+                                mime="application/x-ndjson",
+                                help="Baixa o diário de revisões (JSON Lines) para não perder os dados"
                             )
                     
                     with col3:
+                        mensagem = st.session_state.pop('mensagem_carga_revisoes', None)
+                        if mensagem:
+                            st.toast(mensagem)
+                        
                         # Upload de revisões anteriores
                         uploaded_revisoes = st.file_uploader(
                             "📂 Carregar Revisões",
-                            type=['json'],
-                            help="Carrega revisões salvas anteriormente",
+                            type=['jsonl', 'json'],
+                            help="Carrega um diário de revisões (.jsonl) ou um arquivo .json salvo anteriormente",
                             key="upload_revisoes"
                         )
+                        desde_seq = st.number_input(
+                            "Reproduzir a partir do seq",
+                            min_value=0,
+                            value=0,
+                            step=1,
+                            help="Ignora os eventos do diário com seq menor (0 = diário inteiro)",
+                            key="upload_revisoes_desde"
+                        )
                         
-                        if uploaded_revisoes is not None:
+                        # Carregar cada arquivo uma vez só (o uploader mantém o arquivo entre reruns)
+                        if uploaded_revisoes is not None and uploaded_revisoes.file_id != st.session_state.get('revisoes_carregadas_id'):
                             try:
-                                revisoes_carregadas = json.load(uploaded_revisoes)
-                                st.session_state.dados_revisao.update(revisoes_carregadas)
-                                st.success("✅ Revisões carregadas!")
+                                if uploaded_revisoes.name.endswith('.jsonl'):
+                                    # Diário: eventos reproduzidos linha a linha, sem carregar o arquivo inteiro como JSON
+                                    gravadas, removidas, ignoradas = carregar_diario(
+                                        repositorio, uploaded_revisoes, int(desde_seq), mes_selecionado, ano_selecionado
+                                    )
+                                else:
+                                    gravadas, removidas, ignoradas = carregar_revisoes(
+                                        repositorio, json.load(uploaded_revisoes), mes_selecionado, ano_selecionado
+                                    )
+                                diario.sincronizar(repositorio)
+                                st.session_state.revisoes_carregadas_id = uploaded_revisoes.file_id
+                                # Revisões do arquivo mais antigas que as gravadas não passam por cima delas
+                                st.session_state.mensagem_carga_revisoes = (
+                                    f"✅ Revisões carregadas: {gravadas} gravadas, {removidas} removidas, "
+                                    f"{ignoradas} ignoradas por serem mais antigas"
+                                )
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"❌ Erro ao carregar: {str(e)}")
                     
-                    # Alerta sobre persistência
-                    st.warning("⚠️ **IMPORTANTE**: As revisões não persistem entre sessões. Use 'Salvar Revisões' regularmente!")
+                    # Informação sobre persistência
+                    st.info("💾 As revisões ficam gravadas no repositório compartilhado e valem para todas as sessões. Use 'Salvar Revisões' para uma cópia de segurança.")
+                    
+                    # Consolidação dos arquivos de revisão de vários GCs
+                    consolidar_revisoes(mes_selecionado, ano_selecionado)
                     
                     # Filtros adicionais
                     st.header("🔍 Filtros")
                     
                     if len(df_mes) > 0:
-                        # Filtro de Status de Crédito
-                        status_credito_disponiveis = ['Todos'] + sorted(df_mes['Status crédito'].dropna().unique().tolist())
+                        # Opções já ordenadas pelo índice de filtros do mês
+                        status_credito_disponiveis = ['Todos'] + agregados.opcoes('Status crédito')
                         status_credito_selecionado = st.selectbox("Status de Crédito", status_credito_disponiveis, key="status_credito_filter")
                         
-                        diretorias_disponiveis = ['Todas'] + sorted(df_mes['DIRETORIA'].dropna().unique().tolist())
+                        diretorias_disponiveis = ['Todas'] + agregados.opcoes('DIRETORIA')
                         diretoria_selecionada = st.selectbox("Diretoria", diretorias_disponiveis)
                         
-                        grupos_disponiveis = ['Todos'] + sorted(df_mes['Grupo'].dropna().unique().tolist())
+                        grupos_disponiveis = ['Todos'] + agregados.opcoes('Grupo')
                         grupo_selecionado = st.selectbox("Grupo de Produto", grupos_disponiveis)
                         
                         status_revisao = st.selectbox(
                             "Status da Revisão", 
-                            ['Todos', 'Revisados', 'Pendentes', 'Com Data Alterada']
+                            STATUS_REVISAO
                         )
         
         # Conteúdo principal
-        if uploaded_file is not None and st.session_state.df_original is not None:
+        carteira = get_carteira() if uploaded_file is not None else None
+        if carteira is not None:
             # Filtrar por mês de trabalho
-            df_mes = filtrar_por_mes_trabalho(st.session_state.df_original, mes_selecionado, ano_selecionado)
-            df = apply_revisoes_to_dataframe(df_mes)
+            df_mes = filtrar_por_mes_trabalho(carteira['df'], mes_selecionado, ano_selecionado, carteira['indice'])
+            with etapa('apply_revisoes_to_dataframe', len(df_mes)):
+                df = apply_revisoes_to_dataframe(df_mes)
             
             if len(df) == 0:
                 st.warning(f"⚠️ Nenhum registro encontrado para {calendar.month_name[mes_selecionado]}/{ano_selecionado}")
                 st.stop()
             
-            # Aplicar filtros adicionais
-            df_filtrado = df.copy()
-            
-            # Filtro por status de crédito
-            if status_credito_selecionado != 'Todos':
-                df_filtrado = df_filtrado[df_filtrado['Status crédito'] == status_credito_selecionado]
-            
-            if diretoria_selecionada != 'Todas':
-                df_filtrado = df_filtrado[df_filtrado['DIRETORIA'] == diretoria_selecionada]
-            
-            if grupo_selecionado != 'Todos':
-                df_filtrado = df_filtrado[df_filtrado['Grupo'] == grupo_selecionado]
-            
-            if status_revisao == 'Revisados':
-                df_filtrado = df_filtrado[df_filtrado['Revisao_Realizada'] == True]
-            elif status_revisao == 'Pendentes':
-                df_filtrado = df_filtrado[df_filtrado['Revisao_Realizada'] == False]
-            elif status_revisao == 'Com Data Alterada':
-                df_filtrado = df_filtrado[df_filtrado['Data_Original_Alterada'] == True]
-            
-            # Métricas principais - Carteira Total vs Filtrada
-            metricas = calculate_metrics(df_filtrado)
-            metricas_geral = calculate_metrics(df)
+            # Métricas principais - Carteira Total vs Filtrada, ambas do índice de agregados
+            # (os filtros são máscaras pré-calculadas combinadas por AND, sem copiar o DataFrame)
+            with etapa('metricas', len(df)):
+                agregados = get_agregados_mes(df_mes, mes_selecionado, ano_selecionado)
+                metricas_geral = agregados.metricas()
+                mascara = agregados.mascara(
+                    {
+                        'Status crédito': status_credito_selecionado,
+                        'DIRETORIA': diretoria_selecionada,
+                        'Grupo': grupo_selecionado,
+                    },
+                    status_revisao
+                )
+                filtros_ativos = mascara is not None
+                metricas = agregados.metricas(mascara) if filtros_ativos else metricas_geral
             
             # Header com informação do mês
             st.header(f"📈 Métricas da Carteira - {calendar.month_name[mes_selecionado]}/{ano_selecionado}")
@@ -583,8 +1172,7 @@ def main():
                 st.metric("% Alterações", f"{metricas_geral['perc_alteracao']:.1f}%")
             
             # Métricas com filtros aplicados (se houver)
-            if (status_credito_selecionado != 'Todos' or diretoria_selecionada != 'Todas' or 
-                grupo_selecionado != 'Todos' or status_revisao != 'Todos'):
+            if filtros_ativos:
                 
                 st.subheader("🔍 Visão Filtrada")
                 col1, col2, col3, col4, col5 = st.columns(5)
@@ -617,246 +1205,134 @@ def main():
             # Análise específica por Status de Crédito
             st.header("💳 Análise por Status de Crédito")
             
-            # Métricas de crédito
-            credito_stats = df.groupby('Status crédito').agg({
-                'Ord.venda': 'count',
-                'Vl.Saldo': 'sum',
-                'Saldo': 'sum',
-                'Revisao_Realizada': ['sum', 'count'],
-                'Data_Original_Alterada': 'sum'
-            }).round(2)
-            
-            credito_stats.columns = ['Qtd_Pedidos', 'Valor_Total', 'Volume_Total', 'Revisados', 'Total_Rev', 'Alterados']
-            credito_stats['Valor_MM'] = (credito_stats['Valor_Total'] / 1_000_000).round(1)
-            credito_stats['Perc_Revisao'] = (credito_stats['Revisados'] / credito_stats['Total_Rev'] * 100).round(1)
-            credito_stats['Perc_Alteracao'] = (credito_stats['Alterados'] / credito_stats['Total_Rev'] * 100).round(1)
-            credito_stats = credito_stats.reset_index()
+            with etapa('graficos_credito'):
+                # Métricas de crédito
+                credito_stats = agregados.resumo('Status crédito')
             
-            col1, col2 = st.columns(2)
+                col1, col2 = st.columns(2)
             
-            with col1:
-                # Tabela resumo por status de crédito
-                st.subheader("📋 Resumo por Status de Crédito")
-                st.dataframe(
-                    credito_stats[['Status crédito', 'Qtd_Pedidos', 'Valor_MM', 'Volume_Total', 'Perc_Revisao', 'Perc_Alteracao']],
-                    column_config={
-                        "Status crédito": "Status de Crédito",
-                        "Qtd_Pedidos": "Qtd. Pedidos",
-                        "Valor_MM": "Valor (R$ MM)",
-                        "Volume_Total": "Volume Total",
-                        "Perc_Revisao": "% Revisão",
-                        "Perc_Alteracao": "% Alteração"
-                    },
-                    use_container_width=True,
-                    hide_index=True
-                )
+                with col1:
+                    # Tabela resumo por status de crédito
+                    st.subheader("📋 Resumo por Status de Crédito")
+                    st.dataframe(
+                        credito_stats[['Status crédito', 'Qtd_Pedidos', 'Valor_MM', 'Volume_Total', 'Perc_Revisao', 'Perc_Alteracao']],
+                        column_config={
+                            "Status crédito": "Status de Crédito",
+                            "Qtd_Pedidos": "Qtd. Pedidos",
+                            "Valor_MM": "Valor (R$ MM)",
+                            "Volume_Total": "Volume Total",
+                            "Perc_Revisao": "% Revisão",
+                            "Perc_Alteracao": "% Alteração"
+                        },
+                        use_container_width=True,
+                        hide_index=True
+                    )
             
-            with col2:
-                # Gráfico de distribuição por status de crédito
-                fig_credito = px.pie(
-                    credito_stats,
-                    values='Valor_MM',
-                    names='Status crédito',
-                    title='Distribuição de Valor por Status de Crédito (R$ MM)',
-                    color_discrete_map={
-                        'Liberados': '#28a745',
-                        'Não liberado': '#dc3545',
-                        'Bloqueados': '#ffc107'
-                    }
-                )
-                fig_credito.update_layout(height=400)
-                st.plotly_chart(fig_credito, use_container_width=True)
+                with col2:
+                    # Gráfico de distribuição por status de crédito
+                    fig_credito = figuras.pizza(
+                        credito_stats,
+                        valores='Valor_MM',
+                        nomes='Status crédito',
+                        titulo='Distribuição de Valor por Status de Crédito (R$ MM)',
+                        cores={
+                            'Liberados': '#28a745',
+                            'Não liberado': '#dc3545',
+                            'Bloqueados': '#ffc107'
+                        },
+                        altura=400
+                    )
+                    st.plotly_chart(fig_credito, use_container_width=True)
             
             # Gráficos de análise
             st.header("📊 Análise por Diretoria")
             
-            col1, col2 = st.columns(2)
+            with etapa('graficos_diretoria'):
+                col1, col2 = st.columns(2)
             
-            with col1:
-                # Gráfico de % de revisão por diretoria
-                revisao_diretoria = df.groupby('DIRETORIA').agg({
-                    'Revisao_Realizada': ['count', 'sum'],
-                    'Data_Original_Alterada': 'sum'
-                }).round(2)
-                revisao_diretoria.columns = ['Total', 'Revisados', 'Alterados']
-                revisao_diretoria['Perc_Revisao'] = (revisao_diretoria['Revisados'] / revisao_diretoria['Total'] * 100).round(1)
-                revisao_diretoria['Perc_Alteracao'] = (revisao_diretoria['Alterados'] / revisao_diretoria['Total'] * 100).round(1)
-                revisao_diretoria = revisao_diretoria.reset_index()
+                with col1:
+                    # Gráfico de % de revisão por diretoria
+                    revisao_diretoria = agregados.resumo('DIRETORIA')
                 
-                fig_revisao = px.bar(
-                    revisao_diretoria,
-                    x='DIRETORIA',
-                    y=['Perc_Revisao', 'Perc_Alteracao'],
-                    title='% Revisão e % Alteração por Diretoria',
-                    labels={'value': '% ', 'DIRETORIA': 'Diretoria'},
-                    barmode='group'
-                )
-                fig_revisao.update_layout(height=400)
-                st.plotly_chart(fig_revisao, use_container_width=True)
+                    fig_revisao = figuras.barras(
+                        revisao_diretoria,
+                        x='DIRETORIA',
+                        y=['Perc_Revisao', 'Perc_Alteracao'],
+                        titulo='% Revisão e % Alteração por Diretoria',
+                        rotulos={'value': '% ', 'DIRETORIA': 'Diretoria'},
+                        modo='group',
+                        altura=400
+                    )
+                    st.plotly_chart(fig_revisao, use_container_width=True)
             
-            with col2:
-                # Gráfico de valor por diretoria
-                valor_diretoria = df.groupby('DIRETORIA')['Vl.Saldo'].sum() / 1_000_000
-                valor_diretoria = valor_diretoria.reset_index()
+                with col2:
+                    # Gráfico de valor por diretoria
+                    valor_diretoria = revisao_diretoria[['DIRETORIA', 'Valor_Total']].rename(columns={'Valor_Total': 'Vl.Saldo'})
+                    valor_diretoria['Vl.Saldo'] = valor_diretoria['Vl.Saldo'] / 1_000_000
                 
-                fig_valor = px.pie(
-                    valor_diretoria,
-                    values='Vl.Saldo',
-                    names='DIRETORIA',
-                    title='Distribuição de Valor por Diretoria (R$ MM)'
-                )
-                fig_valor.update_layout(height=400)
-                st.plotly_chart(fig_valor, use_container_width=True)
+                    fig_valor = figuras.pizza(
+                        valor_diretoria,
+                        valores='Vl.Saldo',
+                        nomes='DIRETORIA',
+                        titulo='Distribuição de Valor por Diretoria (R$ MM)',
+                        altura=400
+                    )
+                    st.plotly_chart(fig_valor, use_container_width=True)
             
             # Seção de links personalizados
             st.header("🔗 Links Personalizados para GCs")
             
-            links_gc = generate_personalized_links(df, mes_selecionado, ano_selecionado)
-            
-            # Tabela com informações dos GCs e ações
-            dados_links = []
-            for gc, info in links_gc.items():
-                revisados = df[(df['GC'] == gc) & (df['Revisao_Realizada'] == True)].shape[0]
-                total_gc = df[df['GC'] == gc].shape[0]
-                perc_rev = (revisados / total_gc * 100) if total_gc > 0 else 0
-                
-                dados_links.append({
-                    'GC': gc,
-                    'Total_Pedidos': info['pedidos'],
-                    'Valor_MM': f"R$ {info['valor']:.1f}M",
-                    'Volume': f"{info['volume']:,.0f}",
-                    'Revisados': f"{revisados}/{total_gc}",
-                    'Perc_Revisao': f"{perc_rev:.1f}%",
-                    'Link': info['link']
-                })
-            
-            df_links = pd.DataFrame(dados_links)
-            
-            # Mostrar tabela com links
-            st.subheader("🔗 Links e Informações por GC")
-            st.dataframe(
-                df_links,
-                column_config={
-                    "Link": st.column_config.LinkColumn(
-                        "Link Personalizado",
-                        help="Link direto para o GC fazer a revisão"
-                    ),
-                    "GC": "Gerente Comercial",
-                    "Total_Pedidos": "Qtd. Pedidos",
-                    "Valor_MM": "Valor (MM)",
-                    "Volume": "Volume Total",
-                    "Revisados": "Revisados",
-                    "Perc_Revisao": "% Revisão"
-                },
-                use_container_width=True,
-                hide_index=True
-            )
+            with etapa('get_links_gc', len(df)):
+                links_gc = get_links_gc(df, mes_selecionado, ano_selecionado)
             
-            # Informação sobre sistema de e-mails local
-            st.info("💡 **Para envio de e-mails:** Use o script local `outlook.py` para integração total com Outlook corporativo")
-            st.header("📊 Detalhamento por GC e Grupo")
+            with etapa('tabela_links', len(links_gc)):
+                # Tabela com informações dos GCs e ações (progresso já vem calculado nos links)
+                dados_links = []
+                for gc, info in links_gc.items():
+                    dados_links.append({
+                        'GC': gc,
+                        'Total_Pedidos': info['pedidos'],
+                        'Valor_MM': f"R$ {info['valor']:.1f}M",
+                        'Volume': f"{info['volume']:,.0f}",
+                        'Revisados': f"{info['revisados']}/{info['pedidos']}",
+                        'Perc_Revisao': f"{info['perc_revisao']:.1f}%",
+                        'Link': info['link']
+                    })
             
-            gc_detalhes = st.selectbox(
-                "Selecione um GC para ver detalhes:",
-                ["Selecione..."] + list(links_gc.keys()),
-                key="gc_detalhes_select"
-            )
+                df_links = pd.DataFrame(dados_links)
             
-            if gc_detalhes != "Selecione...":
-                info_gc = links_gc[gc_detalhes]
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.subheader(f"📋 Resumo - {gc_detalhes}")
-                    st.metric("Pedidos", info_gc['pedidos'])
-                    st.metric("Valor", f"R$ {info_gc['valor']:.1f}M")
-                    st.metric("Volume", f"{info_gc['volume']:,.0f}")
-                
-                with col2:
-                    st.subheader("📦 Por Grupo de Produto")
-                    st.dataframe(
-                        info_gc['grupos'],
-                        column_config={
-                            "Grupo": "Grupo de Produto",
-                            "Qtd_Pedidos": "Qtd. Pedidos",
-                            "Valor_MM": "Valor (R$ MM)",
-                            "Volume_Total": "Volume Total"
-                        },
-                        use_container_width=True,
-                        hide_index=True
-                    )
-                
-                # Gráfico específico do GC
-                fig_gc = px.bar(
-                    info_gc['grupos'],
-                    x='Grupo',
-                    y='Valor_MM',
-                    title=f'Valor por Grupo - {gc_detalhes}',
-                    labels={'Valor_MM': 'Valor (R$ MM)', 'Grupo': 'Grupo de Produto'}
+                # Mostrar tabela com links
+                st.subheader("🔗 Links e Informações por GC")
+                st.dataframe(
+                    df_links,
+                    column_config={
+                        "Link": st.column_config.LinkColumn(
+                            "Link Personalizado",
+                            help="Link direto para o GC fazer a revisão"
+                        ),
+                        "GC": "Gerente Comercial",
+                        "Total_Pedidos": "Qtd. Pedidos",
+                        "Valor_MM": "Valor (MM)",
+                        "Volume": "Volume Total",
+                        "Revisados": "Revisados",
+                        "Perc_Revisao": "% Revisão"
+                    },
+                    use_container_width=True,
+                    hide_index=True
                 )
-                fig_gc.update_xaxes(tickangle=45)
-                st.plotly_chart(fig_gc, use_container_width=True)
+            
+            # Envio dos links por e-mail
+            enviar_links(links_gc, mes_selecionado, ano_selecionado)
+            st.header("📊 Detalhamento por GC e Grupo")
+            
+            detalhamento_gc(links_gc)
             
             # Resumo de revisões realizadas
-            if st.session_state.dados_revisao:
-                st.header("📋 Resumo das Revisões Realizadas")
-                
-                revisoes_df = []
-                for ordem, dados in st.session_state.dados_revisao.items():
-                    # Buscar informações da ordem no dataframe
-                    ordem_info = df[df['Ord.venda'] == ordem]
-                    cliente = ordem_info['Nome Emissor'].iloc[0] if not ordem_info.empty else 'N/A'
-                    grupo = ordem_info['Grupo'].iloc[0] if not ordem_info.empty else 'N/A'
-                    
-                    revisoes_df.append({
-                        'Ordem': ordem,
-                        'GC': dados['gc'],
-                        'Cliente': cliente,
-                        'Grupo': grupo,
-                        'Data_Revisao': pd.to_datetime(dados['data_revisao']).strftime('%d/%m/%Y %H:%M'),
-                        'Acao': 'Data Alterada' if dados['nova_data'] else 'Confirmado',
-                        'Nova_Data': pd.to_datetime(dados['nova_data']).strftime('%d/%m/%Y') if dados['nova_data'] else '-',
-                        'Justificativa': dados.get('justificativa', '-')
-                    })
-                
-                if revisoes_df:
-                    df_revisoes = pd.DataFrame(revisoes_df)
-                    
-                    # Filtros para revisões
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        gc_filtro_rev = st.selectbox(
-                            "Filtrar por GC:",
-                            ["Todos"] + sorted(df_revisoes['GC'].unique().tolist()),
-                            key="gc_filtro_revisoes"
-                        )
-                    with col2:
-                        acao_filtro_rev = st.selectbox(
-                            "Filtrar por Ação:",
-                            ["Todas", "Confirmado", "Data Alterada"],
-                            key="acao_filtro_revisoes"
-                        )
-                    
-                    # Aplicar filtros
-                    df_rev_filtrado = df_revisoes.copy()
-                    if gc_filtro_rev != "Todos":
-                        df_rev_filtrado = df_rev_filtrado[df_rev_filtrado['GC'] == gc_filtro_rev]
-                    if acao_filtro_rev != "Todas":
-                        df_rev_filtrado = df_rev_filtrado[df_rev_filtrado['Acao'] == acao_filtro_rev]
-                    
-                    st.dataframe(df_rev_filtrado, use_container_width=True, hide_index=True)
-                    
-                    # Botão para exportar revisões
-                    if st.button("📊 Exportar Revisões (CSV)"):
-                        csv = df_rev_filtrado.to_csv(index=False)
-                        st.download_button(
-                            label="💾 Baixar CSV",
-                            data=csv,
-                            file_name=f"revisoes_carteira_{mes_selecionado}_{ano_selecionado}.csv",
-                            mime="text/csv"
-                        )
-        
+            resumo_revisoes(df, mes_selecionado, ano_selecionado)
+            
+            # Exportação da carteira do mês com as revisões
+            exportar_carteira(df, mes_selecionado, ano_selecionado)
+    
         else:
             # Tela inicial
             st.info("👆 Faça upload do arquivo Excel da carteira na barra lateral para começar")
@@ -878,10 +1354,10 @@ def main():
             - Resumo por grupo de produtos
             - Duas ações: ✅ Confirmar ou 📅 Alterar data
             
-            **3. E-mails Automáticos via Script Local:**
-            - Use o script `outlook.py` para integração total com Outlook
-            - Resolução automática de nomes GAL
-            - Assinatura corporativa automática
+            **3. E-mails com os Links:**
+            - Envio direto pelo dashboard (SMTP configurado em `CARTEIRA_SMTP_*`)
+            - Uma mensagem por GC com link, progresso e resumo por grupo
+            - Campanha retomável: quem já recebeu não recebe de novo
             
             **4. Métricas Acompanhadas:**
             - % de pedidos revisados
@@ -0,0 +1 @@
+"""Módulos de apoio do Dashboard de Revisão da Carteira"""
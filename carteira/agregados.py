@@ -0,0 +1,209 @@
+"""Agregados incrementais (KPIs e quebras por dimensão) de um mês da carteira"""
+import numpy as np
+import pandas as pd
+
+# Dimensões com quebra pré-calculada
+DIMENSOES = ['Status crédito', 'DIRETORIA', 'GC', 'Grupo']
+
+# Somas mantidas por valor de cada dimensão
+COLUNAS_SOMA = ['Qtd_Pedidos', 'Valor_Total', 'Volume_Total', 'Total', 'Revisados', 'Alterados']
+
+# Dimensões dos filtros da sidebar, com uma máscara pré-calculada por valor
+DIMENSOES_FILTRO = ['Status crédito', 'DIRETORIA', 'Grupo']
+
+# Filtros de status da revisão
+STATUS_REVISAO = ['Todos', 'Revisados', 'Pendentes', 'Com Data Alterada']
+
+
+# Função para calcular métricas
+def calculate_metrics(df):
+    """Calcula métricas principais (recalculando sobre o DataFrame inteiro)"""
+    total_registros = len(df)
+    total_valor = df['Vl.Saldo'].sum() / 1_000_000  # Converter para milhões
+    total_volume = df['Saldo'].sum()
+    registros_revisados = df['Revisao_Realizada'].sum()
+    registros_alterados = df['Data_Original_Alterada'].sum()
+    perc_revisao = (registros_revisados / total_registros * 100) if total_registros > 0 else 0
+    perc_alteracao = (registros_alterados / total_registros * 100) if total_registros > 0 else 0
+
+    return {
+        'total_registros': total_registros,
+        'total_valor': total_valor,
+        'total_volume': total_volume,
+        'registros_revisados': registros_revisados,
+        'registros_alterados': registros_alterados,
+        'perc_revisao': perc_revisao,
+        'perc_alteracao': perc_alteracao
+    }
+
+
+class AgregadosCarteira:
+    """Somas por dimensão de um mês, montadas uma vez e atualizadas por delta a cada revisão.
+
+    Deve ser construído com o mês *antes* de aplicar as revisões; as revisões
+    entram por `atualizar_ordem`, que recebe o estado atual da revisão da ordem
+    (ou None quando a revisão foi removida).
+
+    Também serve de índice dos filtros: uma máscara booleana por valor das
+    dimensões de filtro, as opções ordenadas e os estados de revisão por linha
+    (atualizados pelas mesmas revisões), combinados por `mascara`.
+    """
+
+    def __init__(self, df, dimensoes=DIMENSOES):
+        self.dimensoes = [d for d in dimensoes if d in df.columns]
+
+        valor = np.nan_to_num(df['Vl.Saldo'].to_numpy(dtype='float64', na_value=np.nan))
+        volume = np.nan_to_num(df['Saldo'].to_numpy(dtype='float64', na_value=np.nan))
+        self._valor = valor
+        self._volume = volume
+        tem_ordem = df['Ord.venda'].notna().to_numpy()
+
+        # Estado de cada linha: como veio do arquivo e como está após as revisões
+        self._revisado_original = df['Revisao_Realizada'].fillna(False).astype(bool).to_numpy()
+        self._alterado_original = df['Data_Original_Alterada'].fillna(False).astype(bool).to_numpy()
+        self._revisado = self._revisado_original.copy()
+        self._alterado = self._alterado_original.copy()
+
+        # Posições das linhas de cada ordem (uma ordem pode ocupar várias linhas)
+        self._posicoes = df.groupby('Ord.venda', sort=False).indices if len(df) else {}
+
+        self.totais = {
+            'registros': len(df),
+            'valor': float(valor.sum()),
+            'volume': float(volume.sum()),
+            'revisados': int(self._revisado.sum()),
+            'alterados': int(self._alterado.sum()),
+        }
+
+        self._codigos = {}
+        self._categorias = {}
+        self._somas = {}
+        for dim in self.dimensoes:
+            codigos, categorias = pd.factorize(df[dim], sort=True)
+            validos = codigos >= 0
+            c = codigos[validos]
+            n = len(categorias)
+            self._codigos[dim] = codigos
+            self._categorias[dim] = pd.Index(categorias)
+            self._somas[dim] = {
+                'Qtd_Pedidos': np.bincount(c, weights=tem_ordem[validos], minlength=n),
+                'Valor_Total': np.bincount(c, weights=valor[validos], minlength=n),
+                'Volume_Total': np.bincount(c, weights=volume[validos], minlength=n),
+                'Total': np.bincount(c, minlength=n).astype('float64'),
+                'Revisados': np.bincount(c, weights=self._revisado[validos], minlength=n),
+                'Alterados': np.bincount(c, weights=self._alterado[validos], minlength=n),
+            }
+
+        # Índice dos filtros: máscara por valor (a categoria k é a posição k das opções)
+        self._mascaras = {
+            dim: [self._codigos[dim] == k for k in range(len(self._categorias[dim]))]
+            for dim in DIMENSOES_FILTRO if dim in self._codigos
+        }
+
+    def _posicoes_da_ordem(self, ordem):
+        posicoes = self._posicoes.get(ordem)
+        if posicoes is None and isinstance(ordem, str):
+            # Chaves vindas de JSON chegam como texto
+            try:
+                posicoes = self._posicoes.get(int(ordem))
+            except ValueError:
+                pass
+        return posicoes
+
+    def atualizar_ordem(self, ordem, revisao):
+        """Aplica o delta de uma ordem cujo estado de revisão mudou (O(linhas da ordem))"""
+        posicoes = self._posicoes_da_ordem(ordem)
+        if posicoes is None:
+            return
+
+        revisado = self._revisado_original[posicoes] | (revisao is not None)
+        alterado = self._alterado_original[posicoes] | (revisao is not None and bool(revisao.get('nova_data')))
+        delta_revisado = revisado.astype(int) - self._revisado[posicoes]
+        delta_alterado = alterado.astype(int) - self._alterado[posicoes]
+        if not delta_revisado.any() and not delta_alterado.any():
+            return
+
+        self.totais['revisados'] += int(delta_revisado.sum())
+        self.totais['alterados'] += int(delta_alterado.sum())
+        for dim in self.dimensoes:
+            codigos = self._codigos[dim][posicoes]
+            validos = codigos >= 0
+            np.add.at(self._somas[dim]['Revisados'], codigos[validos], delta_revisado[validos])
+            np.add.at(self._somas[dim]['Alterados'], codigos[validos], delta_alterado[validos])
+
+        self._revisado[posicoes] = revisado
+        self._alterado[posicoes] = alterado
+
+    def atualizar(self, revisoes):
+        """Aplica vários pares (ordem, revisão)"""
+        for ordem, revisao in revisoes:
+            self.atualizar_ordem(ordem, revisao)
+
+    def opcoes(self, dim):
+        """Valores distintos (ordenados) de uma dimensão do mês"""
+        return self._categorias[dim].tolist() if dim in self._categorias else []
+
+    def mascara(self, filtros, status_revisao='Todos'):
+        """AND das máscaras dos filtros {dimensão: valor}; None quando nenhum filtro está ativo.
+
+        Valores ausentes das opções (ex.: "Todos") não filtram a dimensão.
+        """
+        mascara = None
+        for dim, valor in filtros.items():
+            posicao = self._categorias[dim].get_indexer([valor])[0] if dim in self._mascaras else -1
+            if posicao < 0:
+                continue
+            parcial = self._mascaras[dim][posicao]
+            mascara = parcial.copy() if mascara is None else np.logical_and(mascara, parcial, out=mascara)
+
+        if status_revisao == 'Revisados':
+            parcial = self._revisado
+        elif status_revisao == 'Pendentes':
+            parcial = ~self._revisado
+        elif status_revisao == 'Com Data Alterada':
+            parcial = self._alterado
+        else:
+            return mascara
+        return parcial.copy() if mascara is None else np.logical_and(mascara, parcial, out=mascara)
+
+    def metricas(self, mascara=None):
+        """Mesmo dicionário de calculate_metrics, sem reagregar o mês (ou só das linhas da máscara)"""
+        if mascara is not None:
+            total = int(mascara.sum())
+            revisados = int(self._revisado[mascara].sum())
+            alterados = int(self._alterado[mascara].sum())
+            return {
+                'total_registros': total,
+                'total_valor': float(self._valor[mascara].sum()) / 1_000_000,
+                'total_volume': float(self._volume[mascara].sum()),
+                'registros_revisados': revisados,
+                'registros_alterados': alterados,
+                'perc_revisao': (revisados / total * 100) if total > 0 else 0,
+                'perc_alteracao': (alterados / total * 100) if total > 0 else 0,
+            }
+
+        total = self.totais['registros']
+        return {
+            'total_registros': total,
+            'total_valor': self.totais['valor'] / 1_000_000,
+            'total_volume': self.totais['volume'],
+            'registros_revisados': self.totais['revisados'],
+            'registros_alterados': self.totais['alterados'],
+            'perc_revisao': (self.totais['revisados'] / total * 100) if total > 0 else 0,
+            'perc_alteracao': (self.totais['alterados'] / total * 100) if total > 0 else 0,
+        }
+
+    def resumo(self, dim):
+        """Tabela por valor da dimensão com quantidades, valores e % de revisão/alteração"""
+        somas = self._somas[dim]
+        resumo = pd.DataFrame({dim: self._categorias[dim]})
+        resumo['Qtd_Pedidos'] = somas['Qtd_Pedidos'].astype(int)
+        resumo['Valor_Total'] = somas['Valor_Total'].round(2)
+        resumo['Volume_Total'] = somas['Volume_Total'].round(2)
+        resumo['Total'] = somas['Total'].astype(int)
+        resumo['Revisados'] = somas['Revisados'].astype(int)
+        resumo['Alterados'] = somas['Alterados'].astype(int)
+        resumo['Valor_MM'] = (resumo['Valor_Total'] / 1_000_000).round(1)
+        resumo['Perc_Revisao'] = (resumo['Revisados'] / resumo['Total'] * 100).round(1)
+        resumo['Perc_Alteracao'] = (resumo['Alterados'] / resumo['Total'] * 100).round(1)
+        return resumo
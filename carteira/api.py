@@ -0,0 +1,454 @@
+"""API JSON opcional (ASGI) para a revisão dos GCs, sem sessão Streamlit por GC.
+
+Uso:
+    python -m carteira.api servir --porta 8502
+    python -m carteira.api carga --mes 2026-03 --clientes 50 --requisicoes 5000
+
+Usa a carteira atual publicada pelo dashboard (mesmo cache em disco), o mesmo
+hash dos links (generate_gc_hash), as visões por GC e mês e o mesmo
+repositório de revisões (CARTEIRA_REVISOES_DB, que precisa ser um arquivo para
+ser compartilhado com o dashboard). Todas as rotas de GC exigem mes, ano e
+hash na query string, como os links:
+
+    GET  /gcs/{gc}?mes=3&ano=2026&hash=...           totais e resumo por grupo
+    GET  /gcs/{gc}/pedidos?mes=3&ano=2026&hash=...   pedidos (status, grupo, inicio, limite)
+    POST /gcs/{gc}/revisoes?mes=3&ano=2026&hash=...  uma decisão ou {"decisoes": [...]}
+    GET  /saude                                      carteira atual e versão das revisões
+
+Uma decisão é {"ordem", "acao": "check" | "revisao", "nova_data": "AAAA-MM-DD",
+"justificativa"}. O acesso ao repositório e o trabalho com pandas rodam num
+pool fixo de threads (cada uma com a sua conexão SQLite), fora do laço de
+eventos. As linhas revisadas de cada GC ficam em memória e recebem só as
+revisões das suas ordens alteradas desde a última requisição. O diário de
+revisões não é gravado aqui: o dashboard registra as alterações da API na sua
+próxima sincronização.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+
+import pandas as pd
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from carteira.cache import CacheCarteira
+from carteira.links import generate_gc_hash
+from carteira.lote import ACOES_DECISAO
+from carteira.particao import filtrar_por_mes_trabalho
+from carteira.registro import RegistroCarteiras
+from carteira.repositorio import criar_repositorio, normalizar_ordem
+from carteira.revisoes import aplicar_revisoes, reaplicar_revisoes, tabela_revisoes
+from carteira.visoes import MAXIMO_PADRAO as MAXIMO_VISOES
+
+# Threads (e conexões com o repositório) do pool da API
+CONEXOES_PADRAO = int(os.environ.get('CARTEIRA_API_CONEXOES', '4'))
+PORTA_PADRAO = int(os.environ.get('CARTEIRA_API_PORTA', '8502'))
+
+# Máximo de decisões por requisição e de pedidos por página
+MAXIMO_DECISOES = 1000
+LIMITE_PEDIDOS = 100
+
+# Colunas de cada pedido na resposta
+COLUNAS_PEDIDO = ['Ord.venda', 'Nome Emissor', 'Desc. Material', 'Grupo', 'Vl.Saldo', 'Saldo', 'Status crédito',
+                  'Data_Trabalho', 'Revisao_Realizada', 'Data_Original_Alterada', 'Nova_Data_Entrega']
+
+
+class ErroAPI(Exception):
+    """Erro com status HTTP, devolvido como {"erro": mensagem}"""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class RevisoesGC:
+    """Linhas revisadas por (carteira, GC, mês, ano), compartilhadas entre as requisições.
+
+    A primeira leitura de um GC aplica todas as revisões às suas linhas. Depois,
+    as alterações do repositório são lidas uma única vez para todos os GCs e
+    entregues só às entradas donas das ordens alteradas, que as reaplicam na
+    próxima leitura; um GC sem alterações não tem custo além da consulta.
+    """
+
+    def __init__(self, repositorio, maximo=None):
+        self.repositorio = repositorio
+        self.maximo = maximo or MAXIMO_VISOES
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()  # chave -> {'df', 'pendentes', 'ordens'}
+        self._donos = {}  # ordem -> chaves das entradas com linhas dela (uma ordem pode ter linhas de vários GCs)
+        self._versao = None
+
+    def _descartar(self, chave, entrada):
+        """Tira a entrada descartada dos donos das suas ordens (sem donos, a ordem sai do mapa)"""
+        for ordem in entrada['ordens']:
+            donos = self._donos.get(ordem)
+            if donos is not None:
+                donos.discard(chave)
+                if not donos:
+                    del self._donos[ordem]
+
+    def _distribuir(self):
+        self._versao, alteradas = self.repositorio.alteracoes_desde(self._versao)
+        for ordem, revisao in alteradas:
+            for chave in self._donos.get(ordem, ()):
+                entrada = self._itens.get(chave)
+                if entrada is not None:
+                    entrada['pendentes'].append((ordem, revisao))
+
+    def obter(self, chave, df_gc):
+        """(versão, linhas do GC com as revisões) atualizadas até a versão atual do repositório"""
+        with self._lock:
+            if self._versao is None:
+                # Versão lida antes das revisões: alterações no meio do caminho voltam na próxima leitura
+                self._versao = self.repositorio.versao()
+            else:
+                self._distribuir()
+
+            entrada = self._itens.get(chave)
+            if entrada is None:
+                ordens = {normalizar_ordem(ordem) for ordem in df_gc['Ord.venda'].dropna().unique()}
+                entrada = {
+                    'df': aplicar_revisoes(df_gc, tabela_revisoes(self.repositorio.todas())),
+                    'pendentes': [],
+                    'ordens': ordens,
+                }
+                self._itens[chave] = entrada
+                for ordem in ordens:
+                    self._donos.setdefault(ordem, set()).add(chave)
+                while len(self._itens) > self.maximo:
+                    self._descartar(*self._itens.popitem(last=False))
+            else:
+                self._itens.move_to_end(chave)
+                if entrada['pendentes']:
+                    entrada['df'] = reaplicar_revisoes(entrada['df'], df_gc, entrada['pendentes'])
+                    entrada['pendentes'] = []
+            return self._versao, entrada['df']
+
+
+# Função para converter uma decisão recebida em revisão
+def _revisao(decisao, ordens_gc, gc, agora):
+    """Retorna (ordem, revisão) ou (ordem, motivo da rejeição)"""
+    if not isinstance(decisao, dict):
+        return None, "decisão não é um objeto"
+    ordem = normalizar_ordem(decisao.get('ordem'))
+    if ordem not in ordens_gc:
+        return ordem, "ordem não pertence ao GC"
+    acao = str(decisao.get('acao') or ('revisao' if decisao.get('nova_data') else 'check')).strip().lower()
+    if acao not in ACOES_DECISAO:
+        return ordem, f"ação inválida: {acao}"
+    nova_data = None
+    if acao == 'revisao':
+        if not decisao.get('nova_data'):
+            return ordem, "revisão sem nova data"
+        try:
+            nova_data = date.fromisoformat(str(decisao['nova_data'])[:10]).isoformat()
+        except ValueError:
+            return ordem, f"data inválida: {decisao['nova_data']!r}"
+    return ordem, {
+        'gc': gc,
+        'data_revisao': agora,
+        'nova_data': nova_data,
+        'justificativa': decisao.get('justificativa') or None,
+        'acao': acao
+    }
+
+
+# Função para converter linhas em registros JSON
+def _registros(df):
+    return json.loads(df.to_json(orient='records', date_format='iso', force_ascii=False))
+
+
+class ServicoRevisao:
+    """Operações da API sobre a carteira atual e o repositório (chamadas no pool de threads)"""
+
+    def __init__(self, registro=None, repositorio=None):
+        self.registro = registro or RegistroCarteiras(CacheCarteira())
+        self.repositorio = repositorio or criar_repositorio()
+        self.revisoes = RevisoesGC(self.repositorio)
+
+    def _carteira(self):
+        carteira = self.registro.atual()
+        if carteira is None:
+            raise ErroAPI(503, "Nenhuma carteira carregada no dashboard")
+        return carteira
+
+    def _linhas_gc(self, gc, mes, ano):
+        """(carteira, versão das revisões, linhas revisadas do GC, resumo por grupo)"""
+        carteira = self._carteira()
+        visao = carteira['visoes'].obter(gc, mes, ano)
+        if visao['df'].empty:
+            raise ErroAPI(404, "Nenhum pedido encontrado para este GC no período")
+        versao, df_gc = self.revisoes.obter((carteira['chave'], gc, mes, ano), visao['df'])
+        return carteira, versao, df_gc, visao['grupos']
+
+    def resumo(self, gc, mes, ano):
+        carteira, versao, df_gc, grupos = self._linhas_gc(gc, mes, ano)
+        pedidos = len(df_gc)
+        revisados = int(df_gc['Revisao_Realizada'].sum())
+        return {
+            'gc': gc,
+            'mes': mes,
+            'ano': ano,
+            'carteira': carteira['chave'][:16],
+            'versao': versao,
+            'pedidos': pedidos,
+            'valor_mm': round(float(df_gc['Vl.Saldo'].sum()) / 1_000_000, 2),
+            'volume': round(float(df_gc['Saldo'].sum()), 2),
+            'revisados': revisados,
+            'alterados': int(df_gc['Data_Original_Alterada'].sum()),
+            'perc_revisao': round(revisados / pedidos * 100, 1) if pedidos else 0.0,
+            'grupos': _registros(grupos),
+        }
+
+    def pedidos(self, gc, mes, ano, status='todos', grupo=None, inicio=0, limite=LIMITE_PEDIDOS):
+        _, versao, df_gc, _ = self._linhas_gc(gc, mes, ano)
+        if status == 'pendentes':
+            df_gc = df_gc[~df_gc['Revisao_Realizada'].astype(bool)]
+        elif status == 'revisados':
+            df_gc = df_gc[df_gc['Revisao_Realizada'].astype(bool)]
+        elif status != 'todos':
+            raise ErroAPI(400, f"Status inválido: {status} (use todos, pendentes ou revisados)")
+        if grupo:
+            df_gc = df_gc[df_gc['Grupo'] == grupo]
+        pagina = df_gc.iloc[inicio:inicio + limite]
+        return {
+            'versao': versao,
+            'total': len(df_gc),
+            'inicio': inicio,
+            'pedidos': _registros(pagina[[c for c in COLUNAS_PEDIDO if c in pagina.columns]]),
+        }
+
+    def revisar(self, gc, mes, ano, decisoes):
+        """Grava as decisões válidas em um único lote; retorna gravadas, versão e rejeitadas"""
+        carteira = self._carteira()
+        visao = carteira['visoes'].obter(gc, mes, ano)
+        ordens_gc = {normalizar_ordem(o): o for o in visao['df']['Ord.venda'].dropna().unique()}
+        agora = datetime.now().isoformat()
+
+        revisoes, ignoradas = {}, []
+        for decisao in decisoes:
+            ordem, resultado = _revisao(decisao, ordens_gc, gc, agora)
+            if isinstance(resultado, dict):
+                revisoes[ordens_gc[ordem]] = resultado
+            else:
+                ignoradas.append({'ordem': ordem, 'motivo': resultado})
+        versao = self.repositorio.registrar(revisoes, mes, ano) if revisoes else self.repositorio.versao()
+        return {'gravadas': len(revisoes), 'versao': versao, 'ignoradas': ignoradas}
+
+    def saude(self):
+        carteira = self.registro.atual()
+        return {'carteira': carteira['chave'][:16] if carteira else None, 'versao': self.repositorio.versao()}
+
+
+# Função para ler e validar mês, ano e hash de uma requisição de GC
+def _parametros_gc(request):
+    gc = request.path_params['gc']
+    try:
+        mes = int(request.query_params['mes'])
+        ano = int(request.query_params['ano'])
+    except (KeyError, ValueError):
+        raise ErroAPI(400, "Informe mes e ano") from None
+    if not 1 <= mes <= 12:
+        raise ErroAPI(400, f"Mês inválido: {mes}")
+    if request.query_params.get('hash') != generate_gc_hash(gc, mes, ano):
+        raise ErroAPI(403, "Link inválido ou expirado")
+    return gc, mes, ano
+
+
+# Função para criar a aplicação ASGI
+def criar_app(servico=None, conexoes=None):
+    """Aplicação Starlette; `servico` (ServicoRevisao) é criado no início se não for informado"""
+    estado = {'servico': servico}
+
+    @asynccontextmanager
+    async def ciclo_de_vida(app):
+        # Pool fixo: cada thread mantém a sua conexão com o repositório
+        estado['pool'] = ThreadPoolExecutor(max_workers=conexoes or CONEXOES_PADRAO, thread_name_prefix='api')
+        if estado['servico'] is None:
+            estado['servico'] = await asyncio.get_running_loop().run_in_executor(estado['pool'], ServicoRevisao)
+        try:
+            yield
+        finally:
+            estado['pool'].shutdown(wait=True)
+
+    async def executar(funcao, *args):
+        try:
+            resultado = await asyncio.get_running_loop().run_in_executor(estado['pool'], funcao, *args)
+        except ErroAPI as e:
+            return JSONResponse({'erro': str(e)}, status_code=e.status)
+        return JSONResponse(resultado)
+
+    async def resumo(request):
+        try:
+            parametros = _parametros_gc(request)
+        except ErroAPI as e:
+            return JSONResponse({'erro': str(e)}, status_code=e.status)
+        return await executar(estado['servico'].resumo, *parametros)
+
+    async def pedidos(request):
+        try:
+            parametros = _parametros_gc(request)
+            consulta = request.query_params
+            inicio = max(int(consulta.get('inicio', 0)), 0)
+            limite = min(max(int(consulta.get('limite', LIMITE_PEDIDOS)), 1), LIMITE_PEDIDOS * 10)
+        except ErroAPI as e:
+            return JSONResponse({'erro': str(e)}, status_code=e.status)
+        except ValueError:
+            return JSONResponse({'erro': "inicio e limite devem ser inteiros"}, status_code=400)
+        return await executar(estado['servico'].pedidos, *parametros, consulta.get('status', 'todos'),
+                              consulta.get('grupo'), inicio, limite)
+
+    async def revisoes(request):
+        try:
+            parametros = _parametros_gc(request)
+            corpo = await request.json()
+        except ErroAPI as e:
+            return JSONResponse({'erro': str(e)}, status_code=e.status)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return JSONResponse({'erro': "Corpo JSON inválido"}, status_code=400)
+        decisoes = corpo.get('decisoes', [corpo]) if isinstance(corpo, dict) else corpo
+        if not isinstance(decisoes, list) or not decisoes:
+            return JSONResponse({'erro': "Envie uma decisão ou {\"decisoes\": [...]}"}, status_code=400)
+        if len(decisoes) > MAXIMO_DECISOES:
+            return JSONResponse({'erro': f"Máximo de {MAXIMO_DECISOES} decisões por requisição"}, status_code=413)
+        return await executar(estado['servico'].revisar, *parametros, decisoes)
+
+    async def saude(request):
+        return await executar(estado['servico'].saude)
+
+    return Starlette(
+        routes=[
+            Route('/gcs/{gc}', resumo, methods=['GET']),
+            Route('/gcs/{gc}/pedidos', pedidos, methods=['GET']),
+            Route('/gcs/{gc}/revisoes', revisoes, methods=['POST']),
+            Route('/saude', saude, methods=['GET']),
+        ],
+        lifespan=ciclo_de_vida,
+    )
+
+
+# Função para fazer uma requisição HTTP/1.1 numa conexão mantida aberta
+async def _requisicao(leitor, escritor, host, metodo, caminho, corpo=None):
+    dados = json.dumps(corpo).encode() if corpo is not None else b''
+    cabecalho = (f"{metodo} {caminho} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(dados)}\r\n\r\n")
+    escritor.write(cabecalho.encode() + dados)
+    await escritor.drain()
+    status = int((await leitor.readline()).split()[1])
+    tamanho = 0
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b''):
+            break
+        nome, _, valor = linha.decode('latin-1').partition(':')
+        if nome.strip().lower() == 'content-length':
+            tamanho = int(valor)
+    await leitor.readexactly(tamanho)
+    return status
+
+
+# Função para gerar carga na API e medir vazão e latência
+async def testar_carga(url, gcs, mes, ano, clientes=20, requisicoes=1000, escrita=0.2, semente=0):
+    """Cada cliente mantém uma conexão e alterna GETs de resumo/pedidos e POSTs de decisão ('check').
+
+    `gcs` é {GC: [ordens]}; `escrita` é a fração de POSTs. Retorna vazão,
+    latências (ms) e contagem por status.
+    """
+    endereco = urllib.parse.urlsplit(url)
+    host, porta = endereco.hostname, endereco.port or 80
+    rng = random.Random(semente)
+    restantes = [requisicoes]
+    latencias, status = [], {}
+
+    async def cliente():
+        leitor, escritor = await asyncio.open_connection(host, porta)
+        try:
+            while restantes[0] > 0:
+                restantes[0] -= 1
+                gc = rng.choice(list(gcs))
+                consulta = urllib.parse.urlencode({'mes': mes, 'ano': ano, 'hash': generate_gc_hash(gc, mes, ano)})
+                base = f"/gcs/{urllib.parse.quote(str(gc))}"
+                inicio = time.perf_counter()
+                if rng.random() < escrita:
+                    decisao = {'ordem': str(rng.choice(gcs[gc])), 'acao': 'check'}
+                    codigo = await _requisicao(leitor, escritor, host, 'POST', f"{base}/revisoes?{consulta}", decisao)
+                elif rng.random() < 0.5:
+                    codigo = await _requisicao(leitor, escritor, host, 'GET', f"{base}?{consulta}")
+                else:
+                    codigo = await _requisicao(leitor, escritor, host, 'GET', f"{base}/pedidos?{consulta}&limite=25")
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                status[codigo] = status.get(codigo, 0) + 1
+        finally:
+            escritor.close()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(clientes)))
+    segundos = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        'requisicoes': len(latencias),
+        'segundos': round(segundos, 3),
+        'por_segundo': round(len(latencias) / segundos, 1),
+        'latencia_mediana_ms': round(statistics.median(latencias), 2),
+        'latencia_p95_ms': round(latencias[int(len(latencias) * 0.95) - 1], 2),
+        'latencia_max_ms': round(latencias[-1], 2),
+        'status': status,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m carteira.api',
+        description="API JSON para a revisão dos GCs (e teste de carga local)."
+    )
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    servir = comandos.add_parser('servir', help="Inicia a API com o uvicorn")
+    servir.add_argument('--host', default='127.0.0.1', help="Endereço (padrão: 127.0.0.1)")
+    servir.add_argument('--porta', type=int, default=PORTA_PADRAO, help="Porta (padrão: CARTEIRA_API_PORTA ou 8502)")
+    servir.add_argument('--conexoes', type=int, default=CONEXOES_PADRAO, help="Threads/conexões com o repositório")
+
+    carga = comandos.add_parser('carga', help="Gera carga numa API em execução usando os GCs da carteira atual")
+    carga.add_argument('--url', default=f"http://127.0.0.1:{PORTA_PADRAO}", help="URL da API")
+    carga.add_argument('--mes', required=True, help="AAAA-MM")
+    carga.add_argument('--clientes', type=int, default=20, help="Conexões simultâneas (padrão: 20)")
+    carga.add_argument('--requisicoes', type=int, default=1000, help="Total de requisições (padrão: 1000)")
+    carga.add_argument('--escrita', type=float, default=0.2, help="Fração de POSTs de decisão (padrão: 0.2)")
+    args = parser.parse_args(argv)
+
+    if args.comando == 'servir':
+        uvicorn.run(criar_app(conexoes=args.conexoes), host=args.host, port=args.porta, log_level='warning')
+        return 0
+
+    try:
+        periodo = pd.Period(args.mes, freq='M')
+    except ValueError:
+        parser.error(f"Mês inválido: {args.mes} (use AAAA-MM)")
+    carteira = RegistroCarteiras(CacheCarteira()).atual()
+    if carteira is None:
+        parser.error("Nenhuma carteira carregada no dashboard")
+    df_mes = filtrar_por_mes_trabalho(carteira['df'], periodo.month, periodo.year, carteira['indice'])
+    gcs = {gc: ordens.dropna().unique().tolist() for gc, ordens in df_mes.groupby('GC', observed=True)['Ord.venda']}
+    if not gcs:
+        parser.error(f"Nenhum pedido em {args.mes}")
+    resultado = asyncio.run(testar_carga(args.url, gcs, periodo.month, periodo.year,
+                                         args.clientes, args.requisicoes, args.escrita))
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
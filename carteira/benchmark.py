@@ -0,0 +1,183 @@
+"""Benchmark das etapas do pipeline sobre carteiras sintéticas, com saída em JSON.
+
+Uso:
+    python -m carteira.benchmark --linhas 10000,100000,1000000 --revisoes 1000 --saida bench.json
+
+Cada etapa é cronometrada `--repeticoes` vezes e executada mais uma vez sob
+tracemalloc para medir o pico de memória alocada. O JSON traz o ambiente, os
+parâmetros e um resultado por (linhas, etapa), para comparar execuções.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from carteira.agregados import AgregadosCarteira, calculate_metrics
+from carteira.carga import ler_carteira, tratar_carteira
+from carteira.exportacao import LINHAS_XLSX_MAXIMO
+from carteira.links import generate_personalized_links
+from carteira.particao import construir_indice_mensal, filtrar_por_mes_trabalho
+from carteira.revisoes import aplicar_revisoes, resumo_revisoes_realizadas, tabela_revisoes
+from carteira.sintetico import gerar_carteira, gerar_planilha
+
+VERSAO_RESULTADO = 1
+
+
+# Função para medir uma etapa
+def medir(funcao, repeticoes=3):
+    """Retorna (resultado, tempos em segundos, pico de memória em bytes)"""
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    # Execução extra só para a memória (tracemalloc deixa a execução mais lenta)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, tempos, pico
+
+
+# Função para gerar as revisões usadas no benchmark
+def revisoes_sinteticas(df_mes, quantidade, semente=0):
+    """{ordem: revisão} para `quantidade` ordens do mês (um terço com nova data)"""
+    rng = np.random.default_rng(semente)
+    ordens = df_mes['Ord.venda'].dropna().unique()
+    escolhidas = rng.choice(ordens, min(quantidade, len(ordens)), replace=False)
+    nova = (df_mes['Data_Trabalho'].max() + pd.Timedelta(days=10)).date().isoformat()
+    return {
+        int(ordem): {
+            'gc': 'GC 0000',
+            'data_revisao': '2026-01-15T10:00:00',
+            'nova_data': nova if i % 3 == 0 else None,
+            'justificativa': None,
+            'acao': 'revisao' if i % 3 == 0 else 'check'
+        }
+        for i, ordem in enumerate(escolhidas)
+    }
+
+
+# Função para rodar todas as etapas para um tamanho de carteira
+def executar(linhas, n_revisoes=1000, repeticoes=3, excel=False, semente=0, **cardinalidades):
+    """Lista de resultados {linhas, etapa, ...} para uma carteira de `linhas` linhas"""
+    bruto = gerar_carteira(linhas, semente=semente, **cardinalidades)
+    resultados = []
+
+    def registrar(etapa, funcao, **extra):
+        resultado, tempos, pico = medir(funcao, repeticoes)
+        resultados.append({
+            'linhas': linhas,
+            'etapa': etapa,
+            'segundos_mediana': statistics.median(tempos),
+            'segundos_min': min(tempos),
+            'segundos': tempos,
+            'pico_memoria_mb': pico / 1_048_576,
+            **extra
+        })
+        print(f"{linhas:>10,} {etapa:<36} {statistics.median(tempos):9.4f}s {pico / 1_048_576:9.1f} MB",
+              file=sys.stderr)
+        return resultado
+
+    if excel and linhas <= LINHAS_XLSX_MAXIMO:
+        conteudo = gerar_planilha(bruto)
+        registrar('leitura_excel', lambda: ler_carteira(conteudo), bytes_arquivo=len(conteudo))
+
+    df, relatorio, _ = registrar('load_data', lambda: tratar_carteira(bruto.copy()))
+    resultados[-1]['bytes_carteira'] = relatorio['bytes_depois']
+    indice = construir_indice_mensal(df)
+    mes_ano = max(indice, key=lambda chave: indice[chave].stop - indice[chave].start)
+    ano, mes = mes_ano
+    extra_mes = {'mes': mes, 'ano': ano}
+
+    df_mes = registrar('filtrar_por_mes_trabalho', lambda: filtrar_por_mes_trabalho(df, mes, ano, indice), **extra_mes)
+    registrar('filtrar_por_mes_trabalho_sem_indice', lambda: filtrar_por_mes_trabalho(df, mes, ano), **extra_mes)
+
+    revisoes = revisoes_sinteticas(df_mes, n_revisoes, semente)
+    extra_rev = {**extra_mes, 'linhas_mes': len(df_mes), 'revisoes': len(revisoes)}
+    df_rev = registrar('apply_revisoes_to_dataframe',
+                       lambda: aplicar_revisoes(df_mes, tabela_revisoes(revisoes)), **extra_rev)
+
+    registrar('calculate_metrics', lambda: calculate_metrics(df_rev), **extra_rev)
+    registrar('agregados_incrementais', lambda: AgregadosCarteira(df_mes).atualizar(revisoes.items()), **extra_rev)
+    registrar('generate_personalized_links', lambda: generate_personalized_links(df_rev, mes, ano), **extra_rev)
+    registrar('resumo_revisoes', lambda: resumo_revisoes_realizadas(df_rev, revisoes), **extra_rev)
+    return resultados
+
+
+# Função para descrever o ambiente da execução
+def ambiente():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m carteira.benchmark',
+                                     description="Mede tempo e memória de cada etapa do pipeline da carteira.")
+    parser.add_argument('--linhas', default='10000,100000',
+                        help="Tamanhos das carteiras separados por vírgula (ex.: 10000,100000,5000000)")
+    parser.add_argument('--revisoes', type=int, default=1000, help="Revisões aplicadas no mês medido")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--excel', action='store_true', help="Incluir a leitura do .xlsx (até 1.048.575 linhas)")
+    parser.add_argument('--gcs', type=int, default=300)
+    parser.add_argument('--grupos', type=int, default=40)
+    parser.add_argument('--diretorias', type=int, default=8)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', help="Arquivo JSON de resultados (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    parametros = {
+        'linhas': [int(n) for n in args.linhas.split(',') if n.strip()],
+        'revisoes': args.revisoes,
+        'repeticoes': args.repeticoes,
+        'excel': args.excel,
+        'gcs': args.gcs,
+        'grupos': args.grupos,
+        'diretorias': args.diretorias,
+        'semente': args.semente,
+    }
+    resultados = []
+    for linhas in parametros['linhas']:
+        resultados.extend(executar(
+            linhas, args.revisoes, args.repeticoes, args.excel, args.semente,
+            gcs=args.gcs, grupos=args.grupos, diretorias=args.diretorias
+        ))
+
+    relatorio = {
+        'versao': VERSAO_RESULTADO,
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': ambiente(),
+        'parametros': parametros,
+        'resultados': resultados,
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Cache em disco, endereçado por conteúdo, das carteiras já tratadas"""
+import hashlib
+import os
+import pandas as pd
+
+# Versão do formato gravado - incrementar sempre que o tratamento em load_data mudar
+VERSAO_FORMATO = 7
+
+DIRETORIO_PADRAO = os.environ.get(
+    'CARTEIRA_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'carteira')
+)
+LIMITE_PADRAO_MB = int(os.environ.get('CARTEIRA_CACHE_MB', '512'))
+
+
+# Função para calcular a chave de um arquivo enviado
+def hash_conteudo(conteudo):
+    """Retorna o SHA-256 dos bytes do arquivo"""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+class CacheCarteira:
+    """Cache LRU limitado por tamanho, com um arquivo Parquet por carteira tratada"""
+
+    def __init__(self, diretorio=None, limite_bytes=None):
+        self.diretorio = diretorio or DIRETORIO_PADRAO
+        self.limite_bytes = limite_bytes if limite_bytes is not None else LIMITE_PADRAO_MB * 1024 * 1024
+
+    def caminho(self, chave):
+        """Caminho do arquivo de uma chave na versão de formato atual"""
+        return os.path.join(self.diretorio, f"{chave}-v{VERSAO_FORMATO}.parquet")
+
+    def ler(self, chave):
+        """Retorna o DataFrame em cache ou None"""
+        caminho = self.caminho(chave)
+        if not os.path.exists(caminho):
+            return None
+        try:
+            df = pd.read_parquet(caminho)
+        except Exception:
+            # Arquivo corrompido ou gravado por outra versão do pyarrow - descartar
+            self._remover(caminho)
+            return None
+        # Categorias vazias (ex.: Revisado_Por sem revisões) voltam do Parquet como object: restaurar texto
+        for coluna in df.columns:
+            tipo = df[coluna].dtype
+            if isinstance(tipo, pd.CategoricalDtype) and len(tipo.categories) == 0:
+                df[coluna] = df[coluna].astype(pd.CategoricalDtype(pd.Index([], dtype='str')))
+        # Marcar como usado recentemente (a ordem LRU é dada pelo mtime)
+        os.utime(caminho)
+        return df
+
+    def gravar(self, chave, df):
+        """Grava o DataFrame (já compactado, sem colunas de tipos misturados) e aplica a política de remoção; retorna True se gravou"""
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self.caminho(chave)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        try:
+            df.to_parquet(temporario, index=False)
+            os.replace(temporario, caminho)
+        except Exception:
+            self._remover(temporario)
+            return False
+        self._aplicar_limite(manter=caminho)
+        return True
+
+    def marcar_atual(self, chave):
+        """Grava a chave da carteira em uso (lida pelos links dos GCs em outros processos)"""
+        os.makedirs(self.diretorio, exist_ok=True)
+        temporario = os.path.join(self.diretorio, f"ATUAL.{os.getpid()}.tmp")
+        with open(temporario, 'w') as arquivo:
+            arquivo.write(chave)
+        os.replace(temporario, os.path.join(self.diretorio, 'ATUAL'))
+
+    def chave_atual(self):
+        """Chave gravada por marcar_atual ou None"""
+        try:
+            with open(os.path.join(self.diretorio, 'ATUAL')) as arquivo:
+                return arquivo.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _aplicar_limite(self, manter=None):
+        """Remove os arquivos menos usados até o total caber no limite (a carteira atual fica)"""
+        protegidos = {manter}
+        chave_atual = self.chave_atual()
+        if chave_atual:
+            protegidos.add(self.caminho(chave_atual))
+        arquivos = []
+        for nome in os.listdir(self.diretorio):
+            if not nome.endswith('.parquet'):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                info = os.stat(caminho)
+            except FileNotFoundError:
+                continue
+            arquivos.append((info.st_mtime, info.st_size, caminho))
+
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.limite_bytes:
+                break
+            if caminho in protegidos:
+                continue
+            self._remover(caminho)
+            total -= tamanho
+
+    @staticmethod
+    def _remover(caminho):
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
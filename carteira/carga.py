@@ -0,0 +1,110 @@
+"""Carga da carteira sem Streamlit: leitura, esquema, colunas de controle, ordenação e compactação"""
+import pandas as pd
+
+from carteira.cache import hash_conteudo
+from carteira.compactacao import compactar
+from carteira.esquema import ESQUEMA_CARTEIRA, aplicar_esquema
+from carteira.leitura import ler_excel_em_lotes
+from carteira.particao import ordenar_por_mes
+
+AVISO_FALLBACK_DATA = "⚠️ Usando '1ª.DT.DIV.REM' como fallback. Verifique se a coluna 'Revisão Data Faturamento' existe."
+
+
+# Função para inferir os tipos das colunas object de um lote
+def _inferir_tipos(lote):
+    """infer_objects coluna a coluna (no DataFrame inteiro o pandas pode deixar colunas de texto em object)"""
+    return pd.DataFrame({coluna: lote[coluna].infer_objects() for coluna in lote.columns}, index=lote.index)
+
+
+# Função para ler a planilha em lotes já tipados pelo esquema
+def ler_carteira(conteudo, mes=None, ano=None):
+    """Lê só as colunas do dashboard em lotes e converte cada lote pelo esquema antes de juntar.
+
+    A cópia em object (valores como vieram do openpyxl) existe só para um
+    lote por vez; o DataFrame montado já tem números e datas tipados. Com
+    `mes` e `ano`, as linhas de outros meses são descartadas na leitura.
+    """
+    lotes = [
+        _inferir_tipos(aplicar_esquema(lote, ESQUEMA_CARTEIRA))
+        for lote in ler_excel_em_lotes(conteudo, mes=mes, ano=ano, inferir_tipos=False)
+    ]
+    if not lotes:
+        return pd.DataFrame()
+    return lotes[0] if len(lotes) == 1 else pd.concat(lotes, ignore_index=True)
+
+
+# Função para tratar os bytes de uma planilha da carteira
+def preparar_carteira(conteudo, mes=None, ano=None):
+    """Lê e trata a planilha (só o mês, quando informado); retorna (df, relatório da compactação, avisos)"""
+    return tratar_carteira(ler_carteira(conteudo, mes, ano))
+
+
+# Função para listar os avisos da carga a partir das colunas da carteira
+def avisos_carteira(df):
+    """Avisos que dependem só das colunas presentes (valem também para a carteira lida do cache)"""
+    if 'Revisão Data Faturamento' not in df.columns and '1ª.DT.DIV.REM' in df.columns:
+        return [AVISO_FALLBACK_DATA]
+    return []
+
+
+# Função para tratar a carteira já lida (colunas como vieram da planilha)
+def tratar_carteira(df):
+    """Esquema, data de trabalho, colunas de controle, ordenação e compactação"""
+    avisos = avisos_carteira(df)
+
+    # Limpeza e tratamento dos dados conforme o esquema (valores BR e datas com formato fixo)
+    df = aplicar_esquema(df, ESQUEMA_CARTEIRA)
+
+    # Data de trabalho (Revisão Data Faturamento) - já convertida pelo esquema
+    if 'Revisão Data Faturamento' in df.columns:
+        df['Data_Trabalho'] = df['Revisão Data Faturamento']
+
+    # FALLBACK: Se não tiver "Revisão Data Faturamento", tentar "1ª.DT.DIV.REM"
+    elif '1ª.DT.DIV.REM' in df.columns:
+        df['Data_Trabalho'] = df['1ª.DT.DIV.REM']
+
+    # Adicionar colunas de controle se não existirem
+    if 'Revisao_Realizada' not in df.columns:
+        df['Revisao_Realizada'] = False
+
+    if 'Data_Original_Alterada' not in df.columns:
+        df['Data_Original_Alterada'] = False
+
+    if 'Nova_Data_Entrega' not in df.columns:
+        df['Nova_Data_Entrega'] = pd.NaT
+
+    if 'Data_Revisao' not in df.columns:
+        df['Data_Revisao'] = pd.NaT
+
+    if 'Revisado_Por' not in df.columns:
+        df['Revisado_Por'] = None
+
+    # Ordenar por mês de trabalho para o índice mensal virar fatias contíguas
+    df = ordenar_por_mes(df)
+
+    # Compactar (categorias, bool e numéricos reduzidos) antes de compartilhar e gravar no cache
+    df, relatorio = compactar(df)
+    return df, relatorio, avisos
+
+
+# Função para carregar a carteira usando o cache em disco
+def carregar_carteira(conteudo, cache=None, mes=None, ano=None):
+    """Retorna (chave, df, relatório, avisos); relatório é None quando veio do cache.
+
+    Com `mes` e `ano` só as linhas do mês são lidas, e a chave do cache
+    ganha o mês (não se confunde com a carteira inteira do mesmo arquivo).
+    """
+    chave = hash_conteudo(conteudo)
+    if mes is not None and ano is not None:
+        chave = f"{chave}-{ano:04d}-{mes:02d}"
+
+    # Mesmo arquivo já tratado antes: ler direto do cache em disco (avisos refeitos pelas colunas)
+    if cache is not None:
+        df = cache.ler(chave)
+        if df is not None:
+            return chave, df, None, avisos_carteira(df)
+
+    df, relatorio, avisos = preparar_carteira(conteudo, mes, ano)
+    if cache is not None:
+        cache.gravar(chave, df)
+    return chave, df, relatorio, avisos
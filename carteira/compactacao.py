@@ -0,0 +1,103 @@
+"""Compactação da carteira em memória (categorias, tipos anuláveis e numéricos reduzidos)"""
+import numpy as np
+import pandas as pd
+
+from carteira.leitura import COLUNAS_DASHBOARD
+
+# Colunas derivadas na carga, além das lidas do arquivo
+COLUNAS_DERIVADAS = ['Data_Trabalho']
+
+# Dimensões de texto convertidas para categoria quando têm poucos valores distintos
+COLUNAS_CATEGORICAS = ['GC', 'Grupo', 'DIRETORIA', 'Status crédito', 'Nome Emissor', 'Desc. Material', 'Revisado_Por']
+
+# Acima desta fração de valores distintos a categoria não compensa (códigos + dicionário)
+RAZAO_CATEGORIA_MAXIMA = 0.5
+
+COLUNAS_FLAG = ['Revisao_Realizada', 'Data_Original_Alterada']
+
+
+# Função para medir a memória de cada coluna
+def _bytes_por_coluna(df):
+    return df.memory_usage(deep=True, index=False).to_dict()
+
+
+# Função para unificar colunas object com tipos misturados
+def _texto_se_misturado(serie):
+    """Converte para texto colunas object que misturam tipos (ex.: Ord.venda com números e textos)"""
+    if serie.dtype != object or not pd.api.types.infer_dtype(serie, skipna=True).startswith('mixed'):
+        return serie
+    # infer_objects: o mesmo tipo de texto que a leitura do Parquet devolve
+    return serie.where(serie.isna(), serie.astype(str)).infer_objects()
+
+
+# Função para converter texto com poucos valores distintos em categoria
+def _categorizar(serie):
+    tipo = pd.api.types.infer_dtype(serie, skipna=True)
+    if tipo == 'empty':
+        # Coluna ainda vazia (ex.: Revisado_Por): categorias de texto sem nenhum valor
+        return serie.astype(pd.CategoricalDtype(pd.Index([], dtype='str')))
+    # Só texto puro: categorias com tipos misturados não vão para o Parquet
+    if tipo != 'string':
+        return serie
+    if serie.nunique() > len(serie) * RAZAO_CATEGORIA_MAXIMA:
+        return serie
+    return serie.astype('category')
+
+
+# Função para converter flags em bool
+def _flag(serie):
+    """bool quando não há vazios; 'boolean' (anulável) quando há"""
+    if serie.isna().any():
+        return serie.astype('boolean')
+    return serie.astype(bool)
+
+
+# Função para reduzir colunas numéricas sem perda
+def _reduzir_numero(serie):
+    if pd.api.types.is_bool_dtype(serie) or not pd.api.types.is_numeric_dtype(serie):
+        return serie
+    valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+    inteiros = np.isnan(valores) | (valores == np.trunc(valores))
+    if inteiros.all():
+        # Inteiros (ex.: Ord.venda lida como float por causa de vazios): inteiro anulável se houver vazios
+        inteira = serie.astype('Int64') if serie.isna().any() else serie.astype('int64')
+        return pd.to_numeric(inteira, downcast='integer')
+    if serie.dtype == 'float64':
+        reduzida = serie.astype('float32')
+        if np.array_equal(reduzida.to_numpy(dtype='float64'), valores, equal_nan=True):
+            return reduzida
+    return serie
+
+
+# Função para compactar a carteira tratada
+def compactar(df):
+    """Compacta a carteira e retorna (df, relatório).
+
+    Remove colunas que o dashboard não usa, unifica colunas de tipos
+    misturados como texto (o Parquet exige tipo único, e assim o cache
+    devolve os mesmos tipos), converte dimensões de texto em categoria,
+    flags em bool e numéricos para o menor tipo sem perda. O
+    relatório traz os bytes antes/depois por coluna e no total.
+    """
+    antes = _bytes_por_coluna(df)
+
+    usadas = [c for c in df.columns if c in COLUNAS_DASHBOARD or c in COLUNAS_DERIVADAS]
+    df = df[usadas].copy()
+
+    for coluna in df.columns:
+        df[coluna] = _texto_se_misturado(df[coluna])
+        if coluna in COLUNAS_CATEGORICAS:
+            df[coluna] = _categorizar(df[coluna])
+        elif coluna in COLUNAS_FLAG:
+            df[coluna] = _flag(df[coluna])
+        else:
+            df[coluna] = _reduzir_numero(df[coluna])
+
+    depois = _bytes_por_coluna(df)
+    relatorio = {
+        'bytes_antes': int(sum(antes.values())),
+        'bytes_depois': int(sum(depois.values())),
+        'colunas': {c: (int(antes[c]), int(depois.get(c, 0))) for c in antes},
+    }
+    relatorio['bytes_economizados'] = relatorio['bytes_antes'] - relatorio['bytes_depois']
+    return df, relatorio
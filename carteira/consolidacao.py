@@ -0,0 +1,256 @@
+"""Consolidação de vários arquivos de revisão (diretório ou .zip) com resolução de conflitos.
+
+Uso:
+    python -m carteira.consolidacao revisoes_gcs.zip --saida consolidadas.json --conflitos conflitos.csv
+    python -m carteira.consolidacao pasta_revisoes/ --revisoes dados/revisoes.db
+
+Os arquivos (.json exportado pelo dashboard ou diário .jsonl) são lidos em
+paralelo e validados; para cada Ord.venda vale a revisão com a data_revisao
+mais recente (empate: o último arquivo em ordem de nome). Todas as versões
+ficam no histórico e as ordens com versões diferentes entre si vão para o
+relatório de conflitos.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import pandas as pd
+
+from carteira.diario import ler_eventos, reproduzir
+from carteira.lote import ACOES_DECISAO
+from carteira.repositorio import normalizar_ordem
+from carteira.revisoes import COLUNAS_REVISAO
+
+EXTENSOES = ('.json', '.jsonl')
+
+# Nome da fonte que representa as revisões já gravadas no repositório
+FONTE_REPOSITORIO = 'repositório'
+
+COLUNAS_HISTORICO = ['Ord.venda', 'arquivo'] + COLUNAS_REVISAO + ['mes', 'ano', 'vencedora']
+COLUNAS_CONFLITO = ['Ord.venda', 'versoes', 'arquivos', 'gcs', 'arquivo_vencedor', 'data_revisao', 'gc', 'acao', 'nova_data']
+COLUNAS_INVALIDA = ['arquivo', 'Ord.venda', 'motivo']
+
+
+# Funções para listar os arquivos de revisão de um .zip ou diretório
+def fontes_de_zip(origem):
+    """[(nome, bytes)] dos .json/.jsonl do zip (caminho, bytes ou arquivo aberto)"""
+    if isinstance(origem, bytes):
+        origem = io.BytesIO(origem)
+    with zipfile.ZipFile(origem) as arquivo_zip:
+        return [
+            (info.filename, arquivo_zip.read(info))
+            for info in sorted(arquivo_zip.infolist(), key=lambda i: i.filename)
+            if not info.is_dir() and info.filename.lower().endswith(EXTENSOES)
+            and not os.path.basename(info.filename).startswith('.') and '__MACOSX' not in info.filename
+        ]
+
+
+def fontes_de_diretorio(caminho):
+    """[(nome relativo, bytes)] dos .json/.jsonl do diretório (com subdiretórios)"""
+    fontes = []
+    for raiz, _, arquivos in os.walk(caminho):
+        for nome in arquivos:
+            if nome.lower().endswith(EXTENSOES) and not nome.startswith('.'):
+                completo = os.path.join(raiz, nome)
+                with open(completo, 'rb') as arquivo:
+                    fontes.append((os.path.relpath(completo, caminho), arquivo.read()))
+    return sorted(fontes)
+
+
+def fontes_de_caminho(caminho):
+    """Diretório, .zip ou arquivo .json/.jsonl avulso"""
+    if os.path.isdir(caminho):
+        return fontes_de_diretorio(caminho)
+    if zipfile.is_zipfile(caminho):
+        return fontes_de_zip(caminho)
+    with open(caminho, 'rb') as arquivo:
+        return [(os.path.basename(caminho), arquivo.read())]
+
+
+# Função para validar uma revisão
+def _validar(revisao):
+    """Retorna o motivo da rejeição ou None quando a revisão é válida"""
+    if not isinstance(revisao, dict):
+        return "revisão não é um objeto"
+    if not revisao.get('gc'):
+        return "sem gc"
+    try:
+        datetime.fromisoformat(str(revisao.get('data_revisao')))
+    except ValueError:
+        return f"data_revisao inválida: {revisao.get('data_revisao')!r}"
+    if revisao.get('acao') not in ACOES_DECISAO:
+        return f"acao inválida: {revisao.get('acao')!r}"
+    if revisao.get('nova_data') not in (None, ''):
+        try:
+            date.fromisoformat(str(revisao['nova_data'])[:10])
+        except ValueError:
+            return f"nova_data inválida: {revisao['nova_data']!r}"
+    return None
+
+
+# Função que lê e valida um arquivo (executada nos processos do pool)
+def ler_arquivo(nome, conteudo):
+    """Retorna (registros válidos, rejeições) de um .json {ordem: revisão} ou diário .jsonl"""
+    try:
+        if nome.lower().endswith('.jsonl'):
+            # Diário: vale o último evento de cada ordem; remoções não entram na consolidação
+            revisoes = {o: r for o, r in reproduzir(ler_eventos(io.BytesIO(conteudo))).items() if r is not None}
+        else:
+            revisoes = json.loads(conteudo.decode('utf-8-sig'))
+            if not isinstance(revisoes, dict):
+                return [], [(nome, None, "esperado um objeto {ordem: revisão}")]
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        return [], [(nome, None, f"JSON inválido: {e}")]
+
+    registros, rejeitadas = [], []
+    for ordem, revisao in revisoes.items():
+        ordem = normalizar_ordem(ordem)
+        motivo = _validar(revisao) if ordem not in (None, '') else "Ord.venda vazia"
+        if motivo:
+            rejeitadas.append((nome, ordem, motivo))
+            continue
+        registros.append((ordem, nome, *[revisao.get(c) for c in COLUNAS_REVISAO], revisao.get('mes'), revisao.get('ano')))
+    return registros, rejeitadas
+
+
+def _ler_par(fonte):
+    return ler_arquivo(*fonte)
+
+
+def _lista(coluna, inteiro=False):
+    # Vazios do DataFrame voltam a None; mês e ano (float quando há vazios) voltam a int
+    if inteiro:
+        coluna = coluna.astype('Int64')
+    return coluna.astype(object).where(coluna.notna(), None).tolist()
+
+
+# Função para consolidar as revisões de vários arquivos
+def consolidar(fontes, atuais=None, processos=None):
+    """Une as revisões das fontes [(nome, bytes)] resolvendo conflitos pela data_revisao mais recente.
+
+    `atuais` ({ordem: revisão} já gravado) entra como a fonte de menor
+    prioridade: só voltam em 'revisoes' as vencedoras vindas dos arquivos.
+    Retorna {'revisoes', 'historico', 'conflitos', 'invalidas', 'arquivos'}.
+    """
+    if processos == 1 or len(fontes) <= 1:
+        lidos = [ler_arquivo(nome, conteudo) for nome, conteudo in fontes]
+    else:
+        # spawn: seguro também dentro do servidor do Streamlit (processo com várias threads)
+        with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context('spawn')) as pool:
+            lidos = list(pool.map(_ler_par, fontes, chunksize=max(1, len(fontes) // 32)))
+
+    registros = [
+        (ordem, FONTE_REPOSITORIO, *[r.get(c) for c in COLUNAS_REVISAO], r.get('mes'), r.get('ano'))
+        for ordem, r in (atuais or {}).items()
+    ]
+    rejeitadas = []
+    for validos, invalidos in lidos:
+        registros.extend(validos)
+        rejeitadas.extend(invalidos)
+
+    historico = pd.DataFrame(registros, columns=COLUNAS_HISTORICO[:-1])
+    invalidas = pd.DataFrame(rejeitadas, columns=COLUNAS_INVALIDA, dtype=object)
+
+    # Posição da fonte desempata revisões com a mesma data (repositório primeiro, arquivos por nome)
+    historico['_posicao'] = historico['arquivo'].map(
+        {FONTE_REPOSITORIO: -1, **{nome: i for i, (nome, _) in enumerate(fontes)}}
+    )
+    historico['_data'] = pd.to_datetime(historico['data_revisao'], format='ISO8601', errors='coerce', utc=True)
+    historico['_chave'] = historico['Ord.venda'].astype(str)
+    historico = historico.sort_values(['_chave', '_data', '_posicao'], kind='stable', na_position='first')
+    historico['vencedora'] = ~historico.duplicated('_chave', keep='last')
+
+    # Conflito: a mesma ordem com conteúdos diferentes (cópias idênticas não contam)
+    conteudo = historico[['_chave'] + COLUNAS_REVISAO].astype(str)
+    distintas = conteudo.drop_duplicates().groupby('_chave').size()
+    em_conflito = distintas.index[distintas > 1]
+    candidatas = historico[historico['_chave'].isin(em_conflito)]
+    conflitos = pd.DataFrame(columns=COLUNAS_CONFLITO)
+    if not candidatas.empty:
+        # Arquivos e GCs de cada ordem, sem repetir e na ordem cronológica (uma passada só)
+        arquivos, gcs = {}, {}
+        for chave, arquivo, gc in zip(candidatas['_chave'].tolist(), candidatas['arquivo'].tolist(),
+                                      candidatas['gc'].tolist()):
+            arquivos.setdefault(chave, {})[arquivo] = None
+            gcs.setdefault(chave, {})[str(gc)] = None
+        vencedoras = candidatas[candidatas['vencedora']].set_index('_chave')
+        conflitos = pd.DataFrame({
+            'Ord.venda': vencedoras['Ord.venda'],
+            'versoes': distintas[vencedoras.index],
+            'arquivos': [', '.join(arquivos[chave]) for chave in vencedoras.index],
+            'gcs': [', '.join(gcs[chave]) for chave in vencedoras.index],
+            'arquivo_vencedor': vencedoras['arquivo'],
+            'data_revisao': vencedoras['data_revisao'],
+            'gc': vencedoras['gc'],
+            'acao': vencedoras['acao'],
+            'nova_data': vencedoras['nova_data'],
+        }).reset_index(drop=True)
+
+    vencedoras = historico[historico['vencedora'] & (historico['arquivo'] != FONTE_REPOSITORIO)]
+    campos = COLUNAS_REVISAO + ['mes', 'ano']
+    colunas = [_lista(vencedoras[c], inteiro=c in ('mes', 'ano')) for c in campos]
+    revisoes = {}
+    for ordem, *valores in zip(vencedoras['Ord.venda'].tolist(), *colunas):
+        revisao = dict(zip(campos, valores))
+        # Cópia idêntica da revisão já gravada: nada a regravar
+        if atuais is None or atuais.get(ordem) != revisao:
+            revisoes[ordem] = revisao
+
+    historico = historico.drop(columns=['_posicao', '_data', '_chave']).reset_index(drop=True)
+    return {
+        'revisoes': revisoes,
+        'historico': historico[COLUNAS_HISTORICO],
+        'conflitos': conflitos,
+        'invalidas': invalidas,
+        'arquivos': len(fontes),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m carteira.consolidacao',
+        description="Consolida arquivos de revisão dos GCs (diretórios, .zip, .json ou .jsonl)."
+    )
+    parser.add_argument('origens', nargs='+', help="Diretórios, arquivos .zip ou arquivos .json/.jsonl")
+    parser.add_argument('--saida', help="Revisões consolidadas em .json (mesmo formato de 'Carregar Revisões')")
+    parser.add_argument('--conflitos', help="Relatório de conflitos em CSV")
+    parser.add_argument('--historico', help="Histórico completo (todas as versões) em CSV")
+    parser.add_argument('--revisoes', help="Banco de revisões a atualizar (as revisões gravadas também concorrem)")
+    parser.add_argument('--processos', type=int, default=None, help="Processos do pool (padrão: nº de CPUs)")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    fontes = [fonte for origem in args.origens for fonte in fontes_de_caminho(origem)]
+
+    repositorio = None
+    if args.revisoes:
+        from carteira.repositorio import criar_repositorio
+        repositorio = criar_repositorio(args.revisoes)
+    resultado = consolidar(fontes, repositorio.todas() if repositorio else None, args.processos)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({str(o): r for o, r in resultado['revisoes'].items()}, arquivo, indent=2, ensure_ascii=False, default=str)
+    for caminho, tabela in ((args.conflitos, resultado['conflitos']), (args.historico, resultado['historico'])):
+        if caminho:
+            tabela.to_csv(caminho, index=False, sep=';', encoding='utf-8-sig')
+    if repositorio is not None and resultado['revisoes']:
+        repositorio.registrar(resultado['revisoes'])
+
+    for arquivo, ordem, motivo in resultado['invalidas'].itertuples(index=False, name=None):
+        print(f"{arquivo}: {ordem if ordem is not None else '-'}: {motivo}", file=sys.stderr)
+    print(f"{resultado['arquivos']} arquivos, {len(resultado['historico']):,} versões, "
+          f"{len(resultado['revisoes']):,} revisões consolidadas, {len(resultado['conflitos']):,} conflitos, "
+          f"{len(resultado['invalidas']):,} rejeitadas ({time.perf_counter() - inicio:.1f}s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
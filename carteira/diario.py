@@ -0,0 +1,290 @@
+"""Diário de revisões só de acréscimo (JSON Lines com número de sequência) e snapshot compactado.
+
+Cada linha do diário é um evento {"seq", "versao", "ordem", "revisao"}: o estado
+da ordem após a versão `versao` do repositório, com "revisao": null quando a
+revisão foi removida. O seq vem da versão do repositório (mais um deslocamento
+quando um repositório em memória recomeça a numeração), então processos que
+gravam o mesmo repositório geram os mesmos seq para o mesmo estado.
+Reproduzir os eventos em ordem de seq (o de maior seq de cada ordem vale)
+reconstrói o estado. As remoções levam "removida_em" (quando entraram no
+diário), para que carregar um diário antigo não apague revisões mais novas. A
+compactação grava o estado, inclusive as remoções, num snapshot com o seq e a
+versão já cobertos e recomeça o diário vazio, mantendo o arquivo limitado
+mesmo com meses de revisões.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+from carteira.repositorio import CAMINHO_PADRAO as CAMINHO_BANCO, normalizar_ordem
+
+CAMINHO_PADRAO = os.environ.get(
+    'CARTEIRA_DIARIO',
+    os.path.splitext(CAMINHO_BANCO)[0] + '.jsonl' if CAMINHO_BANCO != ':memory:'
+    else os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dados', 'revisoes.jsonl')
+)
+
+# Eventos no diário que disparam a compactação automática
+MAXIMO_EVENTOS = int(os.environ.get('CARTEIRA_DIARIO_MAX_EVENTOS', '50000'))
+
+
+# Função para serializar um evento em uma linha
+def _linha(evento):
+    return json.dumps(evento, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+
+
+# Função para ler eventos de linhas JSON
+def ler_eventos(linhas, desde=0):
+    """Gera os eventos com seq > desde; linhas vazias ou truncadas (gravação interrompida) são ignoradas"""
+    for linha in linhas:
+        if isinstance(linha, bytes):
+            linha = linha.decode('utf-8-sig')
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            evento = json.loads(linha)
+        except json.JSONDecodeError:
+            continue
+        if evento.get('seq', 0) > desde:
+            yield evento
+
+
+# Função para reproduzir eventos sobre um estado
+def reproduzir(eventos, estado=None, datas=None):
+    """Aplica os eventos em ordem de seq (empate: ordem do arquivo): retorna {ordem: revisão ou None} (None = removida).
+
+    Com `datas`, preenche {ordem: data do estado}: a data_revisao da revisão
+    ou, numa remoção, o removida_em do evento (sem ele, a data da revisão
+    removida, que é um limite inferior do momento da remoção).
+    """
+    estado = {} if estado is None else estado
+    seqs = {}
+    for evento in eventos:
+        ordem = normalizar_ordem(evento['ordem'])
+        seq = evento.get('seq', 0)
+        # Um evento atrasado (gravado depois por um processo que leu uma versão anterior) não volta o estado
+        if seq >= seqs.get(ordem, seq):
+            revisao = evento.get('revisao')
+            estado[ordem] = revisao
+            seqs[ordem] = seq
+            if datas is not None:
+                if revisao is not None:
+                    datas[ordem] = revisao.get('data_revisao')
+                else:
+                    datas[ordem] = evento.get('removida_em') or datas.get(ordem)
+    return estado
+
+
+class DiarioRevisoes:
+    """Diário em disco (`caminho`) e snapshot ao lado (`<caminho>.snapshot`).
+
+    Só acrescenta linhas: cada sincronização grava apenas as alterações do
+    repositório desde a última versão registrada, com seq = base + versão. A
+    base só muda quando o repositório recomeça a numeração (ex.: em memória
+    após reiniciar), para o seq continuar crescendo. As gravações de um
+    processo são serializadas por um lock; linhas truncadas por uma queda são
+    ignoradas na leitura.
+    """
+
+    def __init__(self, caminho=None, maximo_eventos=None):
+        self.caminho = caminho or CAMINHO_PADRAO
+        self.caminho_snapshot = self.caminho + '.snapshot'
+        self.maximo_eventos = maximo_eventos or MAXIMO_EVENTOS
+        if os.path.dirname(self.caminho):
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        self._lock = threading.RLock()
+
+        # Posição atual: snapshot e depois o diário inteiro (só as últimas chaves importam)
+        snapshot = self._ler_snapshot()
+        self.seq = snapshot['seq']
+        self.versao = snapshot['versao']
+        self.eventos_no_diario = 0
+        for evento in self.eventos():
+            self.seq, self.versao = max(self.seq, evento['seq']), evento['versao']
+            self.eventos_no_diario += 1
+        self.base = self.seq - self.versao
+
+    def _ler_snapshot(self):
+        if not os.path.exists(self.caminho_snapshot):
+            return {'seq': 0, 'versao': 0, 'revisoes': []}
+        with open(self.caminho_snapshot, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+
+    def eventos(self, desde=0):
+        """Eventos do diário (após o snapshot) com seq > desde, lidos em streaming"""
+        if not os.path.exists(self.caminho):
+            return
+        with open(self.caminho, encoding='utf-8') as arquivo:
+            yield from ler_eventos(arquivo, desde)
+
+    def _eventos_do_snapshot(self, snapshot):
+        """O estado do snapshot como eventos com o seq do checkpoint (remoções com o removida_em gravado)"""
+        removidas_em = {normalizar_ordem(ordem): quando for ordem, quando in snapshot.get('removidas_em', [])}
+        for ordem, revisao in snapshot['revisoes']:
+            evento = {'seq': snapshot['seq'], 'versao': snapshot['versao'], 'ordem': ordem, 'revisao': revisao}
+            if revisao is None and removidas_em.get(normalizar_ordem(ordem)):
+                evento['removida_em'] = removidas_em[normalizar_ordem(ordem)]
+            yield evento
+
+    def _estado_completo(self, datas=None):
+        """{ordem: revisão ou None}: snapshot (checkpoint) mais os eventos posteriores, com as remoções"""
+        snapshot = self._ler_snapshot()
+        estado = reproduzir(self._eventos_do_snapshot(snapshot), datas=datas)
+        return reproduzir(self.eventos(snapshot['seq']), estado, datas)
+
+    def estado(self):
+        """{ordem: revisão} ativo: snapshot (checkpoint) mais os eventos posteriores"""
+        return {ordem: revisao for ordem, revisao in self._estado_completo().items() if revisao is not None}
+
+    def anexar(self, alteracoes, versao, agora=None):
+        """Acrescenta um evento por (ordem, revisão ou None) no estado da versão `versao` e retorna o seq"""
+        agora = agora or datetime.now().isoformat()
+        with self._lock:
+            seq = self.base + versao
+            linhas = [
+                _linha({'seq': seq, 'versao': versao, 'ordem': ordem, 'revisao': revisao,
+                        **({'removida_em': agora} if revisao is None else {})})
+                for ordem, revisao in alteracoes
+            ]
+            if linhas:
+                with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+                    arquivo.writelines(linhas)
+                    arquivo.flush()
+                    os.fsync(arquivo.fileno())
+                self.eventos_no_diario += len(linhas)
+            self.seq = max(self.seq, seq)
+            self.versao = versao
+            return self.seq
+
+    def sincronizar(self, repositorio):
+        """Grava só as alterações do repositório desde a última versão do diário; compacta se passar do limite"""
+        with self._lock:
+            atual = repositorio.versao()
+            if atual < self.versao:
+                # Repositório recriado (ex.: em memória após reiniciar): registrar o estado inteiro de novo,
+                # com seq acima dos já gravados
+                self.versao = 0
+                self.base = self.seq
+            if atual == self.versao:
+                return self.seq
+            versao, alteradas = repositorio.alteracoes_desde(self.versao)
+            seq = self.anexar(alteradas, versao)
+            if self.eventos_no_diario > self.maximo_eventos:
+                self.compactar()
+            return seq
+
+    def restaurar(self, repositorio):
+        """Repovoa um repositório vazio (ex.: em memória) a partir do diário; retorna as revisões restauradas"""
+        with self._lock:
+            if repositorio.versao() > 0 or self.seq == 0:
+                return 0
+            estado = self.estado()
+            if estado:
+                repositorio.registrar(estado)
+            # O repositório recomeça a numeração: acompanhar a versão nova sem regravar o estado
+            self.versao = repositorio.versao()
+            self.base = self.seq - self.versao
+            return len(estado)
+
+    def compactar(self):
+        """Grava o estado atual no snapshot e recomeça o diário (troca atômica dos arquivos).
+
+        As remoções ficam no snapshot (revisão None), para a exportação e a
+        reprodução continuarem removendo essas ordens de repositórios que ainda as têm.
+        """
+        with self._lock:
+            datas = {}
+            estado = self._estado_completo(datas)
+            snapshot = {
+                'seq': self.seq,
+                'versao': self.versao,
+                'revisoes': list(estado.items()),
+                'removidas_em': [[ordem, datas.get(ordem)] for ordem, revisao in estado.items() if revisao is None],
+            }
+            temporario = self.caminho_snapshot + '.tmp'
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump(snapshot, arquivo, ensure_ascii=False, separators=(',', ':'), default=str)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            os.replace(temporario, self.caminho_snapshot)
+            # Eventos já cobertos pelo snapshot são ignorados na leitura, então uma
+            # queda entre as duas trocas não perde nem duplica nada
+            open(temporario, 'w').close()
+            os.replace(temporario, self.caminho)
+            self.eventos_no_diario = 0
+            return len(estado)
+
+    def exportar(self):
+        """Linhas JSONL com o estado do snapshot (seq do checkpoint) seguido dos eventos posteriores"""
+        snapshot = self._ler_snapshot()
+        for evento in self._eventos_do_snapshot(snapshot):
+            yield _linha(evento)
+        for evento in self.eventos(snapshot['seq']):
+            yield _linha(evento)
+
+
+# Função para converter a data de uma revisão ou remoção para comparação
+def _instante(valor):
+    """datetime sem fuso (horário local) ou None quando vazio ou inválido"""
+    if not valor:
+        return None
+    try:
+        instante = datetime.fromisoformat(str(valor))
+    except ValueError:
+        return None
+    return instante.astimezone().replace(tzinfo=None) if instante.tzinfo else instante
+
+
+# Função para juntar um estado carregado de arquivo às revisões gravadas
+def mesclar_estado(repositorio, estado, datas, mes=None, ano=None):
+    """Grava o estado {ordem: revisão ou None} sem passar por cima de revisões mais novas.
+
+    Uma revisão do arquivo só substitui a gravada se não for mais antiga que
+    ela; uma remoção só apaga a revisão gravada se ela não for mais nova que
+    a remoção (`datas`). Sem data para comparar, a revisão gravada fica.
+    Retorna (revisões gravadas, revisões removidas, ignoradas por serem mais antigas).
+    """
+    atuais = repositorio.todas()
+    revisoes, removidas, ignoradas = {}, [], 0
+    for ordem, revisao in estado.items():
+        atual = atuais.get(ordem)
+        data = _instante(datas.get(ordem))
+        data_atual = _instante(atual.get('data_revisao')) if atual is not None else None
+        if revisao is None:
+            if atual is None:
+                continue
+            if data is not None and (data_atual is None or data_atual <= data):
+                removidas.append(ordem)
+            else:
+                ignoradas += 1
+        elif atual is not None and (data is None or (data_atual is not None and data_atual > data)):
+            ignoradas += 1
+        else:
+            revisoes[ordem] = revisao
+
+    if revisoes:
+        repositorio.registrar(revisoes, mes, ano)
+    if removidas:
+        repositorio.remover(removidas)
+    return len(revisoes), len(removidas), ignoradas
+
+
+# Função para aplicar um diário exportado ao repositório
+def carregar_diario(repositorio, linhas, desde=0, mes=None, ano=None):
+    """Reproduz as linhas (a partir do seq `desde`) e junta o resultado ao repositório (ver mesclar_estado).
+
+    Retorna (revisões gravadas, revisões removidas, ignoradas por serem mais antigas).
+    """
+    datas = {}
+    estado = reproduzir(ler_eventos(linhas, desde), datas=datas)
+    return mesclar_estado(repositorio, estado, datas, mes, ano)
+
+
+# Função para aplicar um arquivo .json antigo {ordem: revisão} ao repositório
+def carregar_revisoes(repositorio, revisoes, mes=None, ano=None):
+    """Mesmas regras de carregar_diario para o formato .json (sem remoções)"""
+    estado = {normalizar_ordem(ordem): revisao for ordem, revisao in revisoes.items()}
+    datas = {ordem: revisao.get('data_revisao') for ordem, revisao in estado.items()}
+    return mesclar_estado(repositorio, estado, datas, mes, ano)
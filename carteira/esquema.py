@@ -0,0 +1,117 @@
+"""Esquema declarativo das colunas da carteira e parsers vetorizados"""
+import re
+import numpy as np
+import pandas as pd
+
+# Separadores de milhar e decimal por localidade
+LOCALIDADES = {
+    'pt_BR': {'milhar': '.', 'decimal': ','},
+    'en_US': {'milhar': ',', 'decimal': '.'},
+}
+
+# Data zero do Excel (o serial 1 é 01/01/1900, contando o 29/02/1900 inexistente)
+ORIGEM_EXCEL = pd.Timestamp('1899-12-30')
+SERIAL_EXCEL_MAXIMO = 2_958_465  # 31/12/9999
+
+# Tipo, localidade e formato de cada coluna tratada na carga
+ESQUEMA_CARTEIRA = {
+    'Vl.Saldo': {'tipo': 'numero', 'localidade': 'pt_BR'},
+    'Saldo': {'tipo': 'numero', 'localidade': 'pt_BR'},
+    'Dt. Dej. Rem.': {'tipo': 'data', 'formato': '%d/%m/%Y'},
+    'Revisão Data Faturamento': {'tipo': 'data', 'formato': '%d/%m/%Y'},
+    '1ª.DT.DIV.REM': {'tipo': 'data', 'formato': '%d/%m/%Y'},
+}
+
+
+# Função para aplicar um parser sobre os valores distintos da série
+def _por_valores_unicos(serie, parser, vazio):
+    """Converte só os valores distintos e replica o resultado para todas as linhas"""
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    convertidos = np.asarray(parser(pd.Series(unicos, dtype=object)))
+    # O código -1 (vazio) aponta para a posição extra com o valor nulo
+    convertidos = np.append(convertidos, np.array([vazio], dtype=convertidos.dtype))
+    return pd.Series(convertidos[codigos], index=serie.index, name=serie.name)
+
+
+# Função para converter números em formato local ("17.454,00") para float
+def parse_numero(serie, localidade='pt_BR'):
+    """Converte a coluna para float com operações vetorizadas sobre os textos"""
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.astype('float64')
+
+    milhar = LOCALIDADES[localidade]['milhar']
+    decimal = LOCALIDADES[localidade]['decimal']
+
+    # Colunas object podem misturar números (células numéricas) e textos
+    if serie.dtype == object:
+        eh_texto = serie.map(type) == str
+        resultado = pd.to_numeric(serie.where(~eh_texto), errors='coerce').astype('float64')
+        textos = serie[eh_texto].astype('str')
+    else:
+        resultado = pd.Series(np.nan, index=serie.index, name=serie.name)
+        textos = serie.dropna()
+
+    if len(textos):
+        # Manter apenas dígitos, sinal e separadores (remove "R$", espaços etc.)
+        limpos = textos.str.replace(rf'[^\d{re.escape(milhar + decimal)}\-]', '', regex=True)
+        # Formato local: tem separador decimal ou apenas separadores de milhar ("1.234")
+        local = (limpos.str.contains(decimal, regex=False)
+                 | limpos.str.fullmatch(rf'-?\d{{1,3}}(?:{re.escape(milhar)}\d{{3}})+'))
+        locais = limpos[local].str.replace(milhar, '', regex=False).str.replace(decimal, '.', regex=False)
+        limpos = limpos.where(~local, locais)
+        resultado[textos.index] = pd.to_numeric(limpos, errors='coerce')
+
+    return resultado
+
+
+# Função para converter datas em texto, datetime ou serial do Excel
+def parse_data(serie, formato='%d/%m/%Y'):
+    """Converte a coluna para datetime com formato fixo, sem inferência por elemento"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return _serial_excel(serie)
+
+    def parser(unicos):
+        resultado = pd.Series(pd.NaT, index=unicos.index, dtype='datetime64[ns]')
+        tipos = unicos.map(type)
+
+        textos = unicos[tipos == str].str.strip()
+        if len(textos):
+            datas = pd.to_datetime(textos, format=formato, errors='coerce')
+            # Textos fora do formato declarado (ex.: "2025-08-15 00:00:00") vêm em ISO
+            faltantes = datas.isna()
+            if faltantes.any():
+                datas[faltantes] = pd.to_datetime(textos[faltantes], format='ISO8601', errors='coerce')
+            resultado[textos.index] = datas
+
+        numeros = unicos[tipos.isin([int, float, np.int64, np.float64])]
+        if len(numeros):
+            resultado[numeros.index] = _serial_excel(numeros.astype('float64'))
+
+        objetos = unicos[~tipos.isin([str, int, float, np.int64, np.float64])]
+        if len(objetos):
+            resultado[objetos.index] = pd.to_datetime(objetos, errors='coerce')
+        return resultado
+
+    return _por_valores_unicos(serie, parser, np.datetime64('NaT', 'ns'))
+
+
+# Função para converter o número de série de data do Excel
+def _serial_excel(serie):
+    """Converte números de série do Excel para datetime (fora da faixa vira NaT)"""
+    valores = serie.astype('float64').where((serie >= 1) & (serie <= SERIAL_EXCEL_MAXIMO))
+    return ORIGEM_EXCEL + pd.to_timedelta(valores, unit='D')
+
+
+# Função para aplicar o esquema ao DataFrame carregado
+def aplicar_esquema(df, esquema=ESQUEMA_CARTEIRA):
+    """Trata cada coluna do esquema presente no DataFrame uma única vez"""
+    for coluna, spec in esquema.items():
+        if coluna not in df.columns:
+            continue
+        if spec['tipo'] == 'numero':
+            df[coluna] = parse_numero(df[coluna], spec.get('localidade', 'pt_BR'))
+        elif spec['tipo'] == 'data':
+            df[coluna] = parse_data(df[coluna], spec.get('formato', '%d/%m/%Y'))
+    return df
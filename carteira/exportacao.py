@@ -0,0 +1,177 @@
+"""Exportação da carteira revisada em CSV, XLSX ou Parquet, gravada em lotes e guardada por versão"""
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import threading
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from carteira.cache import DIRETORIO_PADRAO
+
+FORMATOS = ('csv', 'xlsx', 'parquet')
+
+MIME = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+DIRETORIO_EXPORTACOES = os.environ.get(
+    'CARTEIRA_EXPORTACOES_DIR',
+    os.path.join(os.path.dirname(DIRETORIO_PADRAO), 'exportacoes')
+)
+
+# Linhas gravadas por vez (só um lote convertido fica em memória além da carteira)
+TAMANHO_LOTE = int(os.environ.get('CARTEIRA_EXPORTACAO_LOTE', '50000'))
+
+# Limite de linhas de uma planilha .xlsx (sem contar o cabeçalho)
+LINHAS_XLSX_MAXIMO = 1_048_575
+
+
+# Função para dividir o DataFrame em lotes de linhas
+def _lotes(df, tamanho):
+    for inicio in range(0, len(df), tamanho):
+        yield df.iloc[inicio:inicio + tamanho]
+
+
+# Funções que gravam um formato em um arquivo binário aberto
+def _gravar_csv(df, saida, tamanho):
+    # Mesmo padrão dos CSVs para Excel em português: ';' e BOM UTF-8
+    texto = io.TextIOWrapper(saida, encoding='utf-8-sig', newline='')
+    if df.empty:
+        df.to_csv(texto, index=False, sep=';')
+    for i, lote in enumerate(_lotes(df, tamanho)):
+        lote.to_csv(texto, index=False, sep=';', header=(i == 0))
+    texto.flush()
+    texto.detach()
+
+
+def _gravar_xlsx(df, saida, tamanho):
+    if len(df) > LINHAS_XLSX_MAXIMO:
+        raise ValueError(f"Uma planilha .xlsx comporta no máximo {LINHAS_XLSX_MAXIMO:,} linhas; use CSV ou Parquet")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Carteira')
+    ws.append([str(c) for c in df.columns])
+    for lote in _lotes(df, tamanho):
+        colunas = [lote[c].astype(object).where(lote[c].notna(), None).tolist() for c in lote.columns]
+        for linha in zip(*colunas):
+            ws.append(linha)
+    wb.save(saida)
+
+
+# Função para montar o esquema Arrow de todas as colunas antes dos lotes
+def esquema_parquet(df):
+    """Esquema pelos dtypes do DataFrame inteiro, aplicado a todos os lotes.
+
+    Colunas object não têm tipo no dtype: o tipo vem dos valores não nulos da
+    coluna toda (texto quando a coluna está toda vazia), para que um lote só
+    com nulos, ou o primeiro lote antes das linhas revisadas, não fixe o tipo null.
+    """
+    esquema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    for i, campo in enumerate(esquema):
+        if pa.types.is_null(campo.type):
+            valores = df[campo.name].dropna()
+            tipo = pa.array(valores, from_pandas=True).type if len(valores) else pa.string()
+            esquema = esquema.set(i, campo.with_type(pa.string() if pa.types.is_null(tipo) else tipo))
+    return esquema
+
+
+def _gravar_parquet(df, saida, tamanho, compressao='snappy'):
+    esquema = esquema_parquet(df)
+    with pq.ParquetWriter(saida, esquema, compression=compressao) as escritor:
+        for lote in _lotes(df, tamanho):
+            escritor.write_table(pa.Table.from_pandas(lote, schema=esquema, preserve_index=False))
+
+
+# Função para exportar a carteira para um arquivo
+def exportar(df, caminho, formato='csv', comprimir=False, tamanho_lote=None):
+    """Grava df em `caminho` lote a lote.
+
+    Com `comprimir`, CSV e XLSX saem dentro de um .gz e o Parquet usa o
+    codec gzip internamente (o arquivo continua sendo .parquet).
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (use {', '.join(FORMATOS)})")
+    tamanho = tamanho_lote or TAMANHO_LOTE
+
+    with open(caminho, 'wb') as arquivo:
+        if formato == 'parquet':
+            _gravar_parquet(df, arquivo, tamanho, 'gzip' if comprimir else 'snappy')
+            return
+        if not comprimir:
+            (_gravar_csv if formato == 'csv' else _gravar_xlsx)(df, arquivo, tamanho)
+            return
+        with gzip.GzipFile(fileobj=arquivo, mode='wb', compresslevel=6) as saida:
+            if formato == 'csv':
+                _gravar_csv(df, saida, tamanho)
+            else:
+                # O zip do .xlsx precisa de um arquivo com seek: montar num temporário e comprimir a cópia
+                with tempfile.TemporaryFile() as temporario:
+                    _gravar_xlsx(df, temporario, tamanho)
+                    temporario.seek(0)
+                    shutil.copyfileobj(temporario, saida)
+
+
+# Função para o nome do arquivo baixado
+def nome_exportacao(prefixo, formato, comprimir=False):
+    """Ex.: carteira_revisada_2026-03.csv.gz"""
+    return f"{prefixo}.{formato}" + ('.gz' if comprimir and formato != 'parquet' else '')
+
+
+# Função para o tipo MIME do arquivo baixado
+def mime_exportacao(formato, comprimir=False):
+    return 'application/gzip' if comprimir and formato != 'parquet' else MIME[formato]
+
+
+class CacheExportacoes:
+    """Arquivos exportados em disco, um por (dados, versão das revisões, formato, compressão).
+
+    O arquivo só é gerado no primeiro pedido de cada combinação; versões
+    anteriores dos mesmos dados e formato são apagadas ao gerar uma nova.
+    """
+
+    def __init__(self, diretorio=None):
+        self.diretorio = diretorio or DIRETORIO_EXPORTACOES
+        self._lock = threading.Lock()
+        self._gerando = {}
+
+    def caminho(self, chave, versao, formato, comprimir=False):
+        return os.path.join(self.diretorio, f"{chave}_v{versao}.{formato}{'.gz' if comprimir else ''}")
+
+    def obter(self, chave, versao, formato, montar_df, comprimir=False):
+        """Caminho do arquivo exportado; `montar_df()` só é chamado quando o arquivo ainda não existe"""
+        caminho = self.caminho(chave, versao, formato, comprimir)
+        if os.path.exists(caminho):
+            return caminho
+
+        # Um lock por arquivo: pedidos simultâneos do mesmo export geram uma vez só
+        with self._lock:
+            trava = self._gerando.setdefault(caminho, threading.Lock())
+        with trava:
+            if not os.path.exists(caminho):
+                os.makedirs(self.diretorio, exist_ok=True)
+                temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    exportar(montar_df(), temporario, formato, comprimir)
+                    os.replace(temporario, caminho)
+                finally:
+                    if os.path.exists(temporario):
+                        os.remove(temporario)
+                self._remover_versoes_antigas(chave, caminho, formato, comprimir)
+        with self._lock:
+            self._gerando.pop(caminho, None)
+        return caminho
+
+    def _remover_versoes_antigas(self, chave, atual, formato, comprimir):
+        sufixo = f".{formato}{'.gz' if comprimir else ''}"
+        for nome in os.listdir(self.diretorio):
+            caminho = os.path.join(self.diretorio, nome)
+            if nome.startswith(f"{chave}_v") and nome.endswith(sufixo) and caminho != atual:
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
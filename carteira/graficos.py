@@ -0,0 +1,106 @@
+"""Gráficos Plotly memoizados pela impressão digital da tabela agregada e das opções"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.express as px
+
+MAXIMO_PADRAO = int(os.environ.get('CARTEIRA_FIGURAS_MAX', '64'))
+
+# Pizzas com mais fatias que isto agrupam a cauda em "Outros"
+MAXIMO_FATIAS = 12
+ROTULO_CAUDA = 'Outros'
+
+
+# Função para calcular a impressão digital de uma tabela e das opções do gráfico
+def impressao_digital(tabela, opcoes):
+    """SHA-1 dos valores, colunas e tipos da tabela mais as opções (ordem das chaves irrelevante)"""
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(tabela, index=False).to_numpy().tobytes())
+    h.update(json.dumps([list(map(str, tabela.columns)), list(map(str, tabela.dtypes))]).encode())
+    h.update(json.dumps(opcoes, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+# Função para agrupar as menores fatias de uma pizza
+def agrupar_cauda(tabela, valores, nomes, maximo=MAXIMO_FATIAS, rotulo=ROTULO_CAUDA):
+    """Mantém as maximo-1 maiores fatias e soma o resto em uma fatia `rotulo`"""
+    if len(tabela) <= maximo:
+        return tabela
+    ordenada = tabela[[nomes, valores]].sort_values(valores, ascending=False, kind='stable')
+    principais = ordenada.iloc[:maximo - 1]
+    cauda = pd.DataFrame({nomes: [rotulo], valores: [ordenada[valores].iloc[maximo - 1:].sum()]})
+    return pd.concat([principais.astype({nomes: object}), cauda], ignore_index=True)
+
+
+# Construtores dos gráficos usados no dashboard
+def pizza(tabela, valores, nomes, titulo, cores=None, altura=400):
+    """Pizza com a cauda agrupada (tabelas com centenas de categorias continuam leves)"""
+    fig = px.pie(
+        agrupar_cauda(tabela, valores, nomes),
+        values=valores,
+        names=nomes,
+        title=titulo,
+        color_discrete_map=cores
+    )
+    fig.update_layout(height=altura)
+    return fig
+
+
+def barras(tabela, x, y, titulo, rotulos=None, modo=None, altura=None, angulo_x=None):
+    """Barras (agrupadas quando y é uma lista e modo='group')"""
+    fig = px.bar(tabela, x=x, y=y, title=titulo, labels=rotulos, barmode=modo)
+    if altura:
+        fig.update_layout(height=altura)
+    if angulo_x is not None:
+        fig.update_xaxes(tickangle=angulo_x)
+    return fig
+
+
+class CacheFiguras:
+    """Cache LRU de figuras prontas.
+
+    A chave é a impressão digital da tabela de entrada (apenas as colunas
+    usadas) e das opções, então a mesma agregação devolve o mesmo objeto de
+    figura. As figuras devem ser tratadas como somente leitura: são
+    compartilhadas entre reruns e sessões.
+    """
+
+    def __init__(self, maximo=None):
+        self.maximo = maximo or MAXIMO_PADRAO
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, construtor, tabela, colunas, opcoes):
+        """Figura do construtor aplicado às colunas da tabela"""
+        tabela = tabela[colunas]
+        chave = (construtor.__name__, impressao_digital(tabela, opcoes))
+        with self._lock:
+            figura = self._itens.get(chave)
+            if figura is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return figura
+
+        figura = construtor(tabela, **opcoes)
+        with self._lock:
+            self.faltas += 1
+            self._itens[chave] = figura
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+        return figura
+
+    def pizza(self, tabela, valores, nomes, **opcoes):
+        """Figura de pizza (construída só se a tabela ou as opções mudaram)"""
+        return self.obter(pizza, tabela, [valores, nomes], {'valores': valores, 'nomes': nomes, **opcoes})
+
+    def barras(self, tabela, x, y, **opcoes):
+        """Figura de barras (construída só se a tabela ou as opções mudaram)"""
+        colunas = [x] + (list(y) if isinstance(y, (list, tuple)) else [y])
+        return self.obter(barras, tabela, colunas, {'x': x, 'y': y, **opcoes})
@@ -0,0 +1,105 @@
+"""Instrumentação opcional das etapas de cada execução: tempo, linhas e alocações, com log rotativo"""
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+
+from carteira.cache import DIRETORIO_PADRAO
+
+ATIVO_PADRAO = os.environ.get('CARTEIRA_INSTRUMENTACAO', '').lower() in ('1', 'true', 'sim')
+
+ARQUIVO_LOG_PADRAO = os.environ.get(
+    'CARTEIRA_INSTRUMENTACAO_LOG',
+    os.path.join(os.path.dirname(DIRETORIO_PADRAO), 'instrumentacao.log')
+)
+LOG_PADRAO_MB = int(os.environ.get('CARTEIRA_INSTRUMENTACAO_LOG_MB', '5'))
+COPIAS_LOG = 3
+
+MB = 1_048_576
+
+
+class Medicoes:
+    """Medições das etapas de uma execução (rerun completo ou de fragmento).
+
+    Cada etapa registra o tempo de parede, as linhas processadas (quando
+    informadas) e, com `alocacoes`, a memória alocada e o pico acima do início
+    da etapa medidos pelo tracemalloc. O tracemalloc vale para o processo
+    inteiro e conta as alocações de todas as sessões, por isso só é ligado
+    quando `alocacoes` é pedido (por padrão, só com CARTEIRA_INSTRUMENTACAO=1)
+    e os números de memória são aproximados sob carga concorrente. As etapas
+    não devem ser aninhadas (o pico é reiniciado a cada etapa).
+    """
+
+    def __init__(self, rotulo, alocacoes=None):
+        self.rotulo = rotulo
+        self.alocacoes = ATIVO_PADRAO if alocacoes is None else alocacoes
+        self.etapas = []
+        if self.alocacoes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nome, linhas=None):
+        """Mede o bloco; o dicionário devolvido aceita `linhas` definido dentro do bloco"""
+        medicao = {'etapa': nome, 'linhas': linhas}
+        if self.alocacoes:
+            antes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        finally:
+            medicao['segundos'] = time.perf_counter() - inicio
+            if self.alocacoes:
+                atual, pico = tracemalloc.get_traced_memory()
+                medicao['alocado_mb'] = (atual - antes) / MB
+                medicao['pico_mb'] = max(pico - antes, 0) / MB
+            self.etapas.append(medicao)
+
+    @property
+    def total_segundos(self):
+        return time.perf_counter() - self._inicio
+
+    def tabela(self):
+        """DataFrame com uma linha por etapa, na ordem de execução"""
+        colunas = ['etapa', 'linhas', 'segundos'] + (['alocado_mb', 'pico_mb'] if self.alocacoes else [])
+        return pd.DataFrame(self.etapas, columns=colunas)
+
+    def registro(self, **contexto):
+        """Dicionário serializável da execução (uma linha do log)"""
+        return {
+            'quando': datetime.now().isoformat(timespec='seconds'),
+            'execucao': self.rotulo,
+            'total_segundos': round(self.total_segundos, 6),
+            **contexto,
+            'etapas': self.etapas,
+        }
+
+
+# Função para criar o log rotativo das medições
+def criar_log(caminho=None, maximo_mb=None, copias=COPIAS_LOG):
+    """Logger que grava uma linha JSON por execução, girando o arquivo ao atingir maximo_mb"""
+    caminho = caminho or ARQUIVO_LOG_PADRAO
+    if os.path.dirname(caminho):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+    log = logging.getLogger(f'carteira.instrumentacao.{os.path.abspath(caminho)}')
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    if not log.handlers:
+        handler = RotatingFileHandler(caminho, maxBytes=(maximo_mb or LOG_PADRAO_MB) * MB,
+                                      backupCount=copias, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log.addHandler(handler)
+    return log
+
+
+# Função para gravar as medições de uma execução no log
+def gravar_medicoes(log, medicoes, **contexto):
+    log.info(json.dumps(medicoes.registro(**contexto), ensure_ascii=False, default=str))
@@ -0,0 +1,116 @@
+"""Leitura em lotes, projetada nas colunas usadas, dos arquivos Excel da carteira"""
+import io
+from datetime import datetime, timedelta
+import pandas as pd
+from openpyxl import load_workbook
+
+from carteira.esquema import ESQUEMA_CARTEIRA, ORIGEM_EXCEL
+
+# Colunas lidas pelo dashboard - as demais colunas do arquivo são descartadas na leitura
+COLUNAS_DASHBOARD = [
+    'Ord.venda', 'GC', 'Grupo', 'DIRETORIA', 'Status crédito',
+    'Vl.Saldo', 'Saldo', 'Nome Emissor', 'Desc. Material',
+    'Revisão Data Faturamento', '1ª.DT.DIV.REM', 'Dt. Dej. Rem.',
+    # Colunas de controle, caso o arquivo já venha de uma exportação revisada
+    'Revisao_Realizada', 'Data_Original_Alterada', 'Nova_Data_Entrega', 'Data_Revisao', 'Revisado_Por',
+]
+
+# Colunas de data usadas para o filtro de mês, em ordem de preferência (mesma regra de load_data)
+COLUNAS_MES = ['Revisão Data Faturamento', '1ª.DT.DIV.REM']
+
+TAMANHO_LOTE = 50_000
+
+
+# Função para identificar arquivos .xlsx (zip) - .xls antigos não são lidos pelo openpyxl
+def _eh_xlsx(conteudo):
+    return conteudo[:4] == b'PK\x03\x04'
+
+
+# Função para extrair mês/ano de uma célula sem montar o DataFrame
+def _mes_ano(valor, formato):
+    """Retorna (mes, ano) de uma célula de data ou None"""
+    if isinstance(valor, datetime):
+        return valor.month, valor.year
+    if isinstance(valor, str):
+        texto = valor.strip()
+        try:
+            data = datetime.strptime(texto, formato)
+        except ValueError:
+            try:
+                data = datetime.fromisoformat(texto)
+            except ValueError:
+                return None
+        return data.month, data.year
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool) and valor >= 1:
+        data = ORIGEM_EXCEL + timedelta(days=float(valor))
+        return data.month, data.year
+    return None
+
+
+# Função para ler o Excel em lotes de linhas
+def ler_excel_em_lotes(conteudo, colunas=COLUNAS_DASHBOARD, tamanho_lote=TAMANHO_LOTE, mes=None, ano=None,
+                       inferir_tipos=True):
+    """Gera DataFrames de até `tamanho_lote` linhas só com as colunas pedidas.
+
+    Com `mes` e `ano`, as linhas fora do mês de trabalho são descartadas antes
+    de chegar ao pandas. Sempre gera ao menos um lote (vazio, com as colunas)
+    quando a planilha tem cabeçalho.
+    """
+    if not _eh_xlsx(conteudo):
+        # Formato .xls: sem leitura em streaming, mas ainda projetado nas colunas
+        df = pd.read_excel(io.BytesIO(conteudo), usecols=lambda nome: nome in colunas)
+        if mes is not None and ano is not None:
+            coluna_mes = next((c for c in COLUNAS_MES if c in df.columns), None)
+            if coluna_mes is not None:
+                formato = ESQUEMA_CARTEIRA[coluna_mes]['formato']
+                df = df[df[coluna_mes].map(lambda v: _mes_ano(v, formato) == (mes, ano))]
+        for inicio in range(0, max(len(df), 1), tamanho_lote):
+            yield df.iloc[inicio:inicio + tamanho_lote].reset_index(drop=True)
+        return
+
+    wb = load_workbook(io.BytesIO(conteudo), read_only=True, data_only=True)
+    try:
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+
+        # Posição de cada coluna pedida (primeira ocorrência do nome no cabeçalho)
+        posicoes = {}
+        for i, nome in enumerate(cabecalho):
+            if nome in colunas and nome not in posicoes:
+                posicoes[nome] = i
+        nomes = [c for c in colunas if c in posicoes]
+        indices = [posicoes[c] for c in nomes]
+
+        posicao_mes = None
+        formato = None
+        if mes is not None and ano is not None:
+            coluna_mes = next((c for c in COLUNAS_MES if c in posicoes), None)
+            if coluna_mes is not None:
+                posicao_mes = posicoes[coluna_mes]
+                formato = ESQUEMA_CARTEIRA[coluna_mes]['formato']
+
+        def montar(lote):
+            df = pd.DataFrame(lote, columns=nomes, dtype=object)
+            return df.infer_objects() if inferir_tipos else df
+
+        lote = []
+        gerou = False
+        for linha in linhas:
+            if not any(v is not None for v in linha):
+                continue
+            if posicao_mes is not None:
+                valor = linha[posicao_mes] if posicao_mes < len(linha) else None
+                if _mes_ano(valor, formato) != (mes, ano):
+                    continue
+            lote.append([linha[i] if i < len(linha) else None for i in indices])
+            if len(lote) >= tamanho_lote:
+                yield montar(lote)
+                lote = []
+                gerou = True
+        if lote or not gerou:
+            yield montar(lote)
+    finally:
+        wb.close()
+
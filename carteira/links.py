@@ -0,0 +1,86 @@
+"""Links personalizados e resumos por GC, calculados em uma única passada"""
+import calendar
+import hashlib
+import urllib.parse
+
+BASE_URL = "https://dash-carteira-review.streamlit.app"  # URL do Streamlit Cloud
+
+
+# Função para gerar hash único do GC
+def generate_gc_hash(gc_name, mes, ano):
+    """Gera um hash único para o GC para criar link personalizado"""
+    unique_string = f"{gc_name}_{mes}_{ano}"
+    return hashlib.md5(unique_string.encode()).hexdigest()[:10]
+
+
+# Função para montar o link de um GC
+def montar_link(gc, mes, ano, base_url=BASE_URL):
+    """URL com gc, hash, mês e ano"""
+    gc_hash = generate_gc_hash(gc, mes, ano)
+    return f"{base_url}?gc={urllib.parse.quote(gc)}&hash={gc_hash}&mes={mes}&ano={ano}"
+
+
+# Função para formatar o resumo por grupo
+def _formatar_resumo_grupos(resumo):
+    resumo = resumo[['Qtd_Pedidos', 'Valor_Total', 'Volume_Total']].round(2)
+    resumo['Valor_MM'] = (resumo['Valor_Total'] / 1_000_000).round(1)
+    return resumo.reset_index()
+
+
+# Função para gerar resumo por grupo para um GC
+def get_resumo_por_grupo(df, gc):
+    """Gera resumo por grupo para um GC específico"""
+    df_gc = df[df['GC'] == gc]
+
+    resumo = df_gc.groupby('Grupo', observed=True).agg(
+        Qtd_Pedidos=('Ord.venda', 'count'),
+        Valor_Total=('Vl.Saldo', 'sum'),
+        Volume_Total=('Saldo', 'sum')
+    )
+    return _formatar_resumo_grupos(resumo)
+
+
+# Função para gerar links personalizados
+def generate_personalized_links(df, mes, ano, base_url=BASE_URL):
+    """Gera links, resumo por grupo e progresso de revisão de todos os GCs.
+
+    Um único groupby por (GC, Grupo) alimenta tudo: os totais do GC somam os
+    seus grupos (incluindo linhas sem grupo) e os resumos usam só as linhas
+    com grupo, como em get_resumo_por_grupo.
+    """
+    mes_nome = calendar.month_name[mes]
+    if df.empty:
+        return {}
+
+    por_gc_grupo = df.groupby(['GC', 'Grupo'], observed=True, dropna=False).agg(
+        Linhas=('Ord.venda', 'size'),
+        Qtd_Pedidos=('Ord.venda', 'count'),
+        Valor_Total=('Vl.Saldo', 'sum'),
+        Volume_Total=('Saldo', 'sum'),
+        Revisados=('Revisao_Realizada', 'sum')
+    )
+    # Linhas sem GC não geram link
+    por_gc_grupo = por_gc_grupo[por_gc_grupo.index.get_level_values('GC').notna()]
+    por_gc = por_gc_grupo.groupby(level='GC', observed=True, sort=True).sum()
+    com_grupo = por_gc_grupo[por_gc_grupo.index.get_level_values('Grupo').notna()]
+    grupos_por_gc = {gc: resumo.droplevel('GC') for gc, resumo in com_grupo.groupby(level='GC', observed=True, sort=False)}
+
+    links = {}
+    for gc, totais in por_gc.iterrows():
+        pedidos_gc = int(totais['Linhas'])
+        revisados = int(totais['Revisados'])
+        grupos = grupos_por_gc.get(gc, com_grupo.iloc[0:0].droplevel('GC'))
+        links[gc] = {
+            'link': montar_link(gc, mes, ano, base_url),
+            'hash': generate_gc_hash(gc, mes, ano),
+            'pedidos': pedidos_gc,
+            'valor': totais['Valor_Total'] / 1_000_000,  # Converter para milhões
+            'volume': totais['Volume_Total'],
+            'revisados': revisados,
+            'perc_revisao': (revisados / pedidos_gc * 100) if pedidos_gc > 0 else 0,
+            'grupos': _formatar_resumo_grupos(grupos),
+            'mes_nome': mes_nome,
+            'ano': ano
+        }
+
+    return links
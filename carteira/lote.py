@@ -0,0 +1,109 @@
+"""Ações de revisão em lote: cada ação monta as revisões de várias ordens para uma única gravação"""
+import io
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from carteira.esquema import parse_data
+from carteira.repositorio import normalizar_ordem
+
+# Colunas do CSV de decisões (Ord.venda é obrigatória; sem ação, vale "revisao" se houver nova data)
+COLUNAS_DECISAO = ['Ord.venda', 'acao', 'nova_data', 'justificativa']
+ACOES_DECISAO = ('check', 'revisao')
+
+
+# Função para confirmar as ordens pendentes de um recorte
+def confirmar_pendentes(df, gc, agora=None):
+    """Revisões 'check' para todas as ordens ainda não revisadas de df"""
+    agora = agora or datetime.now().isoformat()
+    ordens = df.loc[~df['Revisao_Realizada'].astype(bool), 'Ord.venda'].dropna().unique()
+    return {
+        ordem: {'gc': gc, 'data_revisao': agora, 'nova_data': None, 'acao': 'check'}
+        for ordem in ordens
+    }
+
+
+# Função para deslocar a data de entrega de várias ordens
+def adiar_datas(df, dias, gc, justificativa='', agora=None):
+    """Revisões que movem a data de cada ordem em `dias` (a partir da nova data, se já revisada)"""
+    agora = agora or datetime.now().isoformat()
+    ordens = df.dropna(subset=['Ord.venda']).drop_duplicates('Ord.venda')
+    base = ordens['Nova_Data_Entrega'].fillna(ordens['Data_Trabalho'])
+    novas = (base + timedelta(days=dias)).dt.date
+
+    return {
+        ordem: {
+            'gc': gc,
+            'data_revisao': agora,
+            'nova_data': nova.isoformat(),
+            'justificativa': justificativa,
+            'acao': 'revisao'
+        }
+        for ordem, nova in zip(ordens['Ord.venda'], novas)
+        if pd.notna(nova)
+    }
+
+
+# Função para gerar o modelo do CSV de decisões
+def modelo_decisoes(df):
+    """CSV (separador ';') com as ordens pendentes de df, pronto para preencher"""
+    pendentes = df.loc[~df['Revisao_Realizada'].astype(bool)].drop_duplicates('Ord.venda')
+    modelo = pd.DataFrame({
+        'Ord.venda': pendentes['Ord.venda'],
+        'acao': '',
+        'nova_data': '',
+        'justificativa': '',
+        'Data_Prevista': pendentes['Data_Trabalho'].dt.strftime('%d/%m/%Y'),
+        'Cliente': pendentes['Nome Emissor'],
+    })
+    return modelo.to_csv(index=False, sep=';').encode('utf-8-sig')
+
+
+# Função para ler o CSV de decisões de um GC
+def ler_decisoes(conteudo, df_gc, gc, agora=None):
+    """Converte o CSV em revisões das ordens do GC.
+
+    Retorna (revisões, ignoradas), onde `ignoradas` é um DataFrame com a linha
+    do arquivo, a ordem e o motivo de cada decisão descartada. Levanta
+    ValueError se o arquivo não tiver a coluna Ord.venda.
+    """
+    agora = agora or datetime.now().isoformat()
+    decisoes = pd.read_csv(io.BytesIO(conteudo), sep=None, engine='python', dtype=str,
+                           encoding='utf-8-sig', keep_default_na=False)
+    decisoes.columns = decisoes.columns.str.strip()
+    if 'Ord.venda' not in decisoes.columns:
+        raise ValueError("O arquivo precisa da coluna 'Ord.venda'")
+    for coluna in COLUNAS_DECISAO:
+        if coluna not in decisoes.columns:
+            decisoes[coluna] = ''
+
+    # Chaves do arquivo (texto) comparadas com as da carteira pelo mesmo critério do repositório
+    ordens_gc = {normalizar_ordem(o): o for o in df_gc['Ord.venda'].dropna().unique()}
+    ordens = decisoes['Ord.venda'].str.strip().map(normalizar_ordem)
+    acoes = decisoes['acao'].str.strip().str.lower()
+    textos_data = decisoes['nova_data'].str.strip()
+    novas = parse_data(textos_data.where(textos_data != ''), '%d/%m/%Y')
+    acoes = acoes.where(acoes != '', novas.notna().map({True: 'revisao', False: 'check'}))
+
+    revisoes = {}
+    ignoradas = []
+    for linha, ordem, acao, nova, texto_data, justificativa in zip(
+            decisoes.index + 2, ordens, acoes, novas, textos_data, decisoes['justificativa'].str.strip()):
+        if ordem not in ordens_gc:
+            motivo = "ordem não pertence ao GC"
+        elif acao not in ACOES_DECISAO:
+            motivo = f"ação inválida: {acao}"
+        elif acao == 'revisao' and pd.isna(nova):
+            motivo = f"data inválida: {texto_data}" if texto_data else "revisão sem nova data"
+        else:
+            revisoes[ordens_gc[ordem]] = {
+                'gc': gc,
+                'data_revisao': agora,
+                'nova_data': nova.date().isoformat() if acao == 'revisao' else None,
+                'justificativa': justificativa or None,
+                'acao': acao
+            }
+            continue
+        ignoradas.append({'Linha': linha, 'Ord.venda': ordem, 'Motivo': motivo})
+
+    return revisoes, pd.DataFrame(ignoradas, columns=['Linha', 'Ord.venda', 'Motivo'])
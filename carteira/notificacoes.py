@@ -0,0 +1,536 @@
+"""Envio dos links personalizados por e-mail, com concorrência limitada, controle de taxa e registro retomável.
+
+Uso:
+    python -m carteira.notificacoes carteira.xlsx --destinatarios gcs.csv --mes 2026-03
+    python -m carteira.notificacoes carteira.xlsx --destinatarios gcs.csv --teste
+
+Cada GC recebe uma mensagem (texto e HTML) com o link, o progresso da revisão
+e o resumo por grupo calculados por generate_personalized_links. O envio roda
+num laço asyncio: `concorrencia` tarefas consomem uma fila, cada uma com a sua
+conexão SMTP (smtplib executado num pool de threads), passando por um limite
+de mensagens por segundo. Falhas temporárias (4xx, conexão caída) são
+repetidas com espera exponencial; recusas definitivas (5xx) não. Cada
+resultado é acrescentado ao registro de envios (JSON Lines), e um GC já
+enviado na mesma campanha é pulado, então uma campanha interrompida pode ser
+executada de novo sem duplicar e-mails. Com --teste as mensagens vão para um
+servidor SMTP local em memória (ServidorSMTPLocal) e nada sai da máquina.
+"""
+import argparse
+import asyncio
+import email
+import html
+import io
+import json
+import os
+import smtplib
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.message import EmailMessage
+from email.policy import default as politica_padrao
+from email.utils import make_msgid
+
+import pandas as pd
+
+from carteira.cache import CacheCarteira
+from carteira.carga import carregar_carteira
+from carteira.links import BASE_URL, generate_personalized_links
+from carteira.particao import filtrar_por_mes_trabalho, get_mes_trabalho
+from carteira.repositorio import criar_repositorio
+from carteira.revisoes import aplicar_revisoes, tabela_revisoes
+
+# Configuração do servidor SMTP (variáveis de ambiente)
+SMTP_PADRAO = {
+    'host': os.environ.get('CARTEIRA_SMTP_HOST', ''),
+    'porta': int(os.environ.get('CARTEIRA_SMTP_PORTA', '587')),
+    'usuario': os.environ.get('CARTEIRA_SMTP_USUARIO', ''),
+    'senha': os.environ.get('CARTEIRA_SMTP_SENHA', ''),
+    'starttls': os.environ.get('CARTEIRA_SMTP_STARTTLS', '1').lower() in ('1', 'true', 'sim'),
+    'remetente': os.environ.get('CARTEIRA_SMTP_REMETENTE', ''),
+}
+
+CAMINHO_REGISTRO = os.environ.get(
+    'CARTEIRA_ENVIOS',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dados', 'envios.jsonl')
+)
+
+CONCORRENCIA_PADRAO = int(os.environ.get('CARTEIRA_SMTP_CONEXOES', '8'))
+POR_SEGUNDO_PADRAO = float(os.environ.get('CARTEIRA_SMTP_POR_SEGUNDO', '20'))
+TENTATIVAS_PADRAO = 3
+ESPERA_BASE = 1.0
+TIMEOUT = 30
+
+# Nomes aceitos para a coluna de e-mail da lista de destinatários
+COLUNAS_EMAIL = ('email', 'e-mail', 'e_mail', 'mail')
+
+
+# Função para montar a configuração SMTP
+def config_smtp(**alteracoes):
+    """Configuração das variáveis de ambiente com os valores informados por cima (None é ignorado)"""
+    return {**SMTP_PADRAO, **{chave: valor for chave, valor in alteracoes.items() if valor is not None}}
+
+
+# Função para ler a lista de destinatários
+def ler_destinatarios(conteudo):
+    """Lê um CSV (';' ou ',') com as colunas GC e e-mail e retorna {GC: [e-mails]}.
+
+    Um GC pode aparecer em várias linhas (vários destinatários); linhas sem
+    GC ou sem e-mail são ignoradas.
+    """
+    if isinstance(conteudo, str):
+        conteudo = conteudo.encode('utf-8')
+    tabela = pd.read_csv(io.BytesIO(conteudo), sep=None, engine='python', dtype=str, encoding='utf-8-sig')
+    colunas = {str(c).strip().lower(): c for c in tabela.columns}
+    if 'gc' not in colunas:
+        raise ValueError("A lista de destinatários precisa da coluna GC")
+    coluna_email = next((colunas[nome] for nome in COLUNAS_EMAIL if nome in colunas), None)
+    if coluna_email is None:
+        raise ValueError("A lista de destinatários precisa da coluna E-mail")
+
+    destinatarios = {}
+    for gc, endereco in zip(tabela[colunas['gc']], tabela[coluna_email]):
+        if pd.isna(gc) or pd.isna(endereco) or not str(endereco).strip():
+            continue
+        enderecos = destinatarios.setdefault(str(gc).strip(), [])
+        if str(endereco).strip() not in enderecos:
+            enderecos.append(str(endereco).strip())
+    return destinatarios
+
+
+# Função para montar o corpo em texto
+def _texto(gc, info):
+    linhas = [
+        f"Olá, {gc}!",
+        "",
+        f"A carteira de {info['mes_nome']}/{info['ano']} está disponível para revisão:",
+        info['link'],
+        "",
+        f"Pedidos: {info['pedidos']}  |  Valor: R$ {info['valor']:.1f}M  |  Volume: {info['volume']:,.0f}",
+        f"Revisados: {info['revisados']}/{info['pedidos']} ({info['perc_revisao']:.1f}%)",
+    ]
+    if len(info['grupos']):
+        linhas += ["", "Resumo por grupo:"]
+        for grupo in info['grupos'].itertuples(index=False):
+            linhas.append(f"  - {grupo.Grupo}: {grupo.Qtd_Pedidos} pedidos, R$ {grupo.Valor_MM:.1f}M, "
+                          f"volume {grupo.Volume_Total:,.0f}")
+    linhas += ["", "Para cada pedido: ✅ Confirmar a data ou 📅 Alterar a data de faturamento."]
+    return '\n'.join(linhas) + '\n'
+
+
+# Função para montar o corpo em HTML
+def _html(gc, info):
+    grupos = ''.join(
+        f"<tr><td>{html.escape(str(grupo.Grupo))}</td><td align='right'>{grupo.Qtd_Pedidos}</td>"
+        f"<td align='right'>R$ {grupo.Valor_MM:.1f}M</td><td align='right'>{grupo.Volume_Total:,.0f}</td></tr>"
+        for grupo in info['grupos'].itertuples(index=False)
+    )
+    tabela = (
+        "<table border='1' cellpadding='4' cellspacing='0'>"
+        "<tr><th>Grupo</th><th>Pedidos</th><th>Valor (MM)</th><th>Volume</th></tr>"
+        f"{grupos}</table>"
+    ) if grupos else ''
+    return (
+        f"<p>Olá, {html.escape(str(gc))}!</p>"
+        f"<p>A carteira de {info['mes_nome']}/{info['ano']} está disponível para revisão:<br>"
+        f"<a href='{html.escape(info['link'])}'>Abrir minha carteira</a></p>"
+        f"<p>Pedidos: <b>{info['pedidos']}</b> &nbsp;|&nbsp; Valor: <b>R$ {info['valor']:.1f}M</b>"
+        f" &nbsp;|&nbsp; Volume: <b>{info['volume']:,.0f}</b><br>"
+        f"Revisados: <b>{info['revisados']}/{info['pedidos']}</b> ({info['perc_revisao']:.1f}%)</p>"
+        f"{tabela}"
+        "<p>Para cada pedido: ✅ Confirmar a data ou 📅 Alterar a data de faturamento.</p>"
+    )
+
+
+# Função para montar a mensagem de um GC
+def montar_mensagem(gc, info, destinatarios, remetente):
+    """EmailMessage (texto + HTML) a partir do registro de link do GC (generate_personalized_links)"""
+    if isinstance(destinatarios, str):
+        destinatarios = [destinatarios]
+    mensagem = EmailMessage()
+    mensagem['Subject'] = f"Revisão da carteira - {info['mes_nome']}/{info['ano']}"
+    mensagem['From'] = remetente
+    mensagem['To'] = ', '.join(destinatarios)
+    mensagem['Message-ID'] = make_msgid(domain=remetente.rpartition('@')[2] or None)
+    mensagem.set_content(_texto(gc, info))
+    mensagem.add_alternative(_html(gc, info), subtype='html')
+    return mensagem
+
+
+# Função para montar as mensagens de todos os GCs
+def montar_mensagens(links, destinatarios, remetente):
+    """Retorna ({GC: mensagem}, [GCs sem e-mail na lista])"""
+    mensagens, sem_email = {}, []
+    for gc, info in links.items():
+        if destinatarios.get(gc):
+            mensagens[gc] = montar_mensagem(gc, info, destinatarios[gc], remetente)
+        else:
+            sem_email.append(gc)
+    return mensagens, sem_email
+
+
+class LimiteTaxa:
+    """Espaça as chamadas de `aguardar()` para no máximo `por_segundo` por segundo (0 = sem limite)"""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1 / por_segundo if por_segundo else 0
+        self._proximo = 0.0
+
+    async def aguardar(self):
+        if not self.intervalo:
+            return
+        agora = asyncio.get_running_loop().time()
+        # Reserva o próximo horário livre antes de dormir (sem await entre ler e gravar)
+        horario = max(agora, self._proximo)
+        self._proximo = horario + self.intervalo
+        if horario > agora:
+            await asyncio.sleep(horario - agora)
+
+
+class RegistroEnvios:
+    """Registro de envios só de acréscimo (JSON Lines), um evento por GC e campanha.
+
+    Um GC com status "enviado" numa campanha não é enviado de novo nela;
+    falhas ficam registradas e são tentadas outra vez na próxima execução.
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or CAMINHO_REGISTRO
+        if os.path.dirname(self.caminho):
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def eventos(self, campanha=None):
+        """Eventos do registro (da campanha, se informada); linhas truncadas são ignoradas"""
+        if not os.path.exists(self.caminho):
+            return
+        with open(self.caminho, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                try:
+                    evento = json.loads(linha)
+                except json.JSONDecodeError:
+                    continue
+                if campanha is None or evento.get('campanha') == campanha:
+                    yield evento
+
+    def enviados(self, campanha):
+        """GCs já enviados na campanha"""
+        return {evento['gc'] for evento in self.eventos(campanha) if evento.get('status') == 'enviado'}
+
+    def registrar(self, campanha, gc, destinatarios, status, tentativas, erro=None):
+        evento = {
+            'quando': datetime.now().isoformat(timespec='seconds'),
+            'campanha': campanha,
+            'gc': gc,
+            'destinatarios': destinatarios,
+            'status': status,
+            'tentativas': tentativas,
+            'erro': erro,
+        }
+        with self._lock:
+            with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(evento, ensure_ascii=False, separators=(',', ':')) + '\n')
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+
+
+# Função para classificar uma falha de envio
+def _temporaria(erro):
+    """True para falhas que valem nova tentativa (4xx, conexão caída ou recusada, timeout)"""
+    if isinstance(erro, smtplib.SMTPRecipientsRefused):
+        return all(400 <= codigo < 500 for codigo, _ in erro.recipients.values())
+    if isinstance(erro, smtplib.SMTPResponseException):
+        return 400 <= erro.smtp_code < 500
+    if isinstance(erro, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(erro, smtplib.SMTPException):
+        return False
+    return isinstance(erro, OSError)
+
+
+# Função para abrir uma conexão SMTP
+def conectar(config):
+    conexao = smtplib.SMTP(config['host'], config['porta'], timeout=TIMEOUT)
+    try:
+        if config.get('starttls'):
+            conexao.starttls(context=ssl.create_default_context())
+        if config.get('usuario'):
+            conexao.login(config['usuario'], config['senha'])
+    except BaseException:
+        conexao.close()
+        raise
+    return conexao
+
+
+# Função para fechar uma conexão sem propagar erros
+def _fechar(conexao):
+    try:
+        conexao.quit()
+    except (smtplib.SMTPException, OSError):
+        conexao.close()
+
+
+async def enviar_campanha(mensagens, config, registro, campanha, concorrencia=None, por_segundo=None,
+                          tentativas=TENTATIVAS_PADRAO, espera_base=ESPERA_BASE):
+    """Envia {GC: mensagem} e retorna o resumo {'enviados', 'pulados', 'falhas', 'segundos'}.
+
+    `falhas` é a lista de {'gc', 'erro', 'tentativas'} dos GCs não enviados.
+    """
+    inicio = time.perf_counter()
+    ja_enviados = registro.enviados(campanha)
+    fila = asyncio.Queue()
+    for gc, mensagem in mensagens.items():
+        if gc not in ja_enviados:
+            fila.put_nowait((gc, mensagem))
+    pulados = len(mensagens) - fila.qsize()
+    concorrencia = max(1, min(concorrencia or CONCORRENCIA_PADRAO, fila.qsize()))
+    limite = LimiteTaxa(POR_SEGUNDO_PADRAO if por_segundo is None else por_segundo)
+    loop = asyncio.get_running_loop()
+    resultado = {'enviados': 0, 'pulados': pulados, 'falhas': []}
+
+    async def trabalhador(pool):
+        conexao = None
+        try:
+            while not fila.empty():
+                gc, mensagem = fila.get_nowait()
+                destinatarios = [e.strip() for e in mensagem['To'].split(',')]
+                for tentativa in range(1, tentativas + 1):
+                    await limite.aguardar()
+                    try:
+                        if conexao is None:
+                            conexao = await loop.run_in_executor(pool, conectar, config)
+                        await loop.run_in_executor(pool, conexao.send_message, mensagem)
+                    except (smtplib.SMTPException, OSError) as e:
+                        # Depois de qualquer falha a conexão é refeita (o estado da sessão é incerto)
+                        if conexao is not None:
+                            await loop.run_in_executor(pool, _fechar, conexao)
+                            conexao = None
+                        if _temporaria(e) and tentativa < tentativas:
+                            await asyncio.sleep(espera_base * 2 ** (tentativa - 1))
+                            continue
+                        registro.registrar(campanha, gc, destinatarios, 'falha', tentativa, str(e))
+                        resultado['falhas'].append({'gc': gc, 'erro': str(e), 'tentativas': tentativa})
+                    else:
+                        registro.registrar(campanha, gc, destinatarios, 'enviado', tentativa)
+                        resultado['enviados'] += 1
+                    break
+        finally:
+            if conexao is not None:
+                await loop.run_in_executor(pool, _fechar, conexao)
+
+    if fila.qsize():
+        # Uma thread por trabalhador: cada uma só usa a conexão do seu trabalhador
+        with ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix='smtp') as pool:
+            await asyncio.gather(*(trabalhador(pool) for _ in range(concorrencia)))
+
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+# Função para enviar uma campanha fora de um laço asyncio (app e linha de comando)
+def enviar(mensagens, config, registro, campanha, **opcoes):
+    return asyncio.run(enviar_campanha(mensagens, config, registro, campanha, **opcoes))
+
+
+class ServidorSMTPLocal:
+    """Servidor SMTP mínimo em memória, numa thread, para testes e para o modo de teste.
+
+    Aceita qualquer remetente e destinatário e guarda cada mensagem recebida
+    em `mensagens` ({'remetente', 'destinatarios', 'mensagem'}). As primeiras
+    `falhas_temporarias` mensagens são recusadas com 451 e `atraso` simula a
+    latência de um servidor real (segundos por mensagem).
+
+        with ServidorSMTPLocal() as servidor:
+            enviar(mensagens, servidor.config(), registro, 'teste')
+    """
+
+    def __init__(self, host='127.0.0.1', porta=0, falhas_temporarias=0, atraso=0.0):
+        self.host = host
+        self.porta = porta
+        self.falhas_temporarias = falhas_temporarias
+        self.atraso = atraso
+        self.mensagens = []
+        self._loop = None
+        self._servidor = None
+        self._thread = None
+
+    def config(self, **alteracoes):
+        """Configuração SMTP apontando para este servidor (sem TLS nem login)"""
+        return config_smtp(**{'host': self.host, 'porta': self.porta, 'starttls': False, 'usuario': '', 'senha': '',
+                              **alteracoes})
+
+    def iniciar(self):
+        pronto = threading.Event()
+
+        def executar():
+            self._loop = asyncio.new_event_loop()
+            self._servidor = self._loop.run_until_complete(
+                asyncio.start_server(self._atender, self.host, self.porta)
+            )
+            self.porta = self._servidor.sockets[0].getsockname()[1]
+            pronto.set()
+            self._loop.run_forever()
+            self._servidor.close()
+            self._loop.run_until_complete(self._servidor.wait_closed())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=executar, name='smtp-local', daemon=True)
+        self._thread.start()
+        pronto.wait()
+        return self
+
+    def parar(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *erro):
+        self.parar()
+
+    async def _atender(self, leitor, escritor):
+        def responder(texto):
+            escritor.write(texto.encode() + b'\r\n')
+
+        remetente, destinatarios = None, []
+        responder('220 localhost ESMTP carteira')
+        try:
+            while True:
+                await escritor.drain()
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                comando = linha.decode('utf-8', 'replace').strip()
+                verbo = comando[:4].upper()
+                if verbo == 'EHLO':
+                    responder('250-localhost')
+                    responder('250-8BITMIME')
+                    responder('250 SMTPUTF8')
+                elif verbo == 'HELO':
+                    responder('250 localhost')
+                elif verbo == 'MAIL':
+                    remetente, destinatarios = comando.partition(':')[2].strip(), []
+                    responder('250 OK')
+                elif verbo == 'RCPT':
+                    destinatarios.append(comando.partition(':')[2].strip())
+                    responder('250 OK')
+                elif verbo == 'DATA':
+                    if not destinatarios:
+                        responder('503 RCPT primeiro')
+                        continue
+                    responder('354 Termine com <CRLF>.<CRLF>')
+                    await escritor.drain()
+                    linhas = []
+                    while True:
+                        linha = await leitor.readline()
+                        if not linha or linha in (b'.\r\n', b'.\n'):
+                            break
+                        linhas.append(linha[1:] if linha.startswith(b'..') else linha)
+                    if self.atraso:
+                        await asyncio.sleep(self.atraso)
+                    if self.falhas_temporarias > 0:
+                        self.falhas_temporarias -= 1
+                        responder('451 Tente mais tarde')
+                    else:
+                        self.mensagens.append({
+                            'remetente': remetente,
+                            'destinatarios': destinatarios,
+                            'mensagem': email.message_from_bytes(b''.join(linhas), policy=politica_padrao),
+                        })
+                        responder('250 OK')
+                    remetente, destinatarios = None, []
+                elif verbo == 'RSET':
+                    remetente, destinatarios = None, []
+                    responder('250 OK')
+                elif verbo == 'NOOP':
+                    responder('250 OK')
+                elif verbo == 'QUIT':
+                    responder('221 Até logo')
+                    break
+                else:
+                    responder('502 Comando não implementado')
+            await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m carteira.notificacoes',
+        description="Envia a cada GC o link personalizado e o resumo da carteira do mês por e-mail."
+    )
+    parser.add_argument('planilha', help="Arquivo Excel da carteira (.xlsx ou .xls)")
+    parser.add_argument('--destinatarios', required=True, help="CSV com as colunas GC e E-mail")
+    parser.add_argument('--mes', help="AAAA-MM (padrão: mês de trabalho atual)")
+    parser.add_argument('--campanha', help="Nome da campanha no registro de envios (padrão: AAAA-MM)")
+    parser.add_argument('--remetente', default=SMTP_PADRAO['remetente'] or None,
+                        help="Endereço do remetente (padrão: CARTEIRA_SMTP_REMETENTE)")
+    parser.add_argument('--registro', help="Registro de envios (padrão: CARTEIRA_ENVIOS; com --teste, um temporário)")
+    parser.add_argument('--concorrencia', type=int, default=CONCORRENCIA_PADRAO, help="Conexões SMTP simultâneas")
+    parser.add_argument('--por-segundo', type=float, default=POR_SEGUNDO_PADRAO,
+                        help="Máximo de mensagens por segundo (0 = sem limite)")
+    parser.add_argument('--tentativas', type=int, default=TENTATIVAS_PADRAO, help="Tentativas por mensagem")
+    parser.add_argument('--base-url', default=BASE_URL, help="URL base dos links")
+    parser.add_argument('--revisoes', help="Banco de revisões para o progresso (ex.: dados/revisoes.db)")
+    parser.add_argument('--teste', action='store_true',
+                        help="Enviar para um servidor SMTP local em memória (nada sai da máquina)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.mes:
+            periodo = pd.Period(args.mes, freq='M')
+            mes, ano = periodo.month, periodo.year
+        else:
+            mes, ano = get_mes_trabalho()
+    except ValueError:
+        parser.error(f"Mês inválido: {args.mes} (use AAAA-MM)")
+    if not args.teste and not SMTP_PADRAO['host']:
+        parser.error("Defina CARTEIRA_SMTP_HOST ou use --teste")
+    remetente = args.remetente or ('carteira@localhost' if args.teste else None)
+    if not remetente:
+        parser.error("Informe --remetente ou CARTEIRA_SMTP_REMETENTE")
+
+    with open(args.destinatarios, 'rb') as arquivo:
+        destinatarios = ler_destinatarios(arquivo.read())
+    with open(args.planilha, 'rb') as arquivo:
+        # Só o mês da campanha é lido da planilha
+        _, df, _, avisos = carregar_carteira(arquivo.read(), CacheCarteira(), mes, ano)
+    for aviso in avisos:
+        print(aviso, file=sys.stderr)
+
+    df_mes = filtrar_por_mes_trabalho(df, mes, ano)
+    if args.revisoes:
+        df_mes = aplicar_revisoes(df_mes, tabela_revisoes(criar_repositorio(args.revisoes).todas()))
+    links = generate_personalized_links(df_mes, mes, ano, args.base_url)
+    mensagens, sem_email = montar_mensagens(links, destinatarios, remetente)
+    for gc in sem_email:
+        print(f"Sem e-mail na lista: {gc}", file=sys.stderr)
+
+    campanha = args.campanha or f"{ano:04d}-{mes:02d}"
+    opcoes = {'concorrencia': args.concorrencia, 'por_segundo': args.por_segundo, 'tentativas': args.tentativas}
+    if args.teste:
+        # Envios de teste não entram no registro real (não marcam a campanha como enviada)
+        with tempfile.TemporaryDirectory() as temporario, ServidorSMTPLocal() as servidor:
+            registro = RegistroEnvios(args.registro or os.path.join(temporario, 'envios.jsonl'))
+            resultado = enviar(mensagens, servidor.config(), registro, campanha, **opcoes)
+    else:
+        resultado = enviar(mensagens, config_smtp(), RegistroEnvios(args.registro), campanha, **opcoes)
+
+    for falha in resultado['falhas']:
+        print(f"Falha ({falha['tentativas']} tentativas): {falha['gc']}: {falha['erro']}", file=sys.stderr)
+    print(f"{resultado['enviados']} e-mails enviados, {resultado['pulados']} já enviados antes, "
+          f"{len(resultado['falhas'])} falhas, {len(sem_email)} GCs sem e-mail "
+          f"({resultado['segundos']:.1f}s)")
+    return 1 if resultado['falhas'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
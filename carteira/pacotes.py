@@ -0,0 +1,160 @@
+"""Geração em lote, sem Streamlit, dos pacotes dos GCs (links, resumos por grupo e progresso).
+
+Uso:
+    python -m carteira.pacotes carteira.xlsx --meses 2026-01:2026-12 --saida pacotes
+
+Para cada mês é gravado um diretório AAAA-MM com um resumo por grupo de cada
+GC (gcs/<hash>.csv ou .parquet) e o manifesto do mês; na raiz fica o
+manifesto de todos os meses processados.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from carteira.cache import CacheCarteira
+from carteira.carga import carregar_carteira
+from carteira.links import BASE_URL, generate_personalized_links
+from carteira.particao import construir_indice_mensal, filtrar_por_mes_trabalho, get_mes_trabalho
+from carteira.repositorio import criar_repositorio
+from carteira.revisoes import aplicar_revisoes, tabela_revisoes
+
+FORMATOS = ('csv', 'parquet')
+
+# Colunas do manifesto (uma linha por GC e mês)
+COLUNAS_MANIFESTO = ['ano', 'mes', 'GC', 'hash', 'link', 'pedidos', 'valor_mm', 'volume',
+                     'revisados', 'perc_revisao', 'arquivo']
+
+
+# Função para interpretar a lista de meses ("2026-01:2026-06,2026-09")
+def interpretar_meses(texto):
+    """Retorna a lista ordenada de (ano, mes) dos itens AAAA-MM ou intervalos AAAA-MM:AAAA-MM"""
+    meses = set()
+    for item in filter(None, (parte.strip() for parte in texto.split(','))):
+        inicio, _, fim = item.partition(':')
+        try:
+            primeiro = pd.Period(inicio, freq='M')
+            ultimo = pd.Period(fim or inicio, freq='M')
+        except ValueError:
+            raise ValueError(f"Mês inválido: {item} (use AAAA-MM ou AAAA-MM:AAAA-MM)") from None
+        if ultimo < primeiro:
+            raise ValueError(f"Intervalo invertido: {item}")
+        meses.update((p.year, p.month) for p in pd.period_range(primeiro, ultimo, freq='M'))
+    return sorted(meses)
+
+
+# Função para gravar uma tabela no formato escolhido
+def _gravar_tabela(tabela, caminho, formato):
+    if formato == 'parquet':
+        tabela.to_parquet(caminho, index=False)
+    else:
+        # Mesmo padrão dos CSVs para Excel em português: ';' e BOM UTF-8
+        tabela.to_csv(caminho, index=False, sep=';', encoding='utf-8-sig')
+
+
+# Função que processa um mês (executada nos processos do pool)
+def processar_mes(df_mes, mes, ano, saida, formato='csv', base_url=BASE_URL):
+    """Grava os resumos por grupo de cada GC do mês e devolve o manifesto do mês"""
+    diretorio = os.path.join(saida, f"{ano:04d}-{mes:02d}")
+    os.makedirs(os.path.join(diretorio, 'gcs'), exist_ok=True)
+
+    links = generate_personalized_links(df_mes, mes, ano, base_url)
+    linhas = []
+    for gc, info in links.items():
+        arquivo = os.path.join('gcs', f"{info['hash']}.{formato}")
+        _gravar_tabela(info['grupos'], os.path.join(diretorio, arquivo), formato)
+        linhas.append({
+            'ano': ano,
+            'mes': mes,
+            'GC': gc,
+            'hash': info['hash'],
+            'link': info['link'],
+            'pedidos': info['pedidos'],
+            'valor_mm': round(info['valor'], 2),
+            'volume': round(info['volume'], 2),
+            'revisados': info['revisados'],
+            'perc_revisao': round(info['perc_revisao'], 1),
+            'arquivo': os.path.join(os.path.basename(diretorio), arquivo),
+        })
+
+    manifesto = pd.DataFrame(linhas, columns=COLUNAS_MANIFESTO)
+    _gravar_tabela(manifesto, os.path.join(diretorio, f"manifesto.{formato}"), formato)
+    return manifesto
+
+
+# Função para gerar os pacotes de vários meses
+def gerar_pacotes(df, meses, saida, formato='csv', base_url=BASE_URL, revisoes=None, processos=None):
+    """Processa os meses em um pool de processos e grava o manifesto geral.
+
+    `df` é a carteira já carregada (carregar_carteira); `revisoes` é o
+    dicionário {ordem: revisão} aplicado antes de calcular o progresso.
+    Cada processo recebe só a fatia do seu mês. Retorna o manifesto geral.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (use {' ou '.join(FORMATOS)})")
+    os.makedirs(saida, exist_ok=True)
+
+    indice = construir_indice_mensal(df)
+    tabela = tabela_revisoes(revisoes) if revisoes else None
+    fatias = []
+    for ano, mes in meses:
+        df_mes = filtrar_por_mes_trabalho(df, mes, ano, indice)
+        if len(df_mes):
+            fatias.append((aplicar_revisoes(df_mes, tabela), mes, ano))
+
+    manifestos = []
+    if processos == 1 or len(fatias) <= 1:
+        manifestos = [processar_mes(df_mes, mes, ano, saida, formato, base_url) for df_mes, mes, ano in fatias]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            futuros = [pool.submit(processar_mes, df_mes, mes, ano, saida, formato, base_url)
+                       for df_mes, mes, ano in fatias]
+            manifestos = [futuro.result() for futuro in as_completed(futuros)]
+
+    manifesto = pd.concat(manifestos, ignore_index=True) if manifestos else pd.DataFrame(columns=COLUNAS_MANIFESTO)
+    manifesto = manifesto.sort_values(['ano', 'mes', 'GC'], kind='stable', ignore_index=True)
+    _gravar_tabela(manifesto, os.path.join(saida, f"manifesto.{formato}"), formato)
+    return manifesto
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m carteira.pacotes',
+        description="Gera links, resumos por grupo e progresso de todos os GCs sem abrir o dashboard."
+    )
+    parser.add_argument('planilha', help="Arquivo Excel da carteira (.xlsx ou .xls)")
+    parser.add_argument('--meses', help="AAAA-MM, intervalos AAAA-MM:AAAA-MM separados por vírgula "
+                                        "(padrão: mês de trabalho atual)")
+    parser.add_argument('--saida', default='pacotes', help="Diretório de saída (padrão: pacotes)")
+    parser.add_argument('--formato', choices=FORMATOS, default='csv', help="Formato dos resumos (padrão: csv)")
+    parser.add_argument('--processos', type=int, default=None, help="Processos do pool (padrão: nº de CPUs)")
+    parser.add_argument('--base-url', default=BASE_URL, help="URL base dos links")
+    parser.add_argument('--revisoes', help="Banco de revisões para o progresso (ex.: dados/revisoes.db)")
+    parser.add_argument('--sem-cache', action='store_true', help="Não ler nem gravar o cache de carteiras em disco")
+    args = parser.parse_args(argv)
+
+    try:
+        meses = interpretar_meses(args.meses) if args.meses else [get_mes_trabalho()[::-1]]
+    except ValueError as e:
+        parser.error(str(e))
+
+    inicio = time.perf_counter()
+    with open(args.planilha, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    _, df, _, avisos = carregar_carteira(conteudo, None if args.sem_cache else CacheCarteira())
+    for aviso in avisos:
+        print(aviso, file=sys.stderr)
+
+    revisoes = criar_repositorio(args.revisoes).todas() if args.revisoes else None
+    manifesto = gerar_pacotes(df, meses, args.saida, args.formato, args.base_url, revisoes, args.processos)
+
+    print(f"{len(manifesto)} pacotes de GC em {manifesto[['ano', 'mes']].drop_duplicates().shape[0]} meses "
+          f"gravados em {args.saida} ({time.perf_counter() - inicio:.1f}s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Partição da carteira por mês de trabalho (ano, mês) -> fatia de linhas"""
+from datetime import datetime
+
+import numpy as np
+
+COLUNA_DATA = 'Data_Trabalho'
+
+
+# Função para calcular a chave de mês de cada linha (ano * 12 + mês - 1; -1 para datas vazias)
+def _chave_mes(df, coluna=COLUNA_DATA):
+    datas = df[coluna]
+    chave = (datas.dt.year * 12 + datas.dt.month - 1).to_numpy(dtype='float64', na_value=np.nan)
+    return np.where(np.isnan(chave), -1, chave).astype('int64')
+
+
+# Função para ordenar fisicamente a carteira por mês de trabalho
+def ordenar_por_mes(df, coluna=COLUNA_DATA):
+    """Ordena as linhas por mês (estável, mantendo a ordem do arquivo dentro do mês)"""
+    if coluna not in df.columns:
+        return df
+    chave = _chave_mes(df, coluna)
+    # Datas vazias vão para o final
+    chave = np.where(chave < 0, np.iinfo('int64').max, chave)
+    ordem = np.argsort(chave, kind='stable')
+    return df.iloc[ordem].reset_index(drop=True)
+
+
+# Função para montar o índice de meses de uma carteira já ordenada
+def construir_indice_mensal(df, coluna=COLUNA_DATA):
+    """Retorna {(ano, mes): slice} com as posições de cada mês; None se não houver coluna de data"""
+    if coluna not in df.columns:
+        return None
+    chave = _chave_mes(df, coluna)
+    validas = chave[chave >= 0]
+    if len(validas) and np.any(np.diff(validas) < 0):
+        raise ValueError("Carteira não está ordenada por mês - use ordenar_por_mes antes")
+
+    inicios = np.flatnonzero(np.r_[True, validas[1:] != validas[:-1]]) if len(validas) else np.array([], dtype=int)
+    fins = np.r_[inicios[1:], len(validas)]
+    indice = {}
+    for inicio, fim in zip(inicios, fins):
+        ano, mes = divmod(int(validas[inicio]), 12)
+        indice[(ano, mes + 1)] = slice(int(inicio), int(fim))
+    return indice
+
+
+# Função para selecionar um mês usando o índice
+def fatia_do_mes(df, indice, mes, ano):
+    """Retorna as linhas do mês sem copiar nem reprocessar datas"""
+    return df.iloc[indice.get((ano, mes), slice(0, 0))]
+
+
+# Função para determinar o mês de trabalho
+def get_mes_trabalho(hoje=None):
+    """Retorna o mês que deve ser trabalhado baseado no mês atual"""
+    hoje = hoje or datetime.now()
+    mes_trabalho = hoje.month + 1
+    ano_trabalho = hoje.year
+
+    # Se dezembro, próximo é janeiro do ano seguinte
+    if mes_trabalho > 12:
+        mes_trabalho = 1
+        ano_trabalho += 1
+
+    return mes_trabalho, ano_trabalho
+
+
+# Função para filtrar por mês de trabalho
+def filtrar_por_mes_trabalho(df, mes=None, ano=None, indice=None):
+    """Filtra o dataframe pelo mês de trabalho (fatia direta quando há índice mensal)"""
+    if mes is None or ano is None:
+        mes, ano = get_mes_trabalho()
+
+    if indice is not None:
+        return fatia_do_mes(df, indice, mes, ano)
+
+    # Sem índice: usar a Data_Trabalho já convertida na carga, sem alterar o df recebido
+    if COLUNA_DATA in df.columns:
+        mask = (df[COLUNA_DATA].dt.month == mes) & (df[COLUNA_DATA].dt.year == ano)
+        return df[mask]
+
+    return df
@@ -0,0 +1,70 @@
+"""Registro das carteiras carregadas, compartilhado por todas as sessões do processo"""
+import os
+import threading
+from collections import OrderedDict
+
+from carteira.particao import construir_indice_mensal
+from carteira.visoes import VisoesCarteira
+
+MAXIMO_PADRAO = int(os.environ.get('CARTEIRA_REGISTRO_MAX', '3'))
+
+
+class RegistroCarteiras:
+    """Uma cópia de cada versão de carteira (chave = SHA-256 do arquivo), com o índice mensal.
+
+    As entradas são dicionários {'chave', 'df', 'indice', 'visoes'} e devem ser
+    tratadas como somente leitura: as sessões guardam apenas a chave e derivam
+    fatias do DataFrame compartilhado; `visoes` guarda as fatias por GC e mês
+    já montadas (VisoesCarteira), descartadas junto com a versão da carteira.
+    A carteira "atual" (último upload do admin) é gravada junto ao cache em
+    disco para que os links dos GCs a encontrem mesmo depois de reiniciar o
+    processo.
+    """
+
+    def __init__(self, cache, maximo=None):
+        self.cache = cache
+        self.maximo = maximo or MAXIMO_PADRAO
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()
+        self._atual = None
+
+    def publicar(self, chave, df):
+        """Registra a carteira tratada e retorna a entrada"""
+        indice = construir_indice_mensal(df)
+        entrada = {'chave': chave, 'df': df, 'indice': indice, 'visoes': VisoesCarteira(df, indice)}
+        with self._lock:
+            self._itens[chave] = entrada
+            self._itens.move_to_end(chave)
+            self._remover_excedentes()
+        return entrada
+
+    def obter(self, chave):
+        """Entrada em memória ou lida do cache em disco; None se não houver"""
+        if chave is None:
+            return None
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if entrada is not None:
+                self._itens.move_to_end(chave)
+                return entrada
+        df = self.cache.ler(chave)
+        return self.publicar(chave, df) if df is not None else None
+
+    def definir_atual(self, chave):
+        """Marca a carteira usada pelos links dos GCs"""
+        if chave != self._atual:
+            self._atual = chave
+            self.cache.marcar_atual(chave)
+
+    def atual(self):
+        """Entrada da carteira atual (ou None se nenhuma foi carregada)"""
+        chave = self._atual or self.cache.chave_atual()
+        return self.obter(chave)
+
+    def _remover_excedentes(self):
+        # A carteira atual nunca sai do registro
+        for chave in list(self._itens):
+            if len(self._itens) <= self.maximo:
+                break
+            if chave != self._atual:
+                del self._itens[chave]
@@ -0,0 +1,291 @@
+"""Repositório de revisões compartilhado entre sessões (memória ou SQLite em modo WAL)"""
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from carteira.revisoes import COLUNAS_REVISAO
+
+CAMINHO_PADRAO = os.environ.get(
+    'CARTEIRA_REVISOES_DB',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dados', 'revisoes.db')
+)
+
+# Campos gravados por revisão, além da ordem
+CAMPOS = COLUNAS_REVISAO + ['mes', 'ano']
+
+
+# Função para normalizar a chave da ordem
+def normalizar_ordem(ordem):
+    """Ordens numéricas viram int (chaves de JSON chegam como texto, as do Excel como numpy)"""
+    if hasattr(ordem, 'item'):
+        ordem = ordem.item()
+    if isinstance(ordem, float) and ordem.is_integer():
+        return int(ordem)
+    if isinstance(ordem, str):
+        texto = ordem.strip()
+        # Só converter quando não perde nada (ex.: zeros à esquerda)
+        if texto.lstrip('-').isdigit() and str(int(texto)) == texto:
+            return int(texto)
+        return texto
+    return ordem
+
+
+# Função para escolher o mês de trabalho gravado com a revisão
+def _mes_ano(dados, mes, ano):
+    """Mês e ano da própria revisão; os informados no registro quando ela não traz (ausentes ou None)"""
+    return (
+        dados['mes'] if dados.get('mes') is not None else mes,
+        dados['ano'] if dados.get('ano') is not None else ano,
+    )
+
+
+class RepositorioRevisoes(ABC):
+    """Interface dos repositórios de revisão.
+
+    Cada gravação (um lote) incrementa a versão do repositório. As remoções
+    ficam registradas, então `alteracoes_desde` devolve o estado atual de cada
+    ordem alterada - a revisão ou None quando foi removida.
+    """
+
+    @abstractmethod
+    def versao(self):
+        """Versão atual (número de lotes gravados)"""
+
+    @abstractmethod
+    def registrar(self, revisoes, mes=None, ano=None):
+        """Grava {ordem: revisão} em um único lote e retorna a nova versão"""
+
+    @abstractmethod
+    def remover(self, ordens):
+        """Remove as revisões das ordens em um único lote e retorna a nova versão"""
+
+    @abstractmethod
+    def limpar(self, mes, ano):
+        """Remove as revisões do mês de trabalho (as de outros meses ficam) e retorna a nova versão"""
+
+    @abstractmethod
+    def obter(self, ordem):
+        """Revisão ativa da ordem ou None"""
+
+    @abstractmethod
+    def todas(self):
+        """Retorna {ordem: revisão} com todas as revisões ativas"""
+
+    @abstractmethod
+    def por_gc(self, gc, mes=None, ano=None):
+        """Revisões ativas do GC, só do mês quando mes e ano são informados"""
+
+    @abstractmethod
+    def por_mes(self, mes, ano):
+        """Revisões ativas do mês de trabalho"""
+
+    @abstractmethod
+    def alteracoes_desde(self, versao):
+        """Retorna (versão atual, [(ordem, revisão ou None), ...]) das ordens alteradas após `versao`"""
+
+
+class RepositorioMemoria(RepositorioRevisoes):
+    """Repositório em memória do processo (sem persistência)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versao = 0
+        self._registros = {}  # ordem -> (versão, revisão ou None)
+
+    def versao(self):
+        return self._versao
+
+    def _gravar(self, itens):
+        with self._lock:
+            self._versao += 1
+            for ordem, revisao in itens:
+                self._registros[normalizar_ordem(ordem)] = (self._versao, revisao)
+            return self._versao
+
+    def registrar(self, revisoes, mes=None, ano=None):
+        itens = []
+        for ordem, dados in revisoes.items():
+            mes_revisao, ano_revisao = _mes_ano(dados, mes, ano)
+            itens.append((ordem, {**{c: dados.get(c) for c in COLUNAS_REVISAO}, 'mes': mes_revisao, 'ano': ano_revisao}))
+        return self._gravar(itens)
+
+    def remover(self, ordens):
+        return self._gravar((ordem, None) for ordem in ordens)
+
+    def limpar(self, mes, ano):
+        return self.remover(list(self.por_mes(mes, ano)))
+
+    def obter(self, ordem):
+        registro = self._registros.get(normalizar_ordem(ordem))
+        return registro[1] if registro else None
+
+    def todas(self):
+        return {ordem: revisao for ordem, (_, revisao) in list(self._registros.items()) if revisao is not None}
+
+    def por_gc(self, gc, mes=None, ano=None):
+        return {ordem: r for ordem, r in self.todas().items()
+                if r['gc'] == gc and (mes is None or (r['mes'] == mes and r['ano'] == ano))}
+
+    def por_mes(self, mes, ano):
+        return {ordem: r for ordem, r in self.todas().items() if r['mes'] == mes and r['ano'] == ano}
+
+    def alteracoes_desde(self, versao):
+        with self._lock:
+            atual = self._versao
+            alteradas = [(ordem, revisao) for ordem, (v, revisao) in self._registros.items() if v > versao]
+        return atual, alteradas
+
+
+ESQUEMA_SQL = """
+CREATE TABLE IF NOT EXISTS revisoes (
+    ordem PRIMARY KEY,
+    gc TEXT,
+    data_revisao TEXT,
+    nova_data TEXT,
+    justificativa TEXT,
+    acao TEXT,
+    mes INTEGER,
+    ano INTEGER,
+    removida INTEGER NOT NULL DEFAULT 0,
+    versao INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_revisoes_gc ON revisoes (gc, ano, mes);
+CREATE INDEX IF NOT EXISTS idx_revisoes_mes ON revisoes (ano, mes);
+CREATE INDEX IF NOT EXISTS idx_revisoes_versao ON revisoes (versao);
+CREATE TABLE IF NOT EXISTS controle (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    versao INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO controle (id, versao) VALUES (1, 0);
+"""
+
+_COLUNAS = f"ordem, {', '.join(CAMPOS)}"
+
+
+class RepositorioSQLite(RepositorioRevisoes):
+    """Repositório em SQLite (WAL): várias sessões e processos gravam e leem ao mesmo tempo.
+
+    Cada thread usa a sua própria conexão; as gravações são feitas em lote numa
+    transação BEGIN IMMEDIATE, e os leitores não bloqueiam os escritores.
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or CAMINHO_PADRAO
+        if os.path.dirname(self.caminho):
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        self._local = threading.local()
+        self._conexao().executescript(ESQUEMA_SQL)
+
+    def _conexao(self):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=30, isolation_level=None, check_same_thread=False)
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            self._local.con = con
+        return con
+
+    @contextmanager
+    def _transacao(self):
+        con = self._conexao()
+        con.execute('BEGIN IMMEDIATE')
+        try:
+            yield con
+            con.execute('COMMIT')
+        except BaseException:
+            con.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _proxima_versao(con):
+        con.execute("UPDATE controle SET versao = versao + 1 WHERE id = 1")
+        return con.execute("SELECT versao FROM controle WHERE id = 1").fetchone()[0]
+
+    @staticmethod
+    def _revisao(linha):
+        return dict(zip(CAMPOS, linha[1:]))
+
+    def _consultar(self, onde='', parametros=()):
+        cursor = self._conexao().execute(f"SELECT {_COLUNAS} FROM revisoes WHERE removida = 0 {onde}", parametros)
+        return {linha[0]: self._revisao(linha) for linha in cursor}
+
+    def versao(self):
+        return self._conexao().execute("SELECT versao FROM controle WHERE id = 1").fetchone()[0]
+
+    def registrar(self, revisoes, mes=None, ano=None):
+        with self._transacao() as con:
+            versao = self._proxima_versao(con)
+            con.executemany(
+                f"""INSERT INTO revisoes (ordem, {', '.join(CAMPOS)}, removida, versao)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?)
+                    ON CONFLICT (ordem) DO UPDATE SET
+                        {', '.join(f'{c} = excluded.{c}' for c in CAMPOS)},
+                        removida = 0, versao = excluded.versao""",
+                [
+                    (normalizar_ordem(ordem), *[_texto(dados.get(c)) for c in COLUNAS_REVISAO],
+                     *_mes_ano(dados, mes, ano), versao)
+                    for ordem, dados in revisoes.items()
+                ]
+            )
+        return versao
+
+    def remover(self, ordens):
+        with self._transacao() as con:
+            versao = self._proxima_versao(con)
+            con.executemany(
+                "UPDATE revisoes SET removida = 1, versao = ? WHERE ordem = ? AND removida = 0",
+                [(versao, normalizar_ordem(ordem)) for ordem in ordens]
+            )
+        return versao
+
+    def limpar(self, mes, ano):
+        with self._transacao() as con:
+            versao = self._proxima_versao(con)
+            con.execute("UPDATE revisoes SET removida = 1, versao = ? WHERE removida = 0 AND ano = ? AND mes = ?",
+                        (versao, ano, mes))
+        return versao
+
+    def obter(self, ordem):
+        return self._consultar("AND ordem = ?", (normalizar_ordem(ordem),)).get(normalizar_ordem(ordem))
+
+    def todas(self):
+        return self._consultar()
+
+    def por_gc(self, gc, mes=None, ano=None):
+        if mes is None:
+            return self._consultar("AND gc = ?", (gc,))
+        return self._consultar("AND gc = ? AND ano = ? AND mes = ?", (gc, ano, mes))
+
+    def por_mes(self, mes, ano):
+        return self._consultar("AND ano = ? AND mes = ?", (ano, mes))
+
+    def alteracoes_desde(self, versao):
+        con = self._conexao()
+        # Leitura consistente: versão e linhas na mesma transação de leitura
+        con.execute('BEGIN')
+        try:
+            atual = con.execute("SELECT versao FROM controle WHERE id = 1").fetchone()[0]
+            linhas = con.execute(f"SELECT {_COLUNAS}, removida FROM revisoes WHERE versao > ?", (versao,)).fetchall()
+        finally:
+            con.execute('COMMIT')
+        return atual, [(linha[0], None if linha[-1] else self._revisao(linha[:-1])) for linha in linhas]
+
+
+# Função para converter valores para texto gravável (datas, numpy etc.)
+def _texto(valor):
+    if valor is None or isinstance(valor, str):
+        return valor
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return str(valor)
+
+
+# Função para criar o repositório configurado
+def criar_repositorio(caminho=None):
+    """SQLite no caminho indicado (ou CARTEIRA_REVISOES_DB); ':memory:' usa o repositório em memória"""
+    caminho = caminho or CAMINHO_PADRAO
+    if caminho == ':memory:':
+        return RepositorioMemoria()
+    return RepositorioSQLite(caminho)
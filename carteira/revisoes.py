@@ -0,0 +1,140 @@
+"""Tabela de revisões indexada por Ord.venda e aplicação vetorizada na carteira"""
+import numpy as np
+import pandas as pd
+
+# Campos de cada revisão (mesmo formato gravado em dados_revisao e no JSON exportado)
+COLUNAS_REVISAO = ['gc', 'data_revisao', 'nova_data', 'justificativa', 'acao']
+
+# Colunas da carteira preenchidas por aplicar_revisoes
+COLUNAS_APLICADAS = ['Revisao_Realizada', 'Data_Revisao', 'Revisado_Por', 'Data_Original_Alterada', 'Nova_Data_Entrega']
+
+
+# Função para montar a tabela colunar de revisões
+def tabela_revisoes(dados_revisao):
+    """Converte {ordem: revisão} em um DataFrame indexado por Ord.venda"""
+    if not dados_revisao:
+        return pd.DataFrame(columns=COLUNAS_REVISAO)
+
+    tabela = pd.DataFrame.from_dict(dados_revisao, orient='index')
+    for coluna in COLUNAS_REVISAO:
+        if coluna not in tabela.columns:
+            tabela[coluna] = None
+    tabela = tabela[COLUNAS_REVISAO]
+    tabela['data_revisao'] = pd.to_datetime(tabela['data_revisao'], format='ISO8601', errors='coerce')
+    tabela['nova_data'] = pd.to_datetime(tabela['nova_data'], format='ISO8601', errors='coerce')
+    tabela.index.name = 'Ord.venda'
+    return tabela
+
+
+# Função para converter as chaves para o tipo da coluna Ord.venda
+def _converter_chaves(indice, tipo_ordem):
+    """Índice no tipo da coluna (revisões carregadas de JSON têm chaves texto); NaN onde não converte"""
+    if pd.api.types.is_numeric_dtype(tipo_ordem) and not pd.api.types.is_numeric_dtype(indice.dtype):
+        return pd.Index(pd.to_numeric(pd.Series(indice, dtype=object), errors='coerce'))
+    if pd.api.types.is_string_dtype(tipo_ordem) and not pd.api.types.is_string_dtype(indice.dtype):
+        return indice.astype(str)
+    return indice
+
+
+# Função para alinhar o tipo das chaves com a coluna Ord.venda
+def _alinhar_chaves(tabela, tipo_ordem):
+    """Ajusta o índice ao tipo da coluna, descartando as chaves que não convertem"""
+    indice = _converter_chaves(tabela.index, tipo_ordem)
+    if indice is not tabela.index:
+        tabela = tabela.set_axis(indice, axis=0)[indice.notna()]
+
+    # A mesma ordem pode aparecer como 123 e "123": vale a última revisão
+    if not tabela.index.is_unique:
+        tabela = tabela[~tabela.index.duplicated(keep='last')]
+    return tabela
+
+
+# Função para aplicar a tabela de revisões à carteira
+def aplicar_revisoes(df, tabela):
+    """Aplica as revisões em uma única junção por Ord.venda (ordens repetidas em várias linhas incluídas)"""
+    if tabela is None or tabela.empty or df.empty:
+        return df
+
+    tabela = _alinhar_chaves(tabela, df['Ord.venda'].dtype)
+    posicoes = tabela.index.get_indexer(df['Ord.venda'])
+    revisadas = posicoes >= 0
+    if not revisadas.any():
+        return df
+
+    def alinhar(coluna):
+        # Valor da revisão em cada linha da carteira (linhas sem revisão são mascaradas depois)
+        return pd.Series(tabela[coluna].to_numpy()[posicoes], index=df.index)
+
+    nova_data = alinhar('nova_data')
+    alteradas = revisadas & nova_data.notna().to_numpy()
+
+    df_updated = df.copy()
+    df_updated['Revisao_Realizada'] = df['Revisao_Realizada'].mask(revisadas, True)
+    df_updated['Data_Revisao'] = df['Data_Revisao'].mask(revisadas, alinhar('data_revisao'))
+    df_updated['Revisado_Por'] = df['Revisado_Por'].astype(object).mask(revisadas, alinhar('gc'))
+    df_updated['Data_Original_Alterada'] = df['Data_Original_Alterada'].mask(alteradas, True)
+    df_updated['Nova_Data_Entrega'] = df['Nova_Data_Entrega'].mask(alteradas, nova_data)
+    return df_updated
+
+
+# Função para atualizar uma carteira já revisada só com as revisões alteradas
+def reaplicar_revisoes(df, df_base, alteracoes):
+    """Atualiza df (df_base com revisões aplicadas, mesmo índice) com [(ordem, revisão ou None), ...] em ordem.
+
+    As linhas das ordens alteradas voltam aos valores de df_base e recebem a
+    revisão nova, se houver; o custo é o das linhas de df, não o do total de
+    revisões.
+    """
+    if not alteracoes or df.empty:
+        return df
+
+    # Vale o último estado de cada ordem (alterações acumuladas de várias leituras)
+    alteracoes = dict(alteracoes)
+    ordens = _converter_chaves(pd.Index(list(alteracoes)), df['Ord.venda'].dtype)
+    afetadas = df['Ord.venda'].isin(ordens).to_numpy()
+    if not afetadas.any():
+        return df
+
+    df_updated = df.copy()
+    for coluna in COLUNAS_APLICADAS:
+        df_updated[coluna] = df[coluna].mask(afetadas, df_base[coluna])
+    novas = {ordem: revisao for ordem, revisao in alteracoes.items() if revisao is not None}
+    return aplicar_revisoes(df_updated, tabela_revisoes(novas))
+
+
+# Colunas da tabela de revisões realizadas
+COLUNAS_RESUMO = ['Ordem', 'GC', 'Cliente', 'Grupo', 'Data_Revisao', 'Acao', 'Nova_Data', 'Justificativa']
+
+
+# Função para montar a tabela de revisões realizadas exibida no dashboard
+def resumo_revisoes_realizadas(df, revisoes, tabela=None):
+    """Uma linha por revisão com cliente e grupo da ordem na carteira ('N/A' se a ordem não estiver em df).
+
+    Uma única busca das chaves das revisões no índice Ord.venda (primeira
+    linha de cada ordem) e datas formatadas de forma vetorizada; `tabela` é a
+    tabela_revisoes já montada, quando houver.
+    """
+    tabela = tabela_revisoes(revisoes) if tabela is None else tabela
+    if tabela.empty:
+        return pd.DataFrame(columns=COLUNAS_RESUMO)
+
+    ordens = df[['Ord.venda', 'Nome Emissor', 'Grupo']].drop_duplicates('Ord.venda').set_index('Ord.venda')
+    posicoes = ordens.index.get_indexer(_converter_chaves(tabela.index, df['Ord.venda'].dtype))
+    encontradas = posicoes >= 0
+
+    def buscar(coluna):
+        valores = ordens[coluna].to_numpy(dtype=object)[posicoes]
+        valores[~encontradas] = 'N/A'
+        return valores
+
+    nova_data = tabela['nova_data']
+    return pd.DataFrame({
+        'Ordem': tabela.index.to_numpy(dtype=object),
+        'GC': tabela['gc'].to_numpy(),
+        'Cliente': buscar('Nome Emissor'),
+        'Grupo': buscar('Grupo'),
+        'Data_Revisao': tabela['data_revisao'].dt.strftime('%d/%m/%Y %H:%M').to_numpy(),
+        'Acao': np.where(nova_data.notna(), 'Data Alterada', 'Confirmado'),
+        'Nova_Data': nova_data.dt.strftime('%d/%m/%Y').fillna('-').to_numpy(),
+        'Justificativa': tabela['justificativa'].to_numpy(),
+    })
@@ -0,0 +1,116 @@
+"""Gerador de carteiras sintéticas (DataFrame ou planilha) com as colunas lidas pelo dashboard.
+
+Uso:
+    python -m carteira.sintetico 100000 carteira_100k.xlsx --gcs 300 --grupos 40
+"""
+import argparse
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from carteira.exportacao import LINHAS_XLSX_MAXIMO
+
+STATUS_CREDITO = ['Liberados', 'Não liberado', 'Bloqueados']
+
+
+# Função para formatar valores no padrão brasileiro ("17.454,00")
+def formatar_br(valores):
+    """Formata floats com milhar '.' e decimal ',' (vetorizado sobre as strings)"""
+    textos = pd.Series(np.round(valores, 2)).map('{:,.2f}'.format)
+    return textos.str.replace(',', '_', regex=False).str.replace('.', ',', regex=False).str.replace('_', '.', regex=False)
+
+
+# Função para gerar a carteira sintética
+def gerar_carteira(linhas, gcs=30, grupos=8, diretorias=4, clientes=500, materiais=200,
+                   inicio='2026-01-01', meses=12, itens_por_ordem=1.5, extras=5, semente=0):
+    """DataFrame no formato da planilha original (antes do tratamento de load_data).
+
+    - Vl.Saldo em texto no padrão BR, Saldo numérico;
+    - Revisão Data Faturamento como data, 1ª.DT.DIV.REM e Dt. Dej. Rem. em texto dd/mm/aaaa;
+    - ordens com vários itens (linhas), alguns vazios nas dimensões, e colunas
+      extras que o dashboard não lê.
+    As cardinalidades de GC, Grupo e DIRETORIA são configuráveis; a mesma
+    semente gera sempre a mesma carteira.
+    """
+    rng = np.random.default_rng(semente)
+    inicio = pd.Timestamp(inicio)
+    dias = (inicio + pd.DateOffset(months=meses) - inicio).days
+
+    def escolher(prefixo, quantidade, vazios=0.0):
+        nomes = np.array([f"{prefixo} {i:04d}" for i in range(quantidade)], dtype=object)
+        # Distribuição desigual (alguns valores concentram a maior parte das linhas)
+        pesos = rng.pareto(1.5, quantidade) + 1
+        valores = nomes[rng.choice(quantidade, linhas, p=pesos / pesos.sum())]
+        if vazios:
+            valores[rng.random(linhas) < vazios] = None
+        return valores
+
+    n_ordens = max(1, int(linhas / itens_por_ordem))
+    ordens = np.sort(rng.integers(0, n_ordens, linhas)) + 10_000_000
+    faturamento = inicio + pd.to_timedelta(rng.integers(0, dias, linhas), unit='D')
+    valores = rng.lognormal(11, 1.5, linhas)
+
+    df = pd.DataFrame({
+        'Ord.venda': ordens,
+        'GC': escolher('GC', gcs, vazios=0.001),
+        'Grupo': escolher('Grupo', grupos, vazios=0.01),
+        'DIRETORIA': escolher('Diretoria', diretorias),
+        'Status crédito': np.array(STATUS_CREDITO, dtype=object)[rng.choice(3, linhas, p=[0.7, 0.2, 0.1])],
+        'Vl.Saldo': formatar_br(valores).to_numpy(dtype=object),
+        'Saldo': np.round(rng.gamma(2, 50, linhas), 3),
+        'Nome Emissor': escolher('Cliente', clientes),
+        'Desc. Material': escolher('Material', materiais),
+        'Revisão Data Faturamento': faturamento,
+        '1ª.DT.DIV.REM': (faturamento - pd.to_timedelta(rng.integers(0, 15, linhas), unit='D')).strftime('%d/%m/%Y'),
+        'Dt. Dej. Rem.': (faturamento - pd.to_timedelta(rng.integers(0, 30, linhas), unit='D')).strftime('%d/%m/%Y'),
+    })
+    for i in range(extras):
+        df[f'Extra {i + 1}'] = rng.integers(0, 1000, linhas)
+    return df
+
+
+# Função para gravar a carteira em .xlsx
+def gerar_planilha(df, destino=None):
+    """Grava em .xlsx (modo write-only do openpyxl); retorna os bytes quando destino é None"""
+    if len(df) > LINHAS_XLSX_MAXIMO:
+        raise ValueError(f"Uma planilha .xlsx comporta no máximo {LINHAS_XLSX_MAXIMO:,} linhas")
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(df.columns))
+    colunas = [df[c].astype(object).where(df[c].notna(), None).tolist() for c in df.columns]
+    for linha in zip(*colunas):
+        ws.append(linha)
+
+    if destino is None:
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        return buffer.getvalue()
+    wb.save(destino)
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m carteira.sintetico', description="Gera uma carteira sintética em .xlsx")
+    parser.add_argument('linhas', type=int, help="Número de linhas")
+    parser.add_argument('destino', help="Arquivo .xlsx de saída")
+    parser.add_argument('--gcs', type=int, default=30)
+    parser.add_argument('--grupos', type=int, default=8)
+    parser.add_argument('--diretorias', type=int, default=4)
+    parser.add_argument('--inicio', default='2026-01-01', help="Primeira data de faturamento")
+    parser.add_argument('--meses', type=int, default=12, help="Meses cobertos a partir do início")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = gerar_carteira(args.linhas, gcs=args.gcs, grupos=args.grupos, diretorias=args.diretorias,
+                        inicio=args.inicio, meses=args.meses, semente=args.semente)
+    gerar_planilha(df, args.destino)
+    print(f"{len(df):,} linhas gravadas em {args.destino}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
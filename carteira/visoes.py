@@ -0,0 +1,57 @@
+"""Visões materializadas por (GC, mês, ano): linhas do GC e resumo por grupo, compartilhadas entre sessões"""
+import os
+import threading
+from collections import OrderedDict
+
+from carteira.links import get_resumo_por_grupo
+from carteira.particao import filtrar_por_mes_trabalho
+
+MAXIMO_PADRAO = int(os.environ.get('CARTEIRA_VISOES_MAX', '2000'))
+
+
+class VisoesCarteira:
+    """Visões dos GCs de uma versão da carteira (df e índice mensal do registro).
+
+    Na primeira visão de um mês, um único groupby guarda as posições das
+    linhas de cada GC; cada visão é então só a fatia do GC e o seu resumo por
+    grupo, montados uma vez e reaproveitados por todas as sessões (LRU de até
+    `maximo` visões). As visões não têm revisões aplicadas e devem ser
+    tratadas como somente leitura.
+    """
+
+    def __init__(self, df, indice=None, maximo=None):
+        self.df = df
+        self.indice = indice
+        self.maximo = maximo or MAXIMO_PADRAO
+        self._lock = threading.Lock()
+        self._posicoes = {}  # (mes, ano) -> {GC: posições no mês}
+        self._visoes = OrderedDict()  # (GC, mes, ano) -> {'df', 'grupos'}
+
+    def _posicoes_do_mes(self, df_mes, mes, ano):
+        posicoes = self._posicoes.get((mes, ano))
+        if posicoes is None:
+            posicoes = df_mes.groupby('GC', observed=True, sort=False).indices
+            self._posicoes[(mes, ano)] = posicoes
+        return posicoes
+
+    def obter(self, gc, mes, ano):
+        """{'df': linhas do GC no mês, 'grupos': resumo por grupo}; df vazio se o GC não tiver pedidos"""
+        chave = (gc, mes, ano)
+        with self._lock:
+            visao = self._visoes.get(chave)
+            if visao is not None:
+                self._visoes.move_to_end(chave)
+                return visao
+
+            df_mes = filtrar_por_mes_trabalho(self.df, mes, ano, self.indice)
+            posicoes = self._posicoes_do_mes(df_mes, mes, ano).get(gc)
+            df_gc = df_mes.iloc[posicoes] if posicoes is not None else df_mes.iloc[0:0]
+            visao = {'df': df_gc, 'grupos': get_resumo_por_grupo(df_gc, gc)}
+
+            self._visoes[chave] = visao
+            while len(self._visoes) > self.maximo:
+                self._visoes.popitem(last=False)
+            return visao
+
+    def __len__(self):
+        return len(self._visoes)
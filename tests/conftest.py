@@ -0,0 +1,25 @@
+"""Carteiras sintéticas pequenas compartilhadas pelos testes"""
+import pytest
+
+from carteira.carga import tratar_carteira
+from carteira.sintetico import gerar_carteira
+
+
+@pytest.fixture(scope='session')
+def carteira():
+    """Carteira tratada (esquema, datas, colunas de controle e compactação), somente leitura"""
+    return tratar_carteira(gerar_carteira(3000, gcs=12, grupos=5, diretorias=3, meses=2, inicio='2026-03-01'))[0]
+
+
+@pytest.fixture
+def revisao():
+    """Fábrica de revisões no formato gravado no repositório"""
+    def criar(gc='GC 0001', data_revisao='2026-03-10T09:00:00', nova_data=None, acao=None, justificativa=None):
+        return {
+            'gc': gc,
+            'data_revisao': data_revisao,
+            'nova_data': nova_data,
+            'justificativa': justificativa,
+            'acao': acao or ('revisao' if nova_data else 'check'),
+        }
+    return criar
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from carteira.agregados import AgregadosCarteira, calculate_metrics
+from carteira.particao import filtrar_por_mes_trabalho
+from carteira.revisoes import aplicar_revisoes, tabela_revisoes
+
+
+@pytest.fixture
+def df_mes(carteira):
+    return filtrar_por_mes_trabalho(carteira, 3, 2026)
+
+
+def _conferir(agregados, df_mes, revisoes):
+    revisada = aplicar_revisoes(df_mes, tabela_revisoes(revisoes))
+    assert agregados.metricas() == pytest.approx(calculate_metrics(revisada))
+    for dim in ('GC', 'Grupo'):
+        resumo = agregados.resumo(dim).set_index(dim)
+        por_dim = revisada.groupby(dim, observed=True)[['Revisao_Realizada', 'Data_Original_Alterada']].sum()
+        np.testing.assert_array_equal(resumo.loc[por_dim.index, 'Revisados'], por_dim['Revisao_Realizada'])
+        np.testing.assert_array_equal(resumo.loc[por_dim.index, 'Alterados'], por_dim['Data_Original_Alterada'])
+
+
+def test_deltas_de_revisao_e_remocao(df_mes, revisao):
+    agregados = AgregadosCarteira(df_mes)
+    ordens = df_mes['Ord.venda'].drop_duplicates().head(5).tolist()
+    revisoes = {ordens[0]: revisao(), ordens[1]: revisao(nova_data='2026-04-01'), ordens[2]: revisao()}
+
+    agregados.atualizar(revisoes.items())
+    _conferir(agregados, df_mes, revisoes)
+
+    # Confirmação vira alteração, alteração é removida; repetir o mesmo estado não conta duas vezes
+    revisoes[ordens[0]] = revisao(nova_data='2026-04-02')
+    del revisoes[ordens[1]]
+    agregados.atualizar([(ordens[0], revisoes[ordens[0]]), (ordens[1], None), (ordens[2], revisoes[ordens[2]])])
+    _conferir(agregados, df_mes, revisoes)
+
+    agregados.atualizar([(str(o), None) for o in ordens])
+    assert agregados.metricas() == pytest.approx(calculate_metrics(df_mes))
+
+
+def test_ordem_fora_do_mes_nao_altera(df_mes, revisao):
+    agregados = AgregadosCarteira(df_mes)
+    antes = agregados.metricas()
+    agregados.atualizar_ordem(-1, revisao())
+    assert agregados.metricas() == antes
+
+
+def test_mascara_por_filtro_e_status(df_mes, revisao):
+    agregados = AgregadosCarteira(df_mes)
+    ordem = df_mes['Ord.venda'].iloc[0]
+    agregados.atualizar_ordem(ordem, revisao())
+    grupo = agregados.opcoes('Grupo')[0]
+
+    mascara = agregados.mascara({'Grupo': grupo, 'DIRETORIA': 'Todos'}, 'Revisados')
+    esperada = (df_mes['Grupo'] == grupo).to_numpy() & (df_mes['Ord.venda'] == ordem).to_numpy()
+    np.testing.assert_array_equal(mascara, esperada)
+    assert agregados.mascara({'Grupo': 'Todos'}) is None
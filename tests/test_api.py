@@ -0,0 +1,24 @@
+from carteira.api import RevisoesGC
+from carteira.particao import filtrar_por_mes_trabalho
+from carteira.repositorio import RepositorioMemoria, normalizar_ordem
+
+
+def test_entradas_descartadas_saem_dos_donos(carteira, revisao):
+    df = filtrar_por_mes_trabalho(carteira, 3, 2026)
+    gcs = df['GC'].drop_duplicates().head(3).tolist()
+    repositorio = RepositorioMemoria()
+    revisoes = RevisoesGC(repositorio, maximo=2)
+    for gc in gcs:
+        revisoes.obter((gc, 3, 2026), df[df['GC'] == gc])
+
+    # Só as ordens dos dois GCs em cache continuam no mapa de donos
+    mantidas = {chave for donos in revisoes._donos.values() for chave in donos}
+    assert mantidas == {(gc, 3, 2026) for gc in gcs[1:]}
+    assert set(revisoes._donos) == {normalizar_ordem(o) for o in df.loc[df['GC'].isin(gcs[1:]), 'Ord.venda']}
+
+    # Alteração numa ordem só do GC descartado não chega a nenhuma entrada
+    ordem = (set(df.loc[df['GC'] == gcs[0], 'Ord.venda']) - set(df.loc[df['GC'].isin(gcs[1:]), 'Ord.venda'])).pop()
+    repositorio.registrar({ordem: revisao(gc=gcs[0])}, 3, 2026)
+    versao, linhas = revisoes.obter((gcs[1], 3, 2026), df[df['GC'] == gcs[1]])
+    assert versao == repositorio.versao()
+    assert all(not entrada['pendentes'] for entrada in revisoes._itens.values())
@@ -0,0 +1,16 @@
+import pandas as pd
+
+from carteira.cache import CacheCarteira
+from carteira.carga import tratar_carteira
+from carteira.sintetico import gerar_carteira
+
+
+def test_cache_devolve_o_mesmo_frame_com_ord_venda_misturada(tmp_path):
+    bruto = gerar_carteira(200, gcs=4, grupos=2, diretorias=2, meses=1, inicio='2026-03-01')
+    bruto['Ord.venda'] = bruto['Ord.venda'].astype(object)
+    bruto.loc[::3, 'Ord.venda'] = 'OV-' + bruto.loc[::3, 'Ord.venda'].astype(str)
+    df, _, _ = tratar_carteira(bruto)
+
+    cache = CacheCarteira(str(tmp_path))
+    assert cache.gravar('chave', df)
+    pd.testing.assert_frame_equal(cache.ler('chave'), df)
@@ -0,0 +1,15 @@
+from carteira.cache import CacheCarteira
+from carteira.carga import AVISO_FALLBACK_DATA, carregar_carteira
+from carteira.sintetico import gerar_carteira, gerar_planilha
+
+
+def test_aviso_de_fallback_tambem_no_cache(tmp_path):
+    bruto = gerar_carteira(100, gcs=3, grupos=2, diretorias=2, meses=1, inicio='2026-03-01')
+    conteudo = gerar_planilha(bruto.drop(columns=['Revisão Data Faturamento']))
+    cache = CacheCarteira(str(tmp_path))
+
+    _, _, relatorio, avisos = carregar_carteira(conteudo, cache)
+    assert relatorio is not None and avisos == [AVISO_FALLBACK_DATA]
+
+    _, _, relatorio, avisos = carregar_carteira(conteudo, cache)
+    assert relatorio is None and avisos == [AVISO_FALLBACK_DATA]
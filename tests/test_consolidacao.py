@@ -0,0 +1,81 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from carteira.consolidacao import FONTE_REPOSITORIO, consolidar, fontes_de_zip
+from carteira.repositorio import RepositorioMemoria, RepositorioSQLite
+
+
+def _json(revisoes):
+    return json.dumps(revisoes).encode('utf-8')
+
+
+def test_vale_a_data_revisao_mais_recente(revisao):
+    antiga = revisao(gc='GC 0001', data_revisao='2026-03-10T09:00:00')
+    recente = revisao(gc='GC 0002', data_revisao='2026-03-11T08:00:00', nova_data='2026-04-01')
+    # O arquivo com a revisão mais recente vem primeiro: a data decide, não a ordem dos arquivos
+    fontes = [('a.json', _json({'10': recente})), ('b.json', _json({'10': antiga, '11': antiga}))]
+
+    resultado = consolidar(fontes, processos=1)
+
+    assert resultado['revisoes'][10]['gc'] == 'GC 0002'
+    assert resultado['revisoes'][11]['gc'] == 'GC 0001'
+    assert resultado['conflitos']['Ord.venda'].tolist() == [10]
+    assert resultado['conflitos'].loc[0, 'arquivo_vencedor'] == 'a.json'
+    assert len(resultado['historico']) == 3
+
+
+def test_empate_fica_com_o_ultimo_arquivo_e_copias_nao_conflitam(revisao):
+    r = revisao()
+    fontes = [('a.json', _json({'1': r, '2': r})), ('b.json', _json({'1': {**r, 'justificativa': 'b'}, '2': r}))]
+    resultado = consolidar(fontes, processos=1)
+    assert resultado['revisoes'][1]['justificativa'] == 'b'
+    assert resultado['conflitos']['Ord.venda'].tolist() == [1]
+
+
+def test_repositorio_perde_para_revisao_mais_recente(revisao):
+    atuais = {1: {**revisao(data_revisao='2026-03-12T00:00:00'), 'mes': 3, 'ano': 2026},
+              2: {**revisao(data_revisao='2026-03-01T00:00:00'), 'mes': 3, 'ano': 2026}}
+    fontes = [('a.json', _json({'1': revisao(data_revisao='2026-03-11T00:00:00'),
+                                '2': revisao(data_revisao='2026-03-02T00:00:00')}))]
+    resultado = consolidar(fontes, atuais, processos=1)
+    # Só a ordem 2 muda; a 1 continua com a versão do repositório
+    assert list(resultado['revisoes']) == [2]
+    vencedoras = resultado['historico'][resultado['historico']['vencedora']]
+    assert vencedoras.set_index('Ord.venda').loc[1, 'arquivo'] == FONTE_REPOSITORIO
+
+
+def test_diario_e_invalidas_dentro_do_zip(revisao):
+    diario = (
+        json.dumps({'seq': 1, 'versao': 1, 'ordem': 5, 'revisao': revisao()}) + '\n'
+        + json.dumps({'seq': 2, 'versao': 2, 'ordem': 6, 'revisao': revisao()}) + '\n'
+        + json.dumps({'seq': 3, 'versao': 3, 'ordem': 6, 'revisao': None}) + '\n'
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as arquivo_zip:
+        arquivo_zip.writestr('gc1/revisoes.jsonl', diario)
+        arquivo_zip.writestr('gc2.json', _json({'7': {**revisao(), 'acao': 'apagar'}, '8': {'gc': ''}}))
+        arquivo_zip.writestr('__MACOSX/gc2.json', b'lixo')
+
+    fontes = fontes_de_zip(buffer.getvalue())
+    resultado = consolidar(fontes, processos=1)
+
+    assert [nome for nome, _ in fontes] == ['gc1/revisoes.jsonl', 'gc2.json']
+    assert list(resultado['revisoes']) == [5]
+    assert sorted(resultado['invalidas']['Ord.venda']) == [7, 8]
+
+
+@pytest.mark.parametrize('tipo', ['memoria', 'sqlite'])
+def test_consolidada_sem_mes_fica_no_mes_do_registro(tipo, tmp_path, revisao):
+    repositorio = RepositorioMemoria() if tipo == 'memoria' else RepositorioSQLite(str(tmp_path / 'revisoes.db'))
+    # .json antigo: revisões sem mes/ano, que voltam da consolidação com mes e ano None
+    resultado = consolidar([('antigo.json', _json({'10': revisao(acao='check')}))], processos=1)
+    assert resultado['revisoes'][10]['mes'] is None
+
+    repositorio.registrar(resultado['revisoes'], 3, 2026)
+    assert list(repositorio.por_mes(3, 2026)) == [10]
+
+    repositorio.limpar(3, 2026)
+    assert repositorio.todas() == {}
@@ -0,0 +1,93 @@
+from carteira.diario import DiarioRevisoes, carregar_diario, carregar_revisoes, ler_eventos, reproduzir
+from carteira.repositorio import RepositorioMemoria, RepositorioSQLite
+
+
+def test_reproduzir_apos_compactacao_mantem_remocoes(tmp_path, revisao):
+    repositorio = RepositorioMemoria()
+    diario = DiarioRevisoes(str(tmp_path / 'revisoes.jsonl'))
+    repositorio.registrar({1: revisao(), 2: revisao(), 3: revisao()}, 3, 2026)
+    diario.sincronizar(repositorio)
+    repositorio.remover([2])
+    diario.sincronizar(repositorio)
+
+    diario.compactar()
+    repositorio.registrar({4: revisao()}, 3, 2026)
+    diario.sincronizar(repositorio)
+
+    assert set(diario.estado()) == {1, 3, 4}
+    # A remoção sobrevive à compactação: quem ainda tem a ordem 2 a perde ao carregar a exportação
+    antigo = RepositorioMemoria()
+    antigo.registrar({2: revisao()}, 3, 2026)
+    assert carregar_diario(antigo, diario.exportar()) == (3, 1, 0)
+    assert set(antigo.todas()) == {1, 3, 4}
+
+
+def test_diario_reaberto_continua_a_sequencia(tmp_path, revisao):
+    caminho = str(tmp_path / 'revisoes.jsonl')
+    repositorio = RepositorioMemoria()
+    diario = DiarioRevisoes(caminho)
+    repositorio.registrar({1: revisao()}, 3, 2026)
+    diario.sincronizar(repositorio)
+    diario.compactar()
+
+    # Processo reiniciado: repositório em memória vazio, repovoado pelo diário
+    novo = RepositorioMemoria()
+    reaberto = DiarioRevisoes(caminho)
+    assert reaberto.restaurar(novo) == 1
+    seq_antes = reaberto.seq
+    novo.remover([1])
+    assert reaberto.sincronizar(novo) > seq_antes
+    assert DiarioRevisoes(caminho).estado() == {}
+
+
+def test_dois_processos_geram_o_mesmo_seq(tmp_path, revisao):
+    repositorio = RepositorioSQLite(str(tmp_path / 'revisoes.db'))
+    caminho = str(tmp_path / 'revisoes.jsonl')
+    a, b = DiarioRevisoes(caminho), DiarioRevisoes(caminho)
+
+    repositorio.registrar({1: revisao(acao='check')}, 3, 2026)
+    a.sincronizar(repositorio)
+    repositorio.registrar({1: revisao(nova_data='2026-04-01')}, 3, 2026)
+    b.sincronizar(repositorio)
+    # a leu a versão 1 e só grava depois: o evento atrasado não desfaz a versão 2
+    a.anexar([(1, revisao(acao='check'))], 1)
+
+    eventos = list(ler_eventos(open(caminho)))
+    assert {e['seq'] for e in eventos if e['versao'] == 1} == {1}
+    assert reproduzir(eventos)[1]['acao'] == 'revisao'
+    assert DiarioRevisoes(caminho).estado()[1]['nova_data'] == '2026-04-01'
+
+
+def test_carregar_diario_antigo_nao_sobrescreve_revisoes_novas(tmp_path, revisao):
+    diario = DiarioRevisoes(str(tmp_path / 'revisoes.jsonl'))
+    origem = RepositorioMemoria()
+    origem.registrar({1: revisao(acao='check'), 2: revisao(), 3: revisao()}, 3, 2026)
+    diario.sincronizar(origem)
+    origem.remover([3])
+    diario.anexar([(3, None)], origem.versao(), agora='2026-03-12T09:00:00')
+    diario.compactar()
+
+    atual = RepositorioMemoria()
+    atual.registrar({
+        1: revisao(data_revisao='2026-03-20T09:00:00', nova_data='2026-05-01'),
+        3: revisao(data_revisao='2026-03-15T09:00:00'),
+    }, 3, 2026)
+    # 1 e 3 foram revisadas depois do diário: só a 2 entra, e a remoção antiga da 3 é ignorada
+    assert carregar_diario(atual, diario.exportar()) == (1, 0, 2)
+    assert atual.todas()[1]['nova_data'] == '2026-05-01'
+    assert set(atual.todas()) == {1, 2, 3}
+
+    # A remoção vale contra a revisão que ela removeu (ou uma anterior)
+    antigo = RepositorioMemoria()
+    antigo.registrar({3: revisao(data_revisao='2026-03-10T09:00:00')}, 3, 2026)
+    assert carregar_diario(antigo, diario.exportar()) == (2, 1, 0)
+    assert set(antigo.todas()) == {1, 2}
+
+
+def test_carregar_revisoes_json_ignora_as_mais_antigas(revisao):
+    repositorio = RepositorioMemoria()
+    repositorio.registrar({1: revisao(data_revisao='2026-03-20T09:00:00', acao='check')}, 3, 2026)
+    arquivo = {'1': revisao(data_revisao='2026-03-10T09:00:00'), '2': revisao()}
+    assert carregar_revisoes(repositorio, arquivo, 3, 2026) == (1, 0, 1)
+    assert repositorio.todas()[1]['acao'] == 'check'
+    assert set(repositorio.todas()) == {1, 2}
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from carteira.esquema import aplicar_esquema, parse_data, parse_numero
+
+
+def test_numero_em_formato_brasileiro():
+    serie = pd.Series(['17.454,00', '1.234', 'R$ 12,5', '-3,75', '7', None, 'abc'])
+    esperado = [17454.0, 1234.0, 12.5, -3.75, 7.0, np.nan, np.nan]
+    np.testing.assert_array_equal(parse_numero(serie).to_numpy(), esperado)
+
+
+def test_numero_com_celulas_numericas_e_texto():
+    serie = pd.Series([3.5, '1.000,25', 10, None], dtype=object)
+    np.testing.assert_array_equal(parse_numero(serie).to_numpy(), [3.5, 1000.25, 10.0, np.nan])
+
+
+def test_numero_en_us_e_coluna_ja_numerica():
+    assert parse_numero(pd.Series(['1,234.56']), 'en_US').tolist() == [1234.56]
+    assert parse_numero(pd.Series([1, 2], dtype='int32')).dtype == 'float64'
+
+
+def test_data_com_formato_fixo_e_iso():
+    serie = pd.Series(['15/08/2025', ' 01/02/2026 ', '2025-08-15 00:00:00', '31/02/2026', None])
+    datas = parse_data(serie)
+    assert datas.tolist()[:3] == [pd.Timestamp('2025-08-15'), pd.Timestamp('2026-02-01'), pd.Timestamp('2025-08-15')]
+    assert datas.iloc[3:].isna().all()
+
+
+def test_data_em_serial_do_excel():
+    # 45658 = 01/01/2025; 0 e acima de 31/12/9999 ficam vazios
+    assert parse_data(pd.Series([45658.0, 45658.5])).tolist() == [
+        pd.Timestamp('2025-01-01'), pd.Timestamp('2025-01-01 12:00')
+    ]
+    assert parse_data(pd.Series([0, 3_000_000])).isna().all()
+
+
+def test_data_com_serial_e_texto_na_mesma_coluna():
+    serie = pd.Series(['01/01/2025', 45659, '01/01/2025', None], dtype=object)
+    assert parse_data(serie).tolist()[:3] == [
+        pd.Timestamp('2025-01-01'), pd.Timestamp('2025-01-02'), pd.Timestamp('2025-01-01')
+    ]
+
+
+def test_aplicar_esquema_ignora_colunas_ausentes():
+    df = aplicar_esquema(pd.DataFrame({'Vl.Saldo': ['1,5'], 'Dt. Dej. Rem.': ['02/03/2026'], 'Outra': ['1,5']}))
+    assert df.loc[0, 'Vl.Saldo'] == 1.5
+    assert df.loc[0, 'Dt. Dej. Rem.'] == pd.Timestamp('2026-03-02')
+    assert df.loc[0, 'Outra'] == '1,5'
@@ -0,0 +1,65 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+from carteira.exportacao import FORMATOS, exportar, nome_exportacao
+from carteira.revisoes import aplicar_revisoes, tabela_revisoes
+
+
+def test_parquet_com_coluna_object_nula_no_primeiro_lote(carteira, revisao, tmp_path):
+    # Só a última ordem revisada: Revisado_Por é toda nula nos primeiros lotes
+    ultima = carteira['Ord.venda'].iloc[-1]
+    revisada = aplicar_revisoes(carteira, tabela_revisoes({ultima: revisao(gc='GC X')}))
+    assert revisada['Revisado_Por'].dtype == object
+
+    for comprimir in (False, True):
+        caminho = tmp_path / f"carteira_{comprimir}.parquet"
+        exportar(revisada, caminho, 'parquet', comprimir=comprimir, tamanho_lote=500)
+        lida = pd.read_parquet(caminho)
+        assert len(lida) == len(revisada)
+        assert set(lida['Revisado_Por'].dropna()) == {'GC X'}
+
+
+def test_parquet_com_coluna_object_toda_nula(carteira, tmp_path):
+    df = carteira.assign(Revisado_Por=pd.Series(None, index=carteira.index, dtype=object))
+    caminho = tmp_path / 'carteira.parquet'
+    exportar(df, caminho, 'parquet', tamanho_lote=500)
+    assert pd.read_parquet(caminho)['Revisado_Por'].isna().all()
+
+
+def _ler(caminho, formato, comprimir):
+    if formato == 'parquet':
+        return pd.read_parquet(caminho)
+    with (gzip.open(caminho) if comprimir else open(caminho, 'rb')) as arquivo:
+        conteudo = io.BytesIO(arquivo.read())
+    if formato == 'csv':
+        return pd.read_csv(conteudo, sep=';', encoding='utf-8-sig')
+    return pd.read_excel(conteudo, sheet_name='Carteira')
+
+
+@pytest.mark.parametrize('comprimir', [False, True])
+@pytest.mark.parametrize('formato', FORMATOS)
+@pytest.mark.parametrize('com_revisoes', [False, True])
+def test_cada_formato_com_e_sem_revisoes(carteira, revisao, tmp_path, formato, comprimir, com_revisoes):
+    df = carteira.iloc[:300]
+    if com_revisoes:
+        ordens = df['Ord.venda'].drop_duplicates().iloc[[10, 200]].tolist()
+        df = aplicar_revisoes(df, tabela_revisoes({ordens[0]: revisao(gc='GC A'),
+                                                   ordens[1]: revisao(gc='GC B', nova_data='2026-04-01')}))
+    caminho = tmp_path / nome_exportacao('carteira', formato, comprimir)
+
+    exportar(df, caminho, formato, comprimir=comprimir, tamanho_lote=64)
+
+    lida = _ler(caminho, formato, comprimir)
+    assert list(lida.columns) == list(df.columns)
+    assert lida['Ord.venda'].tolist() == df['Ord.venda'].tolist()
+    assert lida['Revisao_Realizada'].astype(bool).sum() == df['Revisao_Realizada'].sum()
+    assert set(lida['Revisado_Por'].dropna()) == set(df['Revisado_Por'].dropna())
+    assert lida['Vl.Saldo'].sum() == pytest.approx(df['Vl.Saldo'].sum())
+
+
+def test_formato_invalido(carteira, tmp_path):
+    with pytest.raises(ValueError):
+        exportar(carteira, tmp_path / 'carteira.txt', 'txt')
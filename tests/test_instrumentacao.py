@@ -0,0 +1,12 @@
+import tracemalloc
+
+from carteira.instrumentacao import Medicoes
+
+
+def test_sem_alocacoes_nao_liga_tracemalloc():
+    assert not tracemalloc.is_tracing()
+    medicoes = Medicoes('teste', alocacoes=False)
+    with medicoes.etapa('soma', linhas=3):
+        sum(range(3))
+    assert not tracemalloc.is_tracing()
+    assert list(medicoes.tabela().columns) == ['etapa', 'linhas', 'segundos']
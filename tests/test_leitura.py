@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from carteira.carga import ler_carteira, preparar_carteira
+from carteira.leitura import COLUNAS_DASHBOARD, ler_excel_em_lotes
+from carteira.particao import filtrar_por_mes_trabalho
+from carteira.sintetico import gerar_carteira, gerar_planilha
+
+
+@pytest.fixture(scope='module')
+def bruto():
+    return gerar_carteira(40, gcs=3, grupos=2, diretorias=2, meses=2, inicio='2026-03-01')
+
+
+@pytest.fixture(scope='module')
+def planilha(bruto):
+    return gerar_planilha(bruto)
+
+
+def test_projecao_nas_colunas_do_dashboard(bruto, planilha):
+    lote, = ler_excel_em_lotes(planilha)
+    assert list(lote.columns) == [c for c in COLUNAS_DASHBOARD if c in bruto.columns]
+    assert not any(c.startswith('Extra') for c in lote.columns)
+    assert lote['Ord.venda'].tolist() == bruto['Ord.venda'].tolist()
+
+
+@pytest.mark.parametrize('tamanho, esperados', [(7, [7, 7, 7, 7, 7, 5]), (8, [8, 8, 8, 8, 8]), (100, [40])])
+def test_limites_dos_lotes(bruto, planilha, tamanho, esperados):
+    lotes = list(ler_excel_em_lotes(planilha, tamanho_lote=tamanho))
+    assert [len(lote) for lote in lotes] == esperados
+    assert pd.concat(lotes, ignore_index=True)['Ord.venda'].tolist() == bruto['Ord.venda'].tolist()
+
+
+def test_linhas_vazias_e_linhas_curtas():
+    df = pd.DataFrame({'Ord.venda': [1, None, 3], 'GC': ['GC 1', None, None], 'Saldo': ['1,0', None, '2,0']})
+    lote, = ler_excel_em_lotes(gerar_planilha(df), inferir_tipos=False)
+    # A linha toda vazia some; as demais mantêm as posições
+    assert lote['Ord.venda'].tolist() == [1, 3]
+    assert lote['GC'].tolist() == ['GC 1', None]
+
+
+def test_planilha_sem_linhas_gera_um_lote_vazio_com_colunas():
+    lotes = list(ler_excel_em_lotes(gerar_planilha(pd.DataFrame(columns=['Ord.venda', 'GC', 'Outra']))))
+    assert len(lotes) == 1 and lotes[0].empty
+    assert list(lotes[0].columns) == ['Ord.venda', 'GC']
+
+
+def test_filtro_do_mes_na_leitura(bruto, planilha):
+    lotes = list(ler_excel_em_lotes(planilha, tamanho_lote=5, mes=3, ano=2026))
+    lidas = pd.concat(lotes, ignore_index=True)
+    datas = pd.to_datetime(bruto['Revisão Data Faturamento'])
+    esperadas = bruto.loc[(datas.dt.month == 3) & (datas.dt.year == 2026), 'Ord.venda']
+    assert 0 < len(lidas) < len(bruto)
+    assert lidas['Ord.venda'].tolist() == esperadas.tolist()
+
+
+def test_filtro_do_mes_usa_o_fallback_em_texto():
+    df = pd.DataFrame({
+        'Ord.venda': [1, 2, 3, 4],
+        '1ª.DT.DIV.REM': ['15/03/2026', '01/04/2026', datetime(2026, 3, 2), 46082],  # 46082 = 01/03/2026
+    })
+    lidas = pd.concat(ler_excel_em_lotes(gerar_planilha(df), mes=3, ano=2026), ignore_index=True)
+    assert lidas['Ord.venda'].tolist() == [1, 3, 4]
+
+
+def test_carteira_do_mes_igual_ao_filtro_da_carteira_inteira(planilha):
+    inteira, _, _ = preparar_carteira(planilha)
+    do_mes, _, _ = preparar_carteira(planilha, 4, 2026)
+    esperada = filtrar_por_mes_trabalho(inteira, 4, 2026)
+    assert do_mes['Ord.venda'].tolist() == esperada['Ord.venda'].tolist()
+
+
+def test_lotes_tipados_antes_de_juntar(planilha):
+    df = ler_carteira(planilha)
+    assert df['Vl.Saldo'].dtype == 'float64'
+    assert pd.api.types.is_datetime64_any_dtype(df['Revisão Data Faturamento'])
+    assert pd.api.types.is_datetime64_any_dtype(df['1ª.DT.DIV.REM'])
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from carteira.links import generate_personalized_links
+from carteira.particao import filtrar_por_mes_trabalho
+
+
+def test_links_so_para_gcs_do_mes(carteira):
+    assert isinstance(carteira['GC'].dtype, pd.CategoricalDtype)
+    df_mes = filtrar_por_mes_trabalho(carteira, 3, 2026)
+    links = generate_personalized_links(df_mes, 3, 2026)
+    assert set(links) == set(df_mes['GC'].dropna().unique())
+    assert all(link['pedidos'] > 0 for link in links.values())
+
+
+def test_categoria_sem_linhas_nao_gera_link(carteira):
+    df = carteira.iloc[:50].copy()
+    df['GC'] = df['GC'].cat.add_categories(['GC sem pedidos'])
+    links = generate_personalized_links(df, 3, 2026)
+    assert 'GC sem pedidos' not in links
@@ -0,0 +1,64 @@
+import io
+
+import pandas as pd
+import pytest
+
+from carteira.lote import adiar_datas, confirmar_pendentes, ler_decisoes, modelo_decisoes
+from carteira.particao import filtrar_por_mes_trabalho
+from carteira.revisoes import aplicar_revisoes, tabela_revisoes
+
+AGORA = '2026-03-10T09:00:00'
+
+
+@pytest.fixture
+def df_gc(carteira, revisao):
+    df = filtrar_por_mes_trabalho(carteira, 3, 2026)
+    df = df[df['GC'] == 'GC 0001']
+    # Primeira ordem já revisada com nova data
+    return aplicar_revisoes(df, tabela_revisoes({df['Ord.venda'].iloc[0]: revisao(nova_data='2026-04-10')}))
+
+
+def test_confirmar_so_as_pendentes(df_gc):
+    revisoes = confirmar_pendentes(df_gc, 'GC 0001', AGORA)
+    revisada = df_gc['Ord.venda'].iloc[0]
+    assert revisada not in revisoes
+    assert set(revisoes) == set(df_gc['Ord.venda'].unique()) - {revisada}
+    assert all(r['acao'] == 'check' and r['data_revisao'] == AGORA for r in revisoes.values())
+
+
+def test_adiar_a_partir_da_nova_data(df_gc):
+    revisoes = adiar_datas(df_gc, 7, 'GC 0001', 'frete', AGORA)
+    primeira = df_gc.iloc[0]
+    segunda = df_gc[df_gc['Ord.venda'] != primeira['Ord.venda']].iloc[0]
+    assert revisoes[primeira['Ord.venda']]['nova_data'] == '2026-04-17'
+    assert revisoes[segunda['Ord.venda']]['nova_data'] == (segunda['Data_Trabalho'] + pd.Timedelta(days=7)).date().isoformat()
+    assert len(revisoes) == df_gc['Ord.venda'].nunique()
+
+
+def test_modelo_preenchido_volta_como_revisoes(df_gc):
+    modelo = pd.read_csv(io.BytesIO(modelo_decisoes(df_gc)), sep=';', encoding='utf-8-sig', dtype=str)
+    assert df_gc['Ord.venda'].iloc[0] not in modelo['Ord.venda'].astype(int).tolist()
+
+    modelo = modelo.head(4).fillna('')
+    modelo.loc[0, 'acao'] = 'check'
+    modelo.loc[1, ['nova_data', 'justificativa']] = ['20/04/2026', 'cliente pediu']
+    modelo.loc[2, ['acao', 'nova_data']] = ['revisao', '31/02/2026']
+    modelo.loc[3, 'acao'] = 'cancelar'
+    extra = pd.DataFrame({'Ord.venda': ['1'], 'acao': ['check']})
+    conteudo = pd.concat([modelo, extra]).to_csv(index=False, sep=';').encode('utf-8-sig')
+
+    revisoes, ignoradas = ler_decisoes(conteudo, df_gc, 'GC 0001', AGORA)
+
+    ordens = modelo['Ord.venda'].astype(int).tolist()
+    assert revisoes[ordens[0]]['acao'] == 'check'
+    assert revisoes[ordens[1]] == {'gc': 'GC 0001', 'data_revisao': AGORA, 'nova_data': '2026-04-20',
+                                   'justificativa': 'cliente pediu', 'acao': 'revisao'}
+    assert ignoradas['Motivo'].tolist() == [
+        'data inválida: 31/02/2026', 'ação inválida: cancelar', 'ordem não pertence ao GC'
+    ]
+    assert ignoradas['Linha'].tolist() == [4, 5, 6]
+
+
+def test_decisoes_sem_coluna_ord_venda(df_gc):
+    with pytest.raises(ValueError):
+        ler_decisoes(b'acao;nova_data\ncheck;\n', df_gc, 'GC 0001', AGORA)
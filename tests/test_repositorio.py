@@ -0,0 +1,60 @@
+import pytest
+
+from carteira.repositorio import RepositorioMemoria, RepositorioRevisoes, RepositorioSQLite, normalizar_ordem
+
+
+@pytest.fixture(params=['memoria', 'sqlite'])
+def repositorio(request, tmp_path):
+    if request.param == 'memoria':
+        return RepositorioMemoria()
+    return RepositorioSQLite(str(tmp_path / 'revisoes.db'))
+
+
+def test_interface_abstrata():
+    with pytest.raises(TypeError):
+        RepositorioRevisoes()
+
+
+def test_normalizar_ordem():
+    assert normalizar_ordem('123') == 123
+    assert normalizar_ordem(123.0) == 123
+    assert normalizar_ordem('0123') == '0123'
+    assert normalizar_ordem(' OV-1 ') == 'OV-1'
+
+
+def test_cada_lote_incrementa_a_versao(repositorio, revisao):
+    assert repositorio.versao() == 0
+    assert repositorio.registrar({1: revisao(), 2: revisao()}, 3, 2026) == 1
+    assert repositorio.registrar({'3': revisao(gc='GC 0002')}, 3, 2026) == 2
+    assert repositorio.versao() == 2
+    assert set(repositorio.todas()) == {1, 2, 3}
+    assert repositorio.obter('3')['gc'] == 'GC 0002'
+    assert set(repositorio.por_gc('GC 0001', 3, 2026)) == {1, 2}
+
+
+def test_remocoes_ficam_registradas(repositorio, revisao):
+    repositorio.registrar({1: revisao(), 2: revisao()}, 3, 2026)
+    versao = repositorio.versao()
+    repositorio.remover([1])
+
+    assert repositorio.obter(1) is None
+    atual, alteradas = repositorio.alteracoes_desde(versao)
+    assert atual == versao + 1
+    assert alteradas == [(1, None)]
+
+    # Regravar a ordem removida volta a valer
+    repositorio.registrar({1: revisao(acao='check')}, 3, 2026)
+    _, alteradas = repositorio.alteracoes_desde(atual)
+    assert [(ordem, r['acao']) for ordem, r in alteradas] == [(1, 'check')]
+
+
+def test_limpar_so_remove_o_mes(repositorio, revisao):
+    repositorio.registrar({1: revisao(), 2: revisao()}, 3, 2026)
+    repositorio.registrar({3: revisao()}, 4, 2026)
+    versao = repositorio.versao()
+
+    repositorio.limpar(3, 2026)
+
+    assert set(repositorio.todas()) == {3}
+    _, alteradas = repositorio.alteracoes_desde(versao)
+    assert sorted(alteradas) == [(1, None), (2, None)]
@@ -0,0 +1,48 @@
+import pandas as pd
+
+from carteira.particao import filtrar_por_mes_trabalho
+from carteira.revisoes import aplicar_revisoes, reaplicar_revisoes, resumo_revisoes_realizadas, tabela_revisoes
+
+
+def _ordens(df, n):
+    return df['Ord.venda'].drop_duplicates().head(n).tolist()
+
+
+def test_aplicar_marca_todas_as_linhas_da_ordem(carteira, revisao):
+    df = filtrar_por_mes_trabalho(carteira, 3, 2026)
+    repetida = df['Ord.venda'][df['Ord.venda'].duplicated()].iloc[0]
+    revisada = aplicar_revisoes(df, tabela_revisoes({str(repetida): revisao(nova_data='2026-04-15')}))
+
+    linhas = revisada[revisada['Ord.venda'] == repetida]
+    assert len(linhas) > 1
+    assert linhas['Revisao_Realizada'].all() and linhas['Data_Original_Alterada'].all()
+    assert (linhas['Nova_Data_Entrega'] == pd.Timestamp('2026-04-15')).all()
+    assert revisada['Revisao_Realizada'].sum() == len(linhas)
+
+
+def test_reaplicar_equivale_a_aplicar_do_zero(carteira, revisao):
+    df_base = filtrar_por_mes_trabalho(carteira, 3, 2026)
+    o = _ordens(df_base, 8)
+    iniciais = {o[0]: revisao(), o[1]: revisao(nova_data='2026-04-01'), o[2]: revisao(), o[3]: revisao()}
+    revisada = aplicar_revisoes(df_base, tabela_revisoes(iniciais))
+
+    # Alterar, remover e incluir (a mesma ordem duas vezes: vale o último estado; chave texto como no JSON)
+    alteracoes = [
+        (o[0], revisao(nova_data='2026-04-20')),
+        (o[1], None),
+        (str(o[4]), revisao(gc='GC 0002')),
+        (o[2], revisao(nova_data='2026-05-01')),
+        (o[2], None),
+    ]
+    finais = {o[0]: alteracoes[0][1], o[3]: iniciais[o[3]], o[4]: alteracoes[2][1]}
+
+    esperada = aplicar_revisoes(df_base, tabela_revisoes(finais))
+    obtida = reaplicar_revisoes(revisada, df_base, alteracoes)
+    pd.testing.assert_frame_equal(obtida, esperada)
+
+
+def test_resumo_de_ordem_fora_da_carteira(carteira, revisao):
+    resumo = resumo_revisoes_realizadas(carteira, {'999': revisao(nova_data='2026-04-01')})
+    assert resumo.loc[0, 'Cliente'] == 'N/A'
+    assert resumo.loc[0, 'Acao'] == 'Data Alterada'
+    assert resumo.loc[0, 'Nova_Data'] == '01/04/2026'